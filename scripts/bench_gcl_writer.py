@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from rayado.gcl import FSYNC_POLICIES, GclWriter, append_block, ensure_header
+
+
+def _blocks(count: int) -> list[tuple[str, dict[str, str]]]:
+    blocks = []
+    for idx in range(1, count + 1):
+        t0 = idx * 1.5
+        blocks.append(
+            (
+                "GCL_SPAN",
+                {
+                    "sid": f"S{idx:05d}",
+                    "t0": f"{t0}",
+                    "t1": f"{t0 + 1.2}",
+                    "chunk_id": f"C{idx // 20 + 1:05d}",
+                    "text_raw": "오늘은 날씨가 정말 좋네요 let's go",
+                    "asr_conf": "0.93",
+                },
+            )
+        )
+    return blocks
+
+
+def _bench_append_block(path: str, blocks: list[tuple[str, dict[str, str]]]) -> float:
+    started = time.perf_counter()
+    ensure_header(path)
+    for block_type, fields in blocks:
+        append_block(path, block_type, fields)
+    return time.perf_counter() - started
+
+
+def _bench_writer(path: str, blocks: list[tuple[str, dict[str, str]]], fsync: str, flush_every: int) -> float:
+    started = time.perf_counter()
+    with GclWriter(path, fsync=fsync) as writer:
+        for idx, (block_type, fields) in enumerate(blocks, start=1):
+            writer.write_block(block_type, fields)
+            if flush_every and idx % flush_every == 0:
+                writer.flush()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare GCL append_block against the buffered GclWriter")
+    parser.add_argument("--blocks", type=int, default=20000, help="Number of GCL_SPAN blocks to write")
+    parser.add_argument("--flush-every", type=int, default=200, help="Writer flush interval in blocks (0 = only on close)")
+    parser.add_argument("--dir", default=None, help="Directory for scratch files (default: system temp)")
+    args = parser.parse_args()
+
+    blocks = _blocks(args.blocks)
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        elapsed = _bench_append_block(os.path.join(tmp, "append_block.gcl"), blocks)
+        results["append_block"] = {"sec": round(elapsed, 4), "blocks_per_sec": round(len(blocks) / elapsed, 1)}
+        for policy in FSYNC_POLICIES:
+            # fsync per block is orders of magnitude slower; keep that run short.
+            count = min(len(blocks), 2000) if policy == "always" else len(blocks)
+            elapsed = _bench_writer(os.path.join(tmp, f"writer_{policy}.gcl"), blocks[:count], policy, args.flush_every)
+            results[f"writer_fsync_{policy}"] = {
+                "blocks": count,
+                "sec": round(elapsed, 4),
+                "blocks_per_sec": round(count / elapsed, 1),
+            }
+    print(json.dumps({"blocks": len(blocks), "flush_every": args.flush_every, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
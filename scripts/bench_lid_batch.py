@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import torch
+
+from rayado.lid_voxlingua import _load_wav_tensor, classify_signals, get_classifier
+
+
+def _list_wavs(dir_path: str) -> list[str]:
+    return sorted(
+        os.path.join(dir_path, name)
+        for name in os.listdir(dir_path)
+        if name.lower().endswith(".wav")
+    )
+
+
+def _per_sample(classifier, signals: list[torch.Tensor]) -> list[tuple[str, float]]:
+    results = []
+    for signal in signals:
+        with torch.no_grad():
+            prediction = classifier.classify_batch(signal.unsqueeze(0))
+        score = float(prediction[1].exp().squeeze().item())
+        label = prediction[3][0] if prediction[3] else ""
+        results.append((label, score))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batched vs per-sample VoxLingua107 LID on CPU")
+    parser.add_argument("chunk_dir", help="Directory of 16 kHz WAV samples")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.path.join(".cache", "speechbrain", "lang-id-voxlingua107-ecapa"),
+        help="Model cache directory",
+    )
+    parser.add_argument("--device", default="cpu", help="Torch device (cpu/cuda)")
+    parser.add_argument("--limit", type=int, default=5, help="Number of samples to classify")
+    parser.add_argument("--max-batch-sec", type=float, default=0.0, help="Batch duration cap (0 = single batch)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per mode")
+    parser.add_argument("--threads", type=int, default=0, help="torch.set_num_threads (0 = default)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.chunk_dir):
+        print(f"Chunk dir not found: {args.chunk_dir}", file=sys.stderr)
+        sys.exit(1)
+    wavs = _list_wavs(args.chunk_dir)[: max(1, args.limit)]
+    if not wavs:
+        print("No wav chunks found.", file=sys.stderr)
+        sys.exit(2)
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+
+    classifier, load_sec = get_classifier(cache_dir=args.cache_dir, device=args.device)
+    signals = [_load_wav_tensor(path).squeeze(0) for path in wavs]
+
+    # Warm-up so neither mode pays first-call allocation costs.
+    _per_sample(classifier, signals[:1])
+
+    timings: dict[str, list[float]] = {"per_sample": [], "batched": []}
+    per_sample = batched = []
+    for _ in range(max(1, args.repeat)):
+        started = time.perf_counter()
+        per_sample = _per_sample(classifier, signals)
+        timings["per_sample"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        batched = classify_signals(classifier, signals, max_batch_sec=args.max_batch_sec)
+        timings["batched"].append(time.perf_counter() - started)
+
+    agree = sum(1 for a, b in zip(per_sample, batched) if a[0] == b[0])
+    output = {
+        "samples": len(signals),
+        "audio_sec": round(sum(int(s.shape[-1]) for s in signals) / 16000.0, 3),
+        "load_sec": round(load_sec, 3),
+        "per_sample_sec": round(min(timings["per_sample"]), 4),
+        "batched_sec": round(min(timings["batched"]), 4),
+        "speedup": round(min(timings["per_sample"]) / max(1e-9, min(timings["batched"])), 2),
+        "label_agreement": f"{agree}/{len(signals)}",
+    }
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import torch
+
+from rayado.lid_voxlingua import _label_to_code, _load_wav_tensor, classify_signals, get_classifier
+
+
+def _list_wavs(dir_path: str) -> list[str]:
+    return sorted(
+        os.path.join(dir_path, name)
+        for name in os.listdir(dir_path)
+        if name.lower().endswith(".wav")
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare VoxLingua107 LID accuracy/latency across precisions/runtimes")
+    parser.add_argument("sample_dir", help="Directory of 16 kHz WAV samples (fixed evaluation set)")
+    parser.add_argument(
+        "--labels",
+        default=None,
+        help="Optional JSON file mapping WAV file name -> expected language code",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.path.join(".cache", "speechbrain", "lang-id-voxlingua107-ecapa"),
+        help="Model cache directory",
+    )
+    parser.add_argument("--device", default="cpu", help="Torch device (cpu/cuda)")
+    parser.add_argument("--max-batch-sec", type=float, default=0.0, help="Batch duration cap (0 = single batch)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per variant")
+    parser.add_argument("--threads", type=int, default=0, help="torch.set_num_threads (0 = default)")
+    parser.add_argument(
+        "--export",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Include the AOT-compiled export runtime (built once into --cache-dir/export)",
+    )
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.sample_dir):
+        print(f"Sample dir not found: {args.sample_dir}", file=sys.stderr)
+        sys.exit(1)
+    wavs = _list_wavs(args.sample_dir)
+    if not wavs:
+        print("No wav samples found.", file=sys.stderr)
+        sys.exit(2)
+    expected: dict[str, str] = {}
+    if args.labels:
+        with open(args.labels, "r", encoding="utf-8") as f:
+            expected = json.load(f)
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+
+    classifier, load_sec = get_classifier(cache_dir=args.cache_dir, device=args.device)
+    signals = [_load_wav_tensor(path).squeeze(0) for path in wavs]
+
+    # variant -> (classifier, precision)
+    variants = {"fp32": (classifier, "fp32"), "bf16": (classifier, "bf16")}
+    export_sec = 0.0
+    if args.export:
+        exported, export_sec = get_classifier(cache_dir=args.cache_dir, device=args.device, runtime="export")
+        variants["export"] = (exported, "fp32")
+
+    results: dict[str, list[tuple[str, float]]] = {}
+    latency: dict[str, float] = {}
+    for name, (variant, precision) in variants.items():
+        classify_signals(variant, signals[:1], precision=precision)  # warm-up
+        best = float("inf")
+        for _ in range(max(1, args.repeat)):
+            started = time.perf_counter()
+            results[name] = classify_signals(
+                variant,
+                signals,
+                max_batch_sec=args.max_batch_sec,
+                precision=precision,
+            )
+            best = min(best, time.perf_counter() - started)
+        latency[name] = best
+
+    baseline = results["fp32"]
+    output: dict[str, object] = {
+        "samples": len(signals),
+        "audio_sec": round(sum(int(s.shape[-1]) for s in signals) / 16000.0, 3),
+        "load_sec": round(load_sec, 3),
+        "export_load_sec": round(export_sec, 3),
+    }
+    for name in variants:
+        preds = results[name]
+        entry: dict[str, object] = {
+            "latency_sec": round(latency[name], 4),
+            "speedup_vs_fp32": round(latency["fp32"] / max(1e-9, latency[name]), 2),
+            "agree_with_fp32": sum(1 for a, b in zip(baseline, preds) if a[0] == b[0]),
+            "max_score_delta": round(max(abs(a[1] - b[1]) for a, b in zip(baseline, preds)), 5),
+        }
+        if expected:
+            correct = sum(
+                1
+                for path, (label, _) in zip(wavs, preds)
+                if expected.get(os.path.basename(path)) == _label_to_code(label)
+            )
+            entry["accuracy"] = f"{correct}/{sum(1 for p in wavs if os.path.basename(p) in expected)}"
+        output[name] = entry
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import time
+
+from rayado.models import Chunk, Span
+from rayado.overlap import overlap_judge
+
+WORDS = ["오늘은", "날씨가", "정말", "좋네요", "let's", "go", "alpha", "beta", "gamma", "delta"]
+
+
+def _episode(span_count: int, spans_per_chunk: int, seed: int) -> tuple[list[Chunk], list[Span]]:
+    """Chunks of 30 s with 6 s overlaps; every span sits inside a seam window."""
+    rng = random.Random(seed)
+    chunks: list[Chunk] = []
+    spans: list[Span] = []
+    chunk_sec, overlap_sec = 30.0, 6.0
+    chunk_count = max(1, span_count // spans_per_chunk)
+    for c in range(chunk_count):
+        t0 = max(0.0, c * chunk_sec - overlap_sec)
+        t1 = (c + 1) * chunk_sec
+        chunk_id = f"C{c + 1:05d}"
+        chunks.append(Chunk(chunk_id, t0, t1, overlap_sec if c else 0.0, overlap_sec))
+        for idx in range(spans_per_chunk):
+            seam_start = t0 if idx % 2 else t1 - overlap_sec
+            start = seam_start + rng.uniform(0.0, overlap_sec - 1.0)
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))
+            spans.append(Span(f"S{len(spans) + 1:06d}", start, start + rng.uniform(0.3, 1.5), chunk_id, text, rng.random()))
+    return chunks, spans
+
+
+def _nested_loop_judge(chunks: list[Chunk], spans: list[Span]) -> tuple[list[dict], list[str]]:
+    """The previous implementation: every left x right pair, re-tokenized per pair."""
+
+    def tokenize(text: str) -> list[str]:
+        return [tok for tok in re.sub(r"[^\w\s]", " ", text.lower()).split() if tok]
+
+    by_chunk: dict[str, list[Span]] = {}
+    for span in spans:
+        by_chunk.setdefault(span.chunk_id, []).append(span)
+    records: list[dict] = []
+    suppressed: list[str] = []
+    for left, right in zip(chunks, chunks[1:]):
+        l0, l1 = max(0.0, left.t1 - left.overlap_right), left.t1
+        r0, r1 = right.t0, right.t0 + right.overlap_left
+        for lspan in by_chunk.get(left.chunk_id, []):
+            if lspan.t1 < l0 or lspan.t0 > l1:
+                continue
+            for rspan in by_chunk.get(right.chunk_id, []):
+                if rspan.t1 < r0 or rspan.t0 > r1:
+                    continue
+                inter = max(0.0, min(lspan.t1, rspan.t1) - max(lspan.t0, rspan.t0))
+                union = max(lspan.t1, rspan.t1) - min(lspan.t0, rspan.t0)
+                if inter <= 0 or inter / union < 0.30:
+                    continue
+                a, b = set(tokenize(lspan.text_raw)), set(tokenize(rspan.text_raw))
+                sim = len(a & b) / max(1, len(a | b)) if a and b else 0.0
+                if sim < 0.70:
+                    continue
+                keep_left = lspan.asr_conf >= rspan.asr_conf
+                records.append({"left_sid": lspan.sid, "right_sid": rspan.sid})
+                suppressed.append(rspan.sid if keep_left else lspan.sid)
+    return records, suppressed
+
+
+def _time(fn, *args) -> tuple[float, tuple]:
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the sweep-line overlap_judge against the nested loop")
+    parser.add_argument("--spans", type=int, default=10000, help="Total spans in the synthetic episode")
+    parser.add_argument("--spans-per-chunk", type=int, default=400, help="Spans per chunk (all inside overlap windows)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    chunks, spans = _episode(args.spans, args.spans_per_chunk, args.seed)
+    sweep_sec, (records, suppressed) = _time(overlap_judge, chunks, spans)
+    nested_sec, (nested_records, nested_suppressed) = _time(_nested_loop_judge, chunks, spans)
+    assert [(r["left_sid"], r["right_sid"]) for r in records] == [
+        (r["left_sid"], r["right_sid"]) for r in nested_records
+    ]
+    assert suppressed == nested_suppressed
+    print(
+        json.dumps(
+            {
+                "spans": len(spans),
+                "chunks": len(chunks),
+                "overlaps": len(records),
+                "sweep_sec": round(sweep_sec, 4),
+                "nested_loop_sec": round(nested_sec, 4),
+                "speedup": round(nested_sec / sweep_sec, 1) if sweep_sec else None,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from rayado.models import Span
+from rayado.tables import SpanTable, WordTable
+
+WORDS = ["오늘은", "날씨가", "정말", "좋네요", "let's", "go", "alpha", "beta", "gamma", "delta"]
+
+
+def _episode(span_count: int, words_per_span: int, seed: int) -> tuple[list[Span], dict[str, list[dict]]]:
+    """Spans and Deepgram-shaped word dicts as they arrive from the cache (fresh strings per record)."""
+    rng = random.Random(seed)
+    spans: list[Span] = []
+    words_by_chunk: dict[str, list[dict]] = {}
+    for idx in range(span_count):
+        chunk_id = "".join(["C", f"{idx // 200 + 1:05d}"])
+        start = idx * 2.0
+        tokens = [rng.choice(WORDS) for _ in range(words_per_span)]
+        spans.append(Span(f"S{idx + 1:06d}", start, start + 1.5, chunk_id, " ".join(tokens), rng.random()))
+        for pos, token in enumerate(tokens):
+            words_by_chunk.setdefault(chunk_id, []).append(
+                {
+                    "word": "".join([token]),
+                    "punctuated_word": "".join([token, "." if pos == len(tokens) - 1 else ""]),
+                    "start": start + pos * 0.2,
+                    "end": start + pos * 0.2 + 0.15,
+                    "confidence": rng.random(),
+                    "speaker": 0,
+                    "speaker_confidence": rng.random(),
+                }
+            )
+    return spans, words_by_chunk
+
+
+def _to_tables(spans: list[Span], words_by_chunk: dict[str, list[dict]]) -> tuple[SpanTable, dict[str, WordTable]]:
+    word_tables = {chunk_id: WordTable.from_words(words) for chunk_id, words in words_by_chunk.items()}
+    return SpanTable.from_spans(spans), word_tables
+
+
+def _measure(build) -> tuple[int, object]:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare heap held by Span/word-dict lists and SpanTable/WordTable")
+    parser.add_argument("--spans", type=int, default=100000, help="Spans in the synthetic episode")
+    parser.add_argument("--words-per-span", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    objects_bytes, (spans, words_by_chunk) = _measure(lambda: _episode(args.spans, args.words_per_span, args.seed))
+    # Built from a fresh episode so the strings the pools keep are counted too.
+    tables_bytes, (table, word_tables) = _measure(
+        lambda: _to_tables(*_episode(args.spans, args.words_per_span, args.seed))
+    )
+    assert table.to_spans() == spans
+    word_count = sum(len(words) for words in word_tables.values())
+    print(
+        json.dumps(
+            {
+                "spans": len(spans),
+                "words": word_count,
+                "objects_mb": round(objects_bytes / 2**20, 1),
+                "tables_mb": round(tables_bytes / 2**20, 1),
+                "ratio": round(objects_bytes / tables_bytes, 1) if tables_bytes else None,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
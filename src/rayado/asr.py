@@ -8,6 +8,7 @@ from typing import List, Optional
 from .cache import Cache
 from .ffmpeg_tools import extract_audio_segment
 from .models import Chunk, Span
+from .stats import StageTracer, stage_span
 from .utils import sha256_hex
 
 
@@ -26,6 +27,7 @@ def transcribe_chunk(
     cache: Optional[Cache],
     span_start_id: int,
     audio_bytes: Optional[bytes] = None,
+    tracer: Optional[StageTracer] = None,
 ) -> tuple[List[Span], Optional[dict]]:
     request_body = {
         "provider": provider,
@@ -38,7 +40,8 @@ def transcribe_chunk(
     cache_key = _make_cache_key(input_hash, chunk, provider, params)
 
     if cache:
-        cached = cache.get(cache_key, request_hash)
+        with stage_span(tracer, "cache_lookup", chunk_id=chunk.chunk_id):
+            cached = cache.get(cache_key, request_hash)
         if cached is not None:
             cached_meta = cached.get("meta") if isinstance(cached, dict) else None
             spans_cached = [
@@ -57,17 +60,18 @@ def transcribe_chunk(
     spans: List[Span] = []
     payload: dict = {}
     if provider == "mock":
-        sid = f"S{span_start_id:05d}"
-        spans.append(
-            Span(
-                sid=sid,
-                t0=chunk.t0,
-                t1=chunk.t1,
-                chunk_id=chunk.chunk_id,
-                text_raw=f"[mock] {chunk.chunk_id}",
-                asr_conf=0.5,
+        with stage_span(tracer, "request", chunk_id=chunk.chunk_id):
+            sid = f"S{span_start_id:05d}"
+            spans.append(
+                Span(
+                    sid=sid,
+                    t0=chunk.t0,
+                    t1=chunk.t1,
+                    chunk_id=chunk.chunk_id,
+                    text_raw=f"[mock] {chunk.chunk_id}",
+                    asr_conf=0.5,
+                )
             )
-        )
     elif provider == "noop":
         spans = []
     elif provider == "deepgram":
@@ -117,52 +121,59 @@ def transcribe_chunk(
             method="POST",
         )
         try:
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                payload = json.loads(resp.read().decode("utf-8"))
+            with stage_span(tracer, "request", chunk_id=chunk.chunk_id):
+                with urllib.request.urlopen(req, timeout=60) as resp:
+                    body = resp.read()
         except Exception as exc:  # noqa: BLE001 - surface as runtime error
             raise RuntimeError(f"Deepgram request failed: {exc}") from exc
 
-        channel = (payload.get("results", {}).get("channels") or [{}])[0]
-        alt = (channel.get("alternatives") or [{}])[0]
-        transcript = (alt.get("transcript") or "").strip()
-        words = alt.get("words") or []
-        confidence = float(alt.get("confidence") or 0.0)
-        detected_language = channel.get("detected_language")
-        language_confidence = channel.get("language_confidence")
-
-        if not transcript and words:
-            lang = (detected_language or "").lower()
-            separator = "" if lang.startswith(("zh", "ja", "ko")) else " "
-            tokens = []
-            for word in words:
-                token = (word.get("punctuated_word") or word.get("word") or "").strip()
-                if token:
-                    tokens.append(token)
-            transcript = separator.join(tokens).strip()
-
-        if transcript and words:
-            start_time = chunk.t0 + float(words[0].get("start", 0.0))
-            end_time = chunk.t0 + float(words[-1].get("end", 0.0))
-        else:
-            start_time = chunk.t0
-            end_time = chunk.t1
-
-        if transcript:
-            sid = f"S{span_start_id:05d}"
-            spans.append(
-                Span(
-                    sid=sid,
-                    t0=round(start_time, 3),
-                    t1=round(end_time, 3),
-                    chunk_id=chunk.chunk_id,
-                    text_raw=transcript,
-                    asr_conf=confidence,
+        with stage_span(tracer, "parse", chunk_id=chunk.chunk_id):
+            try:
+                payload = json.loads(body.decode("utf-8"))
+            except ValueError as exc:
+                raise RuntimeError(f"Deepgram request failed: {exc}") from exc
+
+            channel = (payload.get("results", {}).get("channels") or [{}])[0]
+            alt = (channel.get("alternatives") or [{}])[0]
+            transcript = (alt.get("transcript") or "").strip()
+            words = alt.get("words") or []
+            confidence = float(alt.get("confidence") or 0.0)
+            detected_language = channel.get("detected_language")
+            language_confidence = channel.get("language_confidence")
+
+            if not transcript and words:
+                lang = (detected_language or "").lower()
+                separator = "" if lang.startswith(("zh", "ja", "ko")) else " "
+                tokens = []
+                for word in words:
+                    token = (word.get("punctuated_word") or word.get("word") or "").strip()
+                    if token:
+                        tokens.append(token)
+                transcript = separator.join(tokens).strip()
+
+            if transcript and words:
+                start_time = chunk.t0 + float(words[0].get("start", 0.0))
+                end_time = chunk.t0 + float(words[-1].get("end", 0.0))
+            else:
+                start_time = chunk.t0
+                end_time = chunk.t1
+
+            if transcript:
+                sid = f"S{span_start_id:05d}"
+                spans.append(
+                    Span(
+                        sid=sid,
+                        t0=round(start_time, 3),
+                        t1=round(end_time, 3),
+                        chunk_id=chunk.chunk_id,
+                        text_raw=transcript,
+                        asr_conf=confidence,
+                    )
                 )
-            )
 
-        payload["_rayado_detected_language"] = detected_language
-        payload["_rayado_language_confidence"] = language_confidence
-        payload["_rayado_words"] = words
+            payload["_rayado_detected_language"] = detected_language
+            payload["_rayado_language_confidence"] = language_confidence
+            payload["_rayado_words"] = words
     else:
         raise ValueError(f"Unsupported provider: {provider}")
 
@@ -175,23 +186,24 @@ def transcribe_chunk(
         }
 
     if cache is not None:
-        cache.set(
-            cache_key,
-            request_hash,
-            {
-                "spans": [
-                    {
-                        "sid": span.sid,
-                        "t0": span.t0,
-                        "t1": span.t1,
-                        "chunk_id": span.chunk_id,
-                        "text_raw": span.text_raw,
-                        "asr_conf": span.asr_conf,
-                    }
-                    for span in spans
-                ],
-                "meta": meta,
-            },
-        )
+        with stage_span(tracer, "cache_store", chunk_id=chunk.chunk_id):
+            cache.set(
+                cache_key,
+                request_hash,
+                {
+                    "spans": [
+                        {
+                            "sid": span.sid,
+                            "t0": span.t0,
+                            "t1": span.t1,
+                            "chunk_id": span.chunk_id,
+                            "text_raw": span.text_raw,
+                            "asr_conf": span.asr_conf,
+                        }
+                        for span in spans
+                    ],
+                    "meta": meta,
+                },
+            )
 
     return spans, meta
@@ -1,15 +1,92 @@
 ﻿from __future__ import annotations
 
+import gzip
 import json
 import os
 import sqlite3
+import threading
 import time
-from typing import Any, Optional
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from typing import Any, Dict, Iterator, Optional, Tuple
 
 from .utils import ensure_dir
 
+# Column layout per table; every backend stores records with exactly these fields.
+TABLES: Dict[str, Tuple[str, ...]] = {
+    "asr_cache": ("request_hash", "response", "created_at"),
+    "llm_cache": ("model", "prompt_hash", "input_hash", "response", "created_at"),
+}
 
-class Cache:
+BACKENDS = ("sqlite", "fs", "http")
+
+OUTCOMES = ("hit", "miss_absent", "miss_drift", "write")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+class CacheStats:
+    """Thread-safe per-table outcome counters and get/put latency histograms."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._latency: Dict[str, Dict[str, list[int]]] = {}
+
+    def record(self, table: str, outcome: str, latency_sec: float) -> None:
+        op = "put" if outcome == "write" else "get"
+        latency_ms = latency_sec * 1000.0
+        bucket = len(LATENCY_BUCKETS_MS)
+        for idx, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                bucket = idx
+                break
+        with self._lock:
+            counts = self._counts.setdefault(table, {name: 0 for name in OUTCOMES})
+            counts[outcome] += 1
+            hist = self._latency.setdefault(table, {}).setdefault(op, [0] * (len(LATENCY_BUCKETS_MS) + 1))
+            hist[bucket] += 1
+
+    def count(self, table: str, outcome: str) -> int:
+        with self._lock:
+            return self._counts.get(table, {}).get(outcome, 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            payload: Dict[str, Any] = {}
+            for table, counts in self._counts.items():
+                lookups = counts["hit"] + counts["miss_absent"] + counts["miss_drift"]
+                payload[table] = {
+                    **counts,
+                    "hit_rate": round(counts["hit"] / lookups, 4) if lookups else None,
+                    "latency_ms": {
+                        op: {
+                            "buckets": list(LATENCY_BUCKETS_MS) + ["inf"],
+                            "counts": list(hist),
+                        }
+                        for op, hist in self._latency.get(table, {}).items()
+                    },
+                }
+            return payload
+
+
+class CacheBackend:
+    """Key/value store for cache records: (table, key) -> {column: value}."""
+
+    def get(self, table: str, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put(self, table: str, key: str, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def items(self, table: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        raise NotImplementedError
+
+
+class SqliteCacheBackend(CacheBackend):
     def __init__(self, path: str) -> None:
         self.path = path
         ensure_dir(os.path.dirname(path))
@@ -30,24 +107,243 @@ class Cache:
             conn.execute(
                 "CREATE INDEX IF NOT EXISTS idx_asr_cache_request_hash ON asr_cache (request_hash)"
             )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                  key TEXT PRIMARY KEY,
+                  model TEXT NOT NULL,
+                  prompt_hash TEXT NOT NULL,
+                  input_hash TEXT NOT NULL,
+                  response TEXT NOT NULL,
+                  created_at INTEGER NOT NULL
+                )
+                """
+            )
 
-    def get(self, key: str, request_hash: str) -> Optional[dict[str, Any]]:
+    def get(self, table: str, key: str) -> Optional[Dict[str, Any]]:
+        columns = TABLES[table]
         with sqlite3.connect(self.path) as conn:
             row = conn.execute(
-                "SELECT response, request_hash FROM asr_cache WHERE key = ?",
+                f"SELECT {', '.join(columns)} FROM {table} WHERE key = ?",
                 (key,),
             ).fetchone()
         if not row:
             return None
-        response_json, stored_hash = row
-        if stored_hash != request_hash:
-            return None
-        return json.loads(response_json)
+        return dict(zip(columns, row))
 
-    def set(self, key: str, request_hash: str, response: dict[str, Any]) -> None:
-        payload = json.dumps(response, ensure_ascii=False)
+    def put(self, table: str, key: str, record: Dict[str, Any]) -> None:
+        columns = TABLES[table]
+        placeholders = ", ".join("?" for _ in range(len(columns) + 1))
         with sqlite3.connect(self.path) as conn:
             conn.execute(
-                "INSERT OR REPLACE INTO asr_cache (key, request_hash, response, created_at) VALUES (?, ?, ?, ?)",
-                (key, request_hash, payload, int(time.time())),
+                f"INSERT OR REPLACE INTO {table} (key, {', '.join(columns)}) VALUES ({placeholders})",
+                (key, *[record[col] for col in columns]),
             )
+
+    def items(self, table: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        columns = TABLES[table]
+        with sqlite3.connect(self.path) as conn:
+            rows = conn.execute(f"SELECT key, {', '.join(columns)} FROM {table} ORDER BY key").fetchall()
+        for row in rows:
+            yield row[0], dict(zip(columns, row[1:]))
+
+
+class FsCacheBackend(CacheBackend):
+    """One JSON file per record under <root>/<table>/<k0k1>/<k2k3>/<key>.json.
+
+    Writes go to a unique temp file in the target directory followed by an
+    atomic rename, so concurrent writers on a shared (NFS) mount never expose
+    a partial record to readers.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        ensure_dir(root)
+
+    def _path(self, table: str, key: str) -> str:
+        return os.path.join(self.root, table, key[:2], key[2:4], f"{key}.json")
+
+    def get(self, table: str, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(table, key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, table: str, key: str, record: Dict[str, Any]) -> None:
+        path = self._path(table, key)
+        ensure_dir(os.path.dirname(path))
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def items(self, table: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        table_dir = os.path.join(self.root, table)
+        for dirpath, dirnames, filenames in os.walk(table_dir):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if not name.endswith(".json"):
+                    continue
+                key = name[: -len(".json")]
+                record = self.get(table, key)
+                if record is not None:
+                    yield key, record
+
+
+class HttpCacheBackend(CacheBackend):
+    """Plain HTTP key/value store: GET/PUT <base_url>/<table>/<key> with a JSON body.
+
+    The cache is an optimization, so an unreachable server degrades to a miss
+    instead of failing the run.
+    """
+
+    def __init__(self, base_url: str, *, timeout: float = 10.0) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _url(self, table: str, key: str) -> str:
+        return f"{self.base_url}/{urllib.parse.quote(table)}/{urllib.parse.quote(key)}"
+
+    def get(self, table: str, key: str) -> Optional[Dict[str, Any]]:
+        req = urllib.request.Request(url=self._url(table, key), method="GET")
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read().decode("utf-8"))
+        except (urllib.error.URLError, OSError, ValueError):
+            return None
+
+    def put(self, table: str, key: str, record: Dict[str, Any]) -> None:
+        req = urllib.request.Request(
+            url=self._url(table, key),
+            data=json.dumps(record, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="PUT",
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+        except (urllib.error.URLError, OSError):
+            return
+
+    def items(self, table: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        raise RuntimeError("HTTP cache backend does not support listing; export from a sqlite or fs node")
+
+
+class Cache:
+    def __init__(self, path: str = "", *, backend: Optional[CacheBackend] = None) -> None:
+        self.path = path
+        self.backend = backend if backend is not None else SqliteCacheBackend(path)
+        self.stats = CacheStats()
+
+    @property
+    def llm_hits(self) -> int:
+        return self.stats.count("llm_cache", "hit")
+
+    @property
+    def llm_misses(self) -> int:
+        return self.stats.count("llm_cache", "miss_absent")
+
+    def get(self, key: str, request_hash: str) -> Optional[dict[str, Any]]:
+        started = time.perf_counter()
+        record = self.backend.get("asr_cache", key)
+        elapsed = time.perf_counter() - started
+        if not record:
+            self.stats.record("asr_cache", "miss_absent", elapsed)
+            return None
+        if record["request_hash"] != request_hash:
+            self.stats.record("asr_cache", "miss_drift", elapsed)
+            return None
+        self.stats.record("asr_cache", "hit", elapsed)
+        return json.loads(record["response"])
+
+    def set(self, key: str, request_hash: str, response: dict[str, Any]) -> None:
+        payload = json.dumps(response, ensure_ascii=False)
+        started = time.perf_counter()
+        self.backend.put(
+            "asr_cache",
+            key,
+            {"request_hash": request_hash, "response": payload, "created_at": int(time.time())},
+        )
+        self.stats.record("asr_cache", "write", time.perf_counter() - started)
+
+    def get_text(self, key: str) -> Optional[str]:
+        started = time.perf_counter()
+        record = self.backend.get("llm_cache", key)
+        elapsed = time.perf_counter() - started
+        if not record:
+            self.stats.record("llm_cache", "miss_absent", elapsed)
+            return None
+        self.stats.record("llm_cache", "hit", elapsed)
+        return record["response"]
+
+    def set_text(self, key: str, *, model: str, prompt_hash: str, input_hash: str, response: str) -> None:
+        started = time.perf_counter()
+        self.backend.put(
+            "llm_cache",
+            key,
+            {
+                "model": model,
+                "prompt_hash": prompt_hash,
+                "input_hash": input_hash,
+                "response": response,
+                "created_at": int(time.time()),
+            },
+        )
+        self.stats.record("llm_cache", "write", time.perf_counter() - started)
+
+
+def open_cache(cache_dir: str, *, backend: str = "sqlite", url: Optional[str] = None) -> Cache:
+    if backend == "sqlite":
+        path = os.path.join(cache_dir, "cache.sqlite")
+        return Cache(path)
+    if backend == "fs":
+        root = url or os.path.join(cache_dir, "store")
+        return Cache(root, backend=FsCacheBackend(root))
+    if backend == "http":
+        if not url:
+            raise ValueError("HTTP cache backend requires a URL")
+        return Cache(url, backend=HttpCacheBackend(url))
+    raise ValueError(f"Unsupported cache backend: {backend}")
+
+
+def export_bundle(cache: Cache, bundle_path: str) -> int:
+    """Write every record as gzip-compressed JSONL; returns the record count.
+
+    The bundle is written to a temp name and renamed on success, so a backend
+    that cannot list its records leaves no truncated bundle behind.
+    """
+    count = 0
+    ensure_dir(os.path.dirname(bundle_path) or ".")
+    tmp_path = f"{bundle_path}.tmp"
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for table in TABLES:
+                for key, record in cache.backend.items(table):
+                    f.write(json.dumps({"table": table, "key": key, "record": record}, ensure_ascii=False))
+                    f.write("\n")
+                    count += 1
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, bundle_path)
+    return count
+
+
+def import_bundle(cache: Cache, bundle_path: str) -> int:
+    count = 0
+    with gzip.open(bundle_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            table = item.get("table")
+            if table not in TABLES:
+                continue
+            cache.backend.put(table, item["key"], item["record"])
+            count += 1
+    return count
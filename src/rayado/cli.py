@@ -3,13 +3,24 @@
 import argparse
 import os
 import sys
+import time
+from typing import Optional
 
+from .cache import BACKENDS, OUTCOMES, Cache, export_bundle, import_bundle, open_cache
+from .gcl import FRAME_SIZE, build_index, compress_gcl
+from .journal import PartialRunError
 from .phase1 import run_phase1
 from .phase2 import run_phase2
 from .phase3 import run_phase3
+from .replay import compact_gcl, load_state, write_outputs
+from .stats import append_run_record, now, read_run_records
 from .utils import ensure_dir
 
 
+# Exit status when outputs were written but some chunks failed (see --keep-going).
+EXIT_PARTIAL = 3
+
+
 def _default_srt_path(input_path: str) -> str:
     base = os.path.splitext(os.path.basename(input_path))[0]
     return os.path.join("out", f"{base}.srt")
@@ -20,6 +31,10 @@ def _default_txt_path(input_path: str) -> str:
     return os.path.join("out", f"{base}.txt")
 
 
+def _trace_path(out_path: str) -> str:
+    return f"{os.path.splitext(out_path)[0]}.trace.json"
+
+
 def _default_graph_path(srt_path: str) -> str:
     base = os.path.splitext(os.path.basename(srt_path))[0]
     return os.path.join("out", f"{base}.graph.txt")
@@ -36,6 +51,75 @@ def _default_merge_graph_path(graph_a: str, graph_b: str) -> str:
     return os.path.join("out", f"{base_a}__{base_b}.merged.graph.txt")
 
 
+def _add_cache_backend_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache-backend",
+        choices=BACKENDS,
+        default="sqlite",
+        help="Cache backend (sqlite file, sharded fs store, or HTTP key-value)",
+    )
+    parser.add_argument(
+        "--cache-url",
+        default=None,
+        help="HTTP base URL (http backend) or store root (fs backend)",
+    )
+
+
+def _llm_cache(args: argparse.Namespace) -> Optional[Cache]:
+    if not args.cache:
+        return None
+    return open_cache(args.cache_dir, backend=args.cache_backend, url=args.cache_url)
+
+
+def _cache_report(cache: Optional[Cache]) -> str:
+    if cache is None:
+        return "off"
+    # Per-outcome counts; a single label would hide mixed runs.
+    return ",".join(f"{outcome}:{cache.stats.count('llm_cache', outcome)}" for outcome in OUTCOMES)
+
+
+def _record_llm_run(args: argparse.Namespace, cache: Optional[Cache], *, input_path: str, started_at: float) -> None:
+    if cache is None:
+        return
+    append_run_record(
+        os.path.join(args.cache_dir, "runs.jsonl"),
+        {
+            "command": args.command,
+            "input": input_path,
+            "started_at": started_at,
+            "ended_at": now(),
+            "cache": cache.stats.to_dict(),
+        },
+    )
+
+
+def _print_cache_stats(cache_dir: str, *, last: int) -> None:
+    records = read_run_records(os.path.join(cache_dir, "runs.jsonl"))
+    if not records:
+        print(f"No runs recorded in {cache_dir}")
+        return
+    totals: dict[str, dict[str, int]] = {}
+    for record in records[-last:] if last > 0 else records:
+        started = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.get("started_at", 0)))
+        for table, counts in (record.get("cache") or {}).items():
+            total = totals.setdefault(table, {"hit": 0, "miss_absent": 0, "miss_drift": 0, "write": 0})
+            for name in total:
+                total[name] += int(counts.get(name, 0))
+            print(
+                f"{started} {record.get('command', '')} {record.get('input', '')} {table} "
+                f"hit={counts.get('hit', 0)} miss_absent={counts.get('miss_absent', 0)} "
+                f"miss_drift={counts.get('miss_drift', 0)} write={counts.get('write', 0)} "
+                f"hit_rate={counts.get('hit_rate')}"
+            )
+    for table, total in totals.items():
+        lookups = total["hit"] + total["miss_absent"] + total["miss_drift"]
+        rate = round(total["hit"] / lookups, 4) if lookups else None
+        print(
+            f"TOTAL {table} hit={total['hit']} miss_absent={total['miss_absent']} "
+            f"miss_drift={total['miss_drift']} write={total['write']} hit_rate={rate}"
+        )
+
+
 def main() -> None:
     argv = sys.argv[1:]
     if argv and argv[0] == "transcribe":
@@ -45,7 +129,7 @@ def main() -> None:
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     p1 = subparsers.add_parser("phase1", help="Transcription phase (audio -> SRT)")
-    p1.add_argument("input", help="Path to local media file")
+    p1.add_argument("input", nargs="+", help="Path(s) to local media file(s)")
     p1.add_argument("--out", dest="out_srt", default=None, help="Output SRT path")
     p1.add_argument("--concurrency", type=int, default=64, help="Concurrency")
     p1.add_argument("--retry", type=int, default=1, help="Retry count (max 1)")
@@ -55,6 +139,7 @@ def main() -> None:
         default=os.path.join(".cache", "rayado"),
         help="Cache directory",
     )
+    _add_cache_backend_args(p1)
     p1.add_argument("--vad-threshold", type=float, default=-30.0, help="VAD noise threshold in dB")
     p1.add_argument("--vad-min-speech-sec", type=float, default=0.6, help="Min speech segment length")
     p1.add_argument("--vad-merge-gap-sec", type=float, default=0.3, help="Merge gap length")
@@ -68,6 +153,57 @@ def main() -> None:
         help="SpeechBrain model cache directory",
     )
     p1.add_argument("--lid-device", default="cpu", help="LID device (cpu/cuda)")
+    p1.add_argument(
+        "--lid-max-batch-sec",
+        type=float,
+        default=0.0,
+        help="Max padded audio seconds per LID forward pass (0 = single batch)",
+    )
+    p1.add_argument(
+        "--lid-mode",
+        choices=("fixed", "sequential"),
+        default="fixed",
+        help="fixed: vote over 5 samples; sequential: stop early once the vote margin is clear",
+    )
+    p1.add_argument("--lid-max-samples", type=int, default=9, help="Sample cap for sequential LID")
+    p1.add_argument("--lid-margin", type=float, default=0.75, help="Vote margin that stops sequential LID")
+    p1.add_argument(
+        "--lid-precision",
+        choices=("fp32", "bf16"),
+        default="fp32",
+        help="LID inference precision (bf16 autocast is faster on CPUs with AVX512-BF16/AMX)",
+    )
+    p1.add_argument(
+        "--lid-runtime",
+        choices=("eager", "export"),
+        default="eager",
+        help="export: run LID from an AOT-compiled torch.export artifact cached under --lid-cache-dir (CPU, fp32)",
+    )
+    p1.add_argument(
+        "--lid-process",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Run LID in a separate process while chunks are extracted and hashed",
+    )
+    p1.add_argument("--lid-threads", type=int, default=0, help="Torch threads for the LID process (0 = default)")
+    p1.add_argument(
+        "--keep-going",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Mark failed chunks as gaps and finish the episode instead of aborting",
+    )
+    p1.add_argument(
+        "--resume",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Continue an interrupted run from its journal (reuses chunk plan, language and finished chunks)",
+    )
+    p1.add_argument(
+        "--trace",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Write per-chunk stage spans as Chrome trace JSON next to the output (<base>.trace.json)",
+    )
     p1.add_argument(
         "--txt-only",
         action=argparse.BooleanOptionalAction,
@@ -82,6 +218,18 @@ def main() -> None:
     p2.add_argument("--graph-out", default=None, help="Output object graph file")
     p2.add_argument("--model-graph", default="gpt-5-mini", help="Model for object graph")
     p2.add_argument("--retry", type=int, default=1, help="Retry count (max 1)")
+    p2.add_argument(
+        "--cache-dir",
+        default=os.path.join(".cache", "rayado"),
+        help="Cache directory",
+    )
+    p2.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Reuse stored graph output for identical model/prompt/input",
+    )
+    _add_cache_backend_args(p2)
 
     p3 = subparsers.add_parser("phase3", help="Merge two S-ORAL graphs")
     p3.add_argument("--graph-a", required=True, help="Input graph A")
@@ -90,13 +238,69 @@ def main() -> None:
     p3.add_argument("--out", dest="graph_out", default=None, help="Output merged graph file")
     p3.add_argument("--model", default="gpt-5-mini", help="Model for merge")
     p3.add_argument("--retry", type=int, default=1, help="Retry count (max 1)")
+    p3.add_argument(
+        "--cache-dir",
+        default=os.path.join(".cache", "rayado"),
+        help="Cache directory",
+    )
+    p3.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Reuse stored merge output for identical model/prompt/input",
+    )
+    _add_cache_backend_args(p3)
+
+    pc = subparsers.add_parser("cache", help="Cache maintenance (stats, bundle export/import)")
+    pc_sub = pc.add_subparsers(dest="cache_command", required=True)
+    pc_export = pc_sub.add_parser("export", help="Export all cache records to a bundle")
+    pc_export.add_argument("bundle", help="Bundle path (.jsonl.gz)")
+    pc_import = pc_sub.add_parser("import", help="Seed the cache from a bundle")
+    pc_import.add_argument("bundle", help="Bundle path (.jsonl.gz)")
+    pc_stats = pc_sub.add_parser("stats", help="Show per-run cache hit/miss counters")
+    pc_stats.add_argument(
+        "--cache-dir",
+        default=os.path.join(".cache", "rayado"),
+        help="Cache directory",
+    )
+    pc_stats.add_argument("--last", type=int, default=20, help="Number of recent runs to show (0 = all)")
+    for sub in (pc_export, pc_import):
+        sub.add_argument(
+            "--cache-dir",
+            default=os.path.join(".cache", "rayado"),
+            help="Cache directory",
+        )
+        _add_cache_backend_args(sub)
+
+    pr = subparsers.add_parser("replay", help="Rebuild transcript/SRT from an episode GCL log")
+    pr.add_argument("gcl", help="Path to episode.gcl")
+    pr.add_argument("--out-dir", default=None, help="Output directory (default: GCL directory)")
+
+    pg = subparsers.add_parser("gcl", help="GCL log maintenance (index, compact, archive)")
+    pg_sub = pg.add_subparsers(dest="gcl_command", required=True)
+    pg_index = pg_sub.add_parser("index", help="Rebuild the <gcl>.idx block index")
+    pg_index.add_argument("gcl", help="Path to episode.gcl")
+    pg_compact = pg_sub.add_parser("compact", help="Write a resolved-state snapshot (<gcl>.snap.json)")
+    pg_compact.add_argument("gcl", help="Path to episode.gcl")
+    pg_compress = pg_sub.add_parser("compress", help="Archive as independently compressed frames")
+    pg_compress.add_argument("gcl", help="Path to episode.gcl")
+    pg_compress.add_argument("--out", default=None, help="Output path (default: <gcl>.gz)")
+    pg_compress.add_argument(
+        "--frame-size",
+        type=int,
+        default=FRAME_SIZE,
+        help="Uncompressed bytes per frame",
+    )
 
     args = parser.parse_args(argv)
 
     if args.command == "phase1":
-        input_path = args.input
-        if not os.path.exists(input_path):
-            print(f"Input not found: {input_path}", file=sys.stderr)
+        for input_path in args.input:
+            if not os.path.exists(input_path):
+                print(f"Input not found: {input_path}", file=sys.stderr)
+                sys.exit(1)
+        if args.out_srt and len(args.input) > 1:
+            print("--out requires a single input", file=sys.stderr)
             sys.exit(1)
         if args.retry > 1:
             print("Retry is capped at 1; using 1.", file=sys.stderr)
@@ -104,31 +308,57 @@ def main() -> None:
         if args.concurrency < 1:
             print("Concurrency must be >= 1", file=sys.stderr)
             sys.exit(1)
-        if args.txt_only:
-            out_srt_path = args.out_srt or _default_txt_path(input_path)
-        else:
-            out_srt_path = args.out_srt or _default_srt_path(input_path)
-        ensure_dir(os.path.dirname(out_srt_path))
-
-        detected = run_phase1(
-            input_path=input_path,
-            out_srt_path=out_srt_path,
-            cache_dir=args.cache_dir,
-            concurrency=args.concurrency,
-            retry=args.retry,
-            deepgram_model=args.deepgram_model,
-            vad_threshold=args.vad_threshold,
-            vad_min_speech_sec=args.vad_min_speech_sec,
-            vad_merge_gap_sec=args.vad_merge_gap_sec,
-            vad_pad_sec=args.vad_pad_sec,
-            vad_min_silence_sec=args.vad_min_silence_sec,
-            target_sec=args.target_sec,
-            max_sec=args.max_sec,
-            lid_cache_dir=args.lid_cache_dir,
-            lid_device=args.lid_device,
-            output_txt_only=args.txt_only,
-        )
-        print(f"Language={detected} Output={out_srt_path}")
+
+        partial = False
+        # One process for all inputs keeps the LID classifier warm between episodes.
+        for input_path in args.input:
+            if args.txt_only:
+                out_srt_path = args.out_srt or _default_txt_path(input_path)
+            else:
+                out_srt_path = args.out_srt or _default_srt_path(input_path)
+            ensure_dir(os.path.dirname(out_srt_path))
+
+            try:
+                detected = run_phase1(
+                    input_path=input_path,
+                    out_srt_path=out_srt_path,
+                    cache_dir=args.cache_dir,
+                    concurrency=args.concurrency,
+                    retry=args.retry,
+                    deepgram_model=args.deepgram_model,
+                    vad_threshold=args.vad_threshold,
+                    vad_min_speech_sec=args.vad_min_speech_sec,
+                    vad_merge_gap_sec=args.vad_merge_gap_sec,
+                    vad_pad_sec=args.vad_pad_sec,
+                    vad_min_silence_sec=args.vad_min_silence_sec,
+                    target_sec=args.target_sec,
+                    max_sec=args.max_sec,
+                    lid_cache_dir=args.lid_cache_dir,
+                    lid_device=args.lid_device,
+                    lid_max_batch_sec=args.lid_max_batch_sec,
+                    lid_mode=args.lid_mode,
+                    lid_max_samples=args.lid_max_samples,
+                    lid_margin=args.lid_margin,
+                    lid_precision=args.lid_precision,
+                    lid_runtime=args.lid_runtime,
+                    lid_process=args.lid_process,
+                    lid_threads=args.lid_threads,
+                    output_txt_only=args.txt_only,
+                    cache_backend=args.cache_backend,
+                    cache_url=args.cache_url,
+                    resume=args.resume,
+                    keep_going=args.keep_going,
+                    trace_path=_trace_path(out_srt_path) if args.trace else None,
+                )
+            except PartialRunError as exc:
+                partial = True
+                failed = ",".join(sorted(exc.failed))
+                print(f"Language={exc.language} Output={out_srt_path} Failed={failed}")
+                print(f"Retry failed chunks with --resume: {input_path}", file=sys.stderr)
+                continue
+            print(f"Language={detected} Output={out_srt_path}")
+        if partial:
+            sys.exit(EXIT_PARTIAL)
 
     if args.command == "phase2":
         srt_path = args.srt
@@ -142,6 +372,8 @@ def main() -> None:
         graph_out = args.graph_out or _default_graph_path(srt_path)
         ensure_dir(os.path.dirname(graph_out))
 
+        cache = _llm_cache(args)
+        started_at = now()
         run_phase2(
             srt_path=srt_path,
             prompt_path=args.prompt,
@@ -149,8 +381,10 @@ def main() -> None:
             graph_out_path=graph_out,
             model_graph=args.model_graph,
             retry=args.retry,
+            cache=cache,
         )
-        print(f"Output={graph_out}")
+        _record_llm_run(args, cache, input_path=srt_path, started_at=started_at)
+        print(f"Output={graph_out} Cache={_cache_report(cache)}")
 
     if args.command == "phase3":
         graph_a = args.graph_a
@@ -166,6 +400,8 @@ def main() -> None:
             args.retry = 1
         graph_out = args.graph_out or _default_merge_graph_path(graph_a, graph_b)
         ensure_dir(os.path.dirname(graph_out))
+        cache = _llm_cache(args)
+        started_at = now()
         run_phase3(
             graph_a_path=graph_a,
             graph_b_path=graph_b,
@@ -173,8 +409,54 @@ def main() -> None:
             graph_out_path=graph_out,
             model=args.model,
             retry=args.retry,
+            cache=cache,
         )
-        print(f"Output={graph_out}")
+        _record_llm_run(args, cache, input_path=graph_a, started_at=started_at)
+        print(f"Output={graph_out} Cache={_cache_report(cache)}")
+
+    if args.command == "replay":
+        if not os.path.exists(args.gcl):
+            print(f"GCL not found: {args.gcl}", file=sys.stderr)
+            sys.exit(1)
+        state = load_state(args.gcl)
+        out_dir = args.out_dir or os.path.dirname(os.path.abspath(args.gcl))
+        write_outputs(state, out_dir)
+        visible = len(state.spans.keys() - state.suppressed)
+        print(f"Blocks={state.block_count} Spans={visible} Suppressed={len(state.suppressed)} Output={out_dir}")
+
+    if args.command == "gcl":
+        if not os.path.exists(args.gcl):
+            print(f"GCL not found: {args.gcl}", file=sys.stderr)
+            sys.exit(1)
+        if args.gcl_command == "index":
+            count = build_index(args.gcl)
+            print(f"Blocks={count} Index={args.gcl}.idx")
+        if args.gcl_command == "compact":
+            state = compact_gcl(args.gcl)
+            print(f"Blocks={state.block_count} Offset={state.offset} Snapshot={args.gcl}.snap.json")
+        if args.gcl_command == "compress":
+            out_path = args.out or f"{args.gcl}.gz"
+            frames = compress_gcl(args.gcl, out_path, frame_size=args.frame_size)
+            print(f"Frames={frames} Output={out_path} Index={out_path}.idx")
+
+    if args.command == "cache":
+        if args.cache_command == "stats":
+            _print_cache_stats(args.cache_dir, last=args.last)
+            return
+        cache = open_cache(args.cache_dir, backend=args.cache_backend, url=args.cache_url)
+        if args.cache_command == "export":
+            try:
+                count = export_bundle(cache, args.bundle)
+            except RuntimeError as exc:
+                print(f"Cache export failed: {exc}", file=sys.stderr)
+                sys.exit(1)
+            print(f"Exported={count} Bundle={args.bundle}")
+        if args.cache_command == "import":
+            if not os.path.exists(args.bundle):
+                print(f"Bundle not found: {args.bundle}", file=sys.stderr)
+                sys.exit(1)
+            count = import_bundle(cache, args.bundle)
+            print(f"Imported={count} Bundle={args.bundle}")
 
 
 if __name__ == "__main__":
@@ -1,31 +1,356 @@
 ﻿from __future__ import annotations
 
+import gzip
+import io
+import json
 import os
-from typing import Dict, Iterable
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+GCL_HEADER = "GCL_HDR\nver 0.2\nmode append_only\ntime_unit seconds_float\n\n"
+
+# never: leave durability to the OS; flush: fsync on every explicit flush();
+# always: flush and fsync after every block.
+FSYNC_POLICIES = ("never", "flush", "always")
+
+# Block fields copied into the sidecar index next to type/offset/end.
+INDEX_FIELDS = ("chunk_id", "sid", "t0", "t1")
+
+# Uncompressed bytes per independently compressed frame in archived logs.
+FRAME_SIZE = 1 << 20
+
+
+def format_block(block_type: str, fields: Dict[str, str]) -> str:
+    lines = [block_type]
+    lines.extend(f"{key} {value}" for key, value in fields.items())
+    return "\n".join(lines) + "\n\n"
+
+
+def index_path(path: str) -> str:
+    return f"{path}.idx"
+
+
+def _index_entry(block_type: str, fields: Dict[str, str], offset: int, end: int) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {"type": block_type, "offset": offset, "end": end}
+    for key in INDEX_FIELDS:
+        value = fields.get(key)
+        if value:
+            entry[key] = float(value) if key in ("t0", "t1") else value
+    return entry
 
 
 def ensure_header(path: str) -> None:
     if os.path.exists(path) and os.path.getsize(path) > 0:
         return
     with open(path, "a", encoding="utf-8") as f:
-        f.write("GCL_HDR\n")
-        f.write("ver 0.2\n")
-        f.write("mode append_only\n")
-        f.write("time_unit seconds_float\n\n")
+        f.write(GCL_HEADER)
 
 
 def append_block(path: str, block_type: str, fields: Dict[str, str]) -> None:
     with open(path, "a", encoding="utf-8") as f:
-        f.write(f"{block_type}\n")
-        for key, value in fields.items():
-            f.write(f"{key} {value}\n")
-        f.write("\n")
+        f.write(format_block(block_type, fields))
 
 
 def append_blocks(path: str, blocks: Iterable[tuple[str, Dict[str, str]]]) -> None:
     with open(path, "a", encoding="utf-8") as f:
         for block_type, fields in blocks:
-            f.write(f"{block_type}\n")
-            for key, value in fields.items():
-                f.write(f"{key} {value}\n")
-            f.write("\n")
+            f.write(format_block(block_type, fields))
+
+
+class GclWriter:
+    """Append-only GCL writer that keeps a single buffered handle open.
+
+    The file is opened in binary append mode so `offset` is the exact byte
+    position of the next block. Blocks reach the OS on `flush()`, when the
+    buffer fills, or on `close()`; `fsync` selects when they reach disk.
+    With `index=True` every block also gets a line in the `<path>.idx`
+    sidecar (see `load_index`).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        buffer_size: int = 1 << 16,
+        fsync: str = "never",
+        index: bool = False,
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unsupported fsync policy: {fsync}")
+        self.path = path
+        self.fsync = fsync
+        self.blocks_written = 0
+        self._f: Optional[io.BufferedWriter] = open(path, "ab", buffering=buffer_size)
+        self._idx: Optional[io.BufferedWriter] = None
+        if self._f.tell() == 0:
+            self._f.write(GCL_HEADER.encode("utf-8"))
+        if index:
+            self._f.flush()
+            if _last_index_end(path) != self._f.tell():
+                build_index(path)
+            self._idx = open(index_path(path), "ab", buffering=buffer_size)
+
+    @property
+    def offset(self) -> int:
+        return self._handle().tell()
+
+    def _handle(self) -> io.BufferedWriter:
+        if self._f is None:
+            raise RuntimeError(f"GCL writer is closed: {self.path}")
+        return self._f
+
+    def write_block(self, block_type: str, fields: Dict[str, str]) -> int:
+        """Append one block and return its starting byte offset."""
+        f = self._handle()
+        start = f.tell()
+        data = format_block(block_type, fields).encode("utf-8")
+        f.write(data)
+        if self._idx is not None:
+            entry = _index_entry(block_type, fields, start, start + len(data))
+            self._idx.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.blocks_written += 1
+        if self.fsync == "always":
+            self._sync()
+        return start
+
+    def write_blocks(self, blocks: Iterable[tuple[str, Dict[str, str]]]) -> None:
+        for block_type, fields in blocks:
+            self.write_block(block_type, fields)
+
+    def flush(self) -> None:
+        self._handle()
+        if self.fsync == "never":
+            self._flush_handles()
+        else:
+            self._sync()
+
+    def _flush_handles(self) -> None:
+        # Log before index, so an index entry never points past the log end.
+        for handle in (self._f, self._idx):
+            if handle is not None:
+                handle.flush()
+
+    def _sync(self) -> None:
+        self._flush_handles()
+        for handle in (self._f, self._idx):
+            if handle is not None:
+                os.fsync(handle.fileno())
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._f.close()
+            self._f = None
+            if self._idx is not None:
+                self._idx.close()
+                self._idx = None
+
+    def __enter__(self) -> "GclWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+# Not frozen: one instance per block is created on the replay hot path.
+@dataclass(slots=True)
+class GclBlock:
+    block_type: str
+    fields: Dict[str, str]
+    offset: int
+    end: int
+
+
+def open_log(path: str) -> io.BufferedIOBase:
+    # Archived logs are multi-member gzip; offsets stay in uncompressed bytes.
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _parse_block(raw: bytes, offset: int, end: int) -> GclBlock:
+    lines = raw.decode("utf-8").split("\n")
+    fields: Dict[str, str] = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(" ")
+        fields[key] = value
+    return GclBlock(lines[0], fields, offset, end)
+
+
+def iter_blocks(path: str, *, start_offset: int = 0, read_size: int = 1 << 20) -> Iterator[GclBlock]:
+    """Yield blocks in file order, holding only one read buffer in memory.
+
+    `offset`/`end` are byte positions, so `end` of the last block consumed is
+    a valid `start_offset` for resuming later. A trailing block without its
+    terminating blank line (torn write) is not yielded.
+    """
+    with open_log(path) as f:
+        f.seek(start_offset)
+        base = start_offset
+        buf = b""
+        while True:
+            data = f.read(read_size)
+            if not data:
+                return
+            buf += data
+            pos = 0
+            while True:
+                while pos < len(buf) and buf[pos] == 0x0A:
+                    pos += 1
+                sep = buf.find(b"\n\n", pos)
+                if sep < 0:
+                    break
+                yield _parse_block(buf[pos:sep], base + pos, base + sep + 2)
+                pos = sep + 2
+            base += pos
+            buf = buf[pos:]
+
+
+def _last_index_end(path: str) -> Optional[int]:
+    try:
+        with open(index_path(path), "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 4096))
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    if not lines:
+        return None
+    try:
+        return int(json.loads(lines[-1])["end"])
+    except (ValueError, KeyError):
+        return None
+
+
+def build_index(path: str) -> int:
+    """(Re)build the `.idx` sidecar of a plain log from its blocks."""
+    count = 0
+    tmp_path = f"{index_path(path)}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for block in iter_blocks(path):
+            entry = _index_entry(block.block_type, block.fields, block.offset, block.end)
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp_path, index_path(path))
+    return count
+
+
+def load_index(path: str) -> List[Dict[str, Any]]:
+    """Read the sidecar index, dropping entries the log does not fully contain.
+
+    Each line is `{"type", "offset", "end"}` plus any of chunk_id/sid/t0/t1;
+    offsets are uncompressed byte positions in the log. Archived logs
+    (see `compress_gcl`) add `frame`, `frame_size` and `frame_base`.
+    """
+    entries: List[Dict[str, Any]] = []
+    limit = None if path.endswith(".gz") else os.path.getsize(path)
+    with open(index_path(path), "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            entry = json.loads(line)
+            if limit is not None and entry["end"] > limit:
+                break
+            entries.append(entry)
+    return entries
+
+
+def _entry_matches(
+    entry: Dict[str, Any],
+    *,
+    t0: Optional[float],
+    t1: Optional[float],
+    chunk_id: Optional[str],
+    block_types: Optional[Iterable[str]],
+) -> bool:
+    if block_types is not None and entry["type"] not in block_types:
+        return False
+    if chunk_id is not None and entry.get("chunk_id") != chunk_id:
+        return False
+    if t0 is not None or t1 is not None:
+        if "t0" not in entry or "t1" not in entry:
+            return False
+        if t1 is not None and entry["t0"] >= t1:
+            return False
+        if t0 is not None and entry["t1"] <= t0:
+            return False
+    return True
+
+
+def seek_blocks(
+    path: str,
+    *,
+    t0: Optional[float] = None,
+    t1: Optional[float] = None,
+    chunk_id: Optional[str] = None,
+    block_types: Optional[Iterable[str]] = None,
+) -> Iterator[GclBlock]:
+    """Yield only the blocks selected through the index, in log order.
+
+    Time filters keep blocks whose [t0, t1) overlaps the window; blocks
+    without times are excluded when a window is given. For archived logs
+    each needed frame is decompressed once.
+    """
+    types = set(block_types) if block_types is not None else None
+    entries = [
+        entry
+        for entry in load_index(path)
+        if _entry_matches(entry, t0=t0, t1=t1, chunk_id=chunk_id, block_types=types)
+    ]
+    if not entries:
+        return
+    with open(path, "rb") as f:
+        frame_key = None
+        frame_data = b""
+        for entry in entries:
+            if "frame" in entry:
+                if entry["frame"] != frame_key:
+                    f.seek(entry["frame"])
+                    frame_data = gzip.decompress(f.read(entry["frame_size"]))
+                    frame_key = entry["frame"]
+                start = entry["offset"] - entry["frame_base"]
+                raw = frame_data[start : start + entry["end"] - entry["offset"]]
+            else:
+                f.seek(entry["offset"])
+                raw = f.read(entry["end"] - entry["offset"])
+            yield _parse_block(raw[:-2], entry["offset"], entry["end"])
+
+
+def compress_gcl(path: str, out_path: str, *, frame_size: int = FRAME_SIZE) -> int:
+    """Archive a plain log as independently gzip-compressed frames.
+
+    Frames hold whole blocks and are concatenated gzip members, so the output
+    is still a valid `.gz` stream for `iter_blocks`/`gzip.open`. The output
+    gets its own `.idx` with frame locations; returns the number of frames.
+    """
+    frames = 0
+    with open(path, "rb") as src, open(out_path, "wb") as dst, open(
+        index_path(out_path), "w", encoding="utf-8"
+    ) as idx:
+        pending: List[Dict[str, Any]] = []
+        frame_base = 0
+
+        def write_frame(frame_end: int) -> None:
+            nonlocal frames, frame_base
+            src.seek(frame_base)
+            member = gzip.compress(src.read(frame_end - frame_base), mtime=0)
+            frame_offset = dst.tell()
+            dst.write(member)
+            for entry in pending:
+                entry.update({"frame": frame_offset, "frame_size": len(member), "frame_base": frame_base})
+                idx.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            pending.clear()
+            frame_base = frame_end
+            frames += 1
+
+        for block in iter_blocks(path):
+            pending.append(_index_entry(block.block_type, block.fields, block.offset, block.end))
+            if block.end - frame_base >= frame_size:
+                write_frame(block.end)
+        if pending:
+            write_frame(pending[-1]["end"])
+    return frames
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from .models import Chunk, Span
+from .tables import SpanLike
+from .utils import ensure_dir
+
+JOURNAL_VERSION = 1
+
+
+class PartialRunError(RuntimeError):
+    """Outputs were written, but some chunks failed and are marked as gaps."""
+
+    def __init__(self, failed: Dict[str, str], *, language: str = "") -> None:
+        super().__init__(f"{len(failed)} chunk(s) failed: {', '.join(sorted(failed))}")
+        self.failed = failed
+        self.language = language
+
+
+def journal_path(cache_dir: str, input_path: str, out_path: str) -> str:
+    key = hashlib.sha256(f"{os.path.abspath(input_path)}\n{os.path.abspath(out_path)}".encode("utf-8")).hexdigest()
+    base = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(cache_dir, "journal", f"{base}.{key[:12]}.jsonl")
+
+
+def input_fingerprint(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def span_to_dict(span: SpanLike) -> Dict[str, Any]:
+    return {"t0": span.t0, "t1": span.t1, "text_raw": span.text_raw, "asr_conf": span.asr_conf}
+
+
+@dataclass
+class JournalState:
+    plan: Dict[str, Any]
+    chunks: List[Chunk]
+    language: str = ""
+    completed: Dict[str, List[Span]] = field(default_factory=dict)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+    def matches(self, *, fingerprint: Dict[str, Any], settings: Dict[str, Any]) -> bool:
+        return (
+            self.plan.get("version") == JOURNAL_VERSION
+            and self.plan.get("input") == fingerprint
+            and self.plan.get("settings") == settings
+        )
+
+
+def load_journal(path: str) -> Optional[JournalState]:
+    """Rebuild run state from a journal; a torn trailing line is ignored."""
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    state: Optional[JournalState] = None
+    with f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            event = json.loads(line)
+            kind = event.get("event")
+            if kind == "plan":
+                chunks = [Chunk(chunk_id, t0, t1, 0.0, 0.0) for chunk_id, t0, t1 in event["chunks"]]
+                state = JournalState(plan=event, chunks=chunks)
+            elif state is None:
+                continue
+            elif kind == "language":
+                state.language = event["language"]
+            elif kind == "chunk":
+                chunk_id = event["chunk_id"]
+                state.completed[chunk_id] = [
+                    Span(sid="", chunk_id=chunk_id, **span) for span in event["spans"]
+                ]
+                state.failed.pop(chunk_id, None)
+            elif kind == "chunk_failed":
+                # Not completed, so --resume retries it.
+                state.failed[event["chunk_id"]] = event.get("error", "")
+    return state
+
+
+class RunJournal:
+    """Append-only JSONL journal of one run: plan, language, finished chunks.
+
+    Every event is flushed and fsynced before `record` returns, so whatever a
+    crash or SIGINT leaves behind can be resumed from.
+    """
+
+    def __init__(self, path: str, *, fresh: bool) -> None:
+        self.path = path
+        ensure_dir(os.path.dirname(path))
+        self._f = open(path, "w" if fresh else "a", encoding="utf-8")
+
+    def record(self, event: str, **payload: Any) -> None:
+        self._f.write(json.dumps({"event": event, **payload}, ensure_ascii=False) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def record_plan(self, *, fingerprint: Dict[str, Any], settings: Dict[str, Any], chunks: List[Chunk]) -> None:
+        self.record(
+            "plan",
+            version=JOURNAL_VERSION,
+            input=fingerprint,
+            settings=settings,
+            chunks=[[chunk.chunk_id, chunk.t0, chunk.t1] for chunk in chunks],
+        )
+
+    def record_chunk(self, chunk_id: str, spans: Sequence[SpanLike]) -> None:
+        """Spans are stored without sids: output ids are numbered in plan order at render time."""
+        self.record("chunk", chunk_id=chunk_id, spans=[span_to_dict(span) for span in spans])
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+    def remove(self) -> None:
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
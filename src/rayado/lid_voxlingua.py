@@ -1,13 +1,47 @@
 from __future__ import annotations
 
+import contextlib
+import hashlib
+import multiprocessing
 import os
 import re
+import struct
+import sys
+import threading
+import time
+import warnings
 import wave
 from array import array
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
-import torch
+if TYPE_CHECKING:
+    import torch
+
+LID_SOURCE = "speechbrain/lang-id-voxlingua107-ecapa"
+LID_SAMPLE_RATE = 16000
+LID_PRECISIONS = ("fp32", "bf16")
+# eager: the SpeechBrain modules as loaded; export: a torch.export of the same
+# forward pass, compiled ahead of time with AOTInductor and cached on disk.
+LID_RUNTIMES = ("eager", "export")
+
+# Shape range of the exported graph. Batches outside it run on the eager
+# modules, which reject inputs too short for ECAPA's padding anyway.
+EXPORT_MIN_SAMPLES = 640
+EXPORT_MAX_BATCH = 256
+# First torch release with `aoti_compile_and_package(program, package_path=...)`
+# and `aoti_load_package`; older versions run LID eagerly.
+EXPORT_MIN_TORCH = (2, 6)
+
+# Loaded classifiers keyed by (source, device, runtime); one load per process,
+# shared across episodes when phase1 runs in batch/daemon mode.
+_CLASSIFIERS: Dict[Tuple[str, str, str], Any] = {}
+_CLASSIFIERS_LOCK = threading.Lock()
+_PATCHED = False
+
+_LID_POOL: Optional[ProcessPoolExecutor] = None
+_LID_POOL_LOCK = threading.Lock()
 
 
 def _patch_torchaudio_backend() -> None:
@@ -62,6 +96,8 @@ def _patch_speechbrain_fetch() -> None:
 
 
 def _load_wav_tensor(path: str) -> torch.Tensor:
+    import torch
+
     with wave.open(path, "rb") as wf:
         n_channels = wf.getnchannels()
         sampwidth = wf.getsampwidth()
@@ -85,6 +121,65 @@ def _load_wav_tensor(path: str) -> torch.Tensor:
     return samples.unsqueeze(0)
 
 
+@dataclass(frozen=True)
+class PcmAudio:
+    source: str
+    samples: torch.Tensor  # int16, shape (frames,) for mono or (frames, channels)
+    sample_rate: int
+
+
+def load_pcm(path: str) -> PcmAudio:
+    """Read a 16-bit PCM WAV into one buffer; segments are later taken as views of it."""
+    import torch
+
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise RuntimeError(f"Not a RIFF/WAVE file: {path}")
+        channels = 0
+        sample_rate = 0
+        bits = 0
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise RuntimeError(f"WAV data chunk not found: {path}")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                audio_format, channels, sample_rate = struct.unpack("<HHI", fmt[:8])
+                bits = struct.unpack("<H", fmt[14:16])[0]
+                if audio_format not in (1, 0xFFFE) or bits != 16:
+                    raise RuntimeError(f"Unsupported WAV encoding (format={audio_format}, bits={bits})")
+                continue
+            if chunk_id == b"data":
+                if not channels:
+                    raise RuntimeError(f"WAV fmt chunk missing before data: {path}")
+                remaining = os.fstat(f.fileno()).st_size - f.tell()
+                size = min(chunk_size, remaining)
+                size -= size % (2 * channels)
+                buffer = bytearray(size)
+                f.readinto(buffer)
+                break
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    samples = torch.frombuffer(buffer, dtype=torch.int16) if buffer else torch.zeros(0, dtype=torch.int16)
+    if channels > 1:
+        samples = samples.view(-1, channels)
+    return PcmAudio(source=path, samples=samples, sample_rate=sample_rate)
+
+
+def segment_signal(audio: PcmAudio, start: float, end: float) -> torch.Tensor:
+    import torch
+
+    first = max(0, int(round(start * audio.sample_rate)))
+    last = min(int(audio.samples.shape[0]), int(round(end * audio.sample_rate)))
+    view = audio.samples[first:max(first, last)]
+    signal = view.to(torch.float32) / 32768.0
+    if signal.dim() > 1:
+        signal = signal.mean(dim=1)
+    return signal
+
+
 @dataclass(frozen=True)
 class LidSample:
     path: str
@@ -129,46 +224,492 @@ def _pick_samples(paths: List[str]) -> List[str]:
     return chosen
 
 
-def detect_language_voxlingua(
-    wav_paths: List[str],
-    *,
-    cache_dir: str,
-    device: str = "cpu",
-) -> Tuple[str, Dict[str, float], List[LidSample]]:
+def _apply_patches() -> None:
+    global _PATCHED
+    if _PATCHED:
+        return
     _patch_torchaudio_backend()
     _patch_huggingface_hub()
     _patch_speechbrain_fetch()
+    _PATCHED = True
+
+
+def _load_classifier(*, cache_dir: str, device: str, source: str) -> Any:
+    _apply_patches()
 
     from speechbrain.inference.classifiers import EncoderClassifier
     from speechbrain.utils import fetching as sb_fetching
 
-    classifier = EncoderClassifier.from_hparams(
-        source="speechbrain/lang-id-voxlingua107-ecapa",
+    return EncoderClassifier.from_hparams(
+        source=source,
         savedir=cache_dir,
         run_opts={"device": device},
         local_strategy=sb_fetching.LocalStrategy.COPY,
     )
 
-    samples = _pick_samples(wav_paths)
-    votes: Dict[str, int] = {}
-    weights: Dict[str, float] = {}
-    details: List[LidSample] = []
 
-    for path in samples:
-        with torch.no_grad():
-            signal = _load_wav_tensor(path)
-            prediction = classifier.classify_batch(signal)
-        score = float(prediction[1].exp().squeeze().item())
-        label = prediction[3][0] if prediction[3] else ""
-        code = _label_to_code(label)
+def get_classifier(
+    *,
+    cache_dir: str,
+    device: str = "cpu",
+    source: str = LID_SOURCE,
+    runtime: str = "eager",
+) -> Tuple[Any, float]:
+    """Return the shared classifier and its load time in seconds (0.0 when already warm).
 
-        votes[code] = votes.get(code, 0) + 1
-        weights[code] = weights.get(code, 0.0) + score
-        details.append(LidSample(path=path, language=code, score=score, label=label))
+    With `runtime="export"` the load time includes building the compiled
+    artifact the first time it is needed for these weights. When torch is
+    too old for AOTInductor packages or the export fails, a warning is issued
+    and the eager classifier is used for the rest of the process.
+    """
+    if runtime not in LID_RUNTIMES:
+        raise ValueError(f"Unsupported LID runtime: {runtime}")
+    if runtime == "export" and device != "cpu":
+        raise ValueError("The exported LID runtime is CPU-only")
+    key = (source, device, runtime)
+    with _CLASSIFIERS_LOCK:
+        classifier = _CLASSIFIERS.get(key)
+        if classifier is not None:
+            return classifier, 0.0
+
+        started = time.perf_counter()
+        eager_key = (source, device, "eager")
+        eager = _CLASSIFIERS.get(eager_key)
+        if eager is None:
+            eager = _CLASSIFIERS[eager_key] = _load_classifier(cache_dir=cache_dir, device=device, source=source)
+        classifier = eager
+        if runtime == "export":
+            try:
+                _aoti()
+                path, _ = export_classifier(eager, cache_dir=cache_dir, source=source)
+                classifier = ExportedClassifier(eager, _load_compiled(path), path=path)
+            except Exception as exc:  # noqa: BLE001
+                warnings.warn(f"Exported LID runtime unavailable, using eager: {exc}", RuntimeWarning, stacklevel=2)
+        _CLASSIFIERS[key] = classifier
+        return classifier, time.perf_counter() - started
+
+
+def _lid_forward(classifier: Any) -> torch.nn.Module:
+    """`classify_batch` up to the log posteriors, as one module that torch.export can trace."""
+    import torch
+
+    mods = classifier.mods
+
+    class LidForward(torch.nn.Module):
+        def __init__(self) -> None:
+            super().__init__()
+            self.compute_features = mods.compute_features
+            self.mean_var_norm = mods.mean_var_norm
+            self.embedding_model = mods.embedding_model
+            self.classifier = mods.classifier
+
+        def forward(self, wavs: torch.Tensor, wav_lens: torch.Tensor) -> torch.Tensor:
+            feats = self.compute_features(wavs)
+            feats = self.mean_var_norm(feats, wav_lens)
+            embeddings = self.embedding_model(feats, wav_lens)
+            return self.classifier(embeddings).squeeze(1)
+
+    return LidForward().eval()
+
+
+def _broadcast_length_to_mask(
+    length: torch.Tensor,
+    max_len: Optional[int] = None,
+    dtype: Optional[torch.dtype] = None,
+    device: Optional[torch.device] = None,
+) -> torch.Tensor:
+    import torch
+
+    if max_len is None:
+        max_len = int(length.max().long().item())
+    mask = torch.arange(max_len, device=length.device, dtype=length.dtype)[None, :] < length[:, None]
+    return mask.to(dtype=dtype or length.dtype, device=device or length.device)
+
+
+@contextlib.contextmanager
+def _export_friendly_masks(module: torch.nn.Module) -> Iterator[None]:
+    # SpeechBrain's length_to_mask sizes the mask with len(lengths), which pins
+    # the batch dimension during export; swap in a broadcasting equivalent.
+    patched = []
+    for sub in module.modules():
+        owner = sys.modules.get(type(sub).__module__)
+        if owner is not None and hasattr(owner, "length_to_mask") and all(owner is not m for m, _ in patched):
+            patched.append((owner, owner.length_to_mask))
+    for owner, _ in patched:
+        owner.length_to_mask = _broadcast_length_to_mask
+    try:
+        yield
+    finally:
+        for owner, original in patched:
+            owner.length_to_mask = original
+
+
+def _export_program(classifier: Any) -> Any:
+    """torch.export of the classifier with dynamic batch and time dimensions."""
+    import torch
+
+    module = _lid_forward(classifier)
+    # Batch 2, not 1: export specializes dimensions whose example size is 1.
+    wavs = torch.randn(2, 4 * LID_SAMPLE_RATE)
+    wav_lens = torch.tensor([1.0, 0.75])
+    batch = torch.export.Dim("batch", min=1, max=EXPORT_MAX_BATCH)
+    frames = torch.export.Dim("time", min=EXPORT_MIN_SAMPLES)
+    with torch.no_grad(), _export_friendly_masks(module):
+        return torch.export.export(
+            module,
+            (wavs, wav_lens),
+            dynamic_shapes={"wavs": {0: batch, 1: frames}, "wav_lens": {0: batch}},
+        )
+
+
+def _weights_fingerprint(classifier: Any, source: str) -> str:
+    import torch
+
+    digest = hashlib.sha256(f"{source}\n{torch.__version__}\n".encode("utf-8"))
+    for name, tensor in _lid_forward(classifier).state_dict().items():
+        digest.update(name.encode("utf-8"))
+        digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _aoti() -> Any:
+    """`torch._inductor`, checked for the AOTInductor package entry points this module calls."""
+    import torch
+
+    version = tuple(int(part) for part in re.findall(r"\d+", torch.__version__)[:2])
+    if version < EXPORT_MIN_TORCH:
+        raise RuntimeError(f"torch {torch.__version__} is older than {'.'.join(map(str, EXPORT_MIN_TORCH))}")
+    import torch._inductor as inductor
+
+    if not hasattr(inductor, "aoti_compile_and_package") or not hasattr(inductor, "aoti_load_package"):
+        raise RuntimeError(f"torch {torch.__version__} lacks the AOTInductor package API")
+    return inductor
+
+
+def _compile_program(program: Any, package_path: str) -> None:
+    _aoti().aoti_compile_and_package(program, package_path=package_path)
+
+
+def _load_compiled(path: str) -> Any:
+    return _aoti().aoti_load_package(path)
+
+
+def export_classifier(classifier: Any, *, cache_dir: str, source: str = LID_SOURCE) -> Tuple[str, bool]:
+    """Build (or reuse) the compiled LID artifact under `cache_dir`; returns (path, built).
+
+    The artifact is keyed by the weights and the torch version, so a model or
+    torch upgrade builds a new one instead of loading a stale graph.
+    """
+    export_dir = os.path.join(cache_dir, "export")
+    path = os.path.join(export_dir, f"lid-{_weights_fingerprint(classifier, source)[:16]}.pt2")
+    if os.path.exists(path):
+        return path, False
+    os.makedirs(export_dir, exist_ok=True)
+    tmp_path = f"{path[:-4]}.tmp.pt2"
+    try:
+        _compile_program(_export_program(classifier), tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path, True
+
+
+class ExportedClassifier:
+    """`classify_batch` backed by the compiled artifact; out-of-range shapes run eagerly."""
+
+    def __init__(self, eager: Any, runner: Any, *, path: str) -> None:
+        self.eager = eager
+        self.runner = runner
+        self.path = path
+        self.device = getattr(eager, "device", "cpu")
+
+    def classify_batch(self, wavs: torch.Tensor, wav_lens: Optional[torch.Tensor] = None) -> Tuple[Any, ...]:
+        import torch
+
+        if wavs.dim() == 1:
+            wavs = wavs.unsqueeze(0)
+        if wav_lens is None:
+            wav_lens = torch.ones(wavs.shape[0])
+        if wavs.shape[-1] < EXPORT_MIN_SAMPLES or wavs.shape[0] > EXPORT_MAX_BATCH:
+            return self.eager.classify_batch(wavs, wav_lens)
+        out_prob = self.runner(wavs.float(), wav_lens.float())
+        score, index = torch.max(out_prob, dim=-1)
+        return out_prob, score, index, self.eager.hparams.label_encoder.decode_torch(index)
+
+
+def clear_classifiers() -> None:
+    with _CLASSIFIERS_LOCK:
+        _CLASSIFIERS.clear()
+
+
+def _plan_batches(lengths: List[int], *, max_batch_samples: int) -> List[List[int]]:
+    # Length-sorted so each batch pads to a similar length; a batch is closed once
+    # its padded size (rows x longest row) would exceed the budget.
+    order = sorted(range(len(lengths)), key=lambda idx: (lengths[idx], idx))
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for idx in order:
+        padded = (len(current) + 1) * lengths[idx]
+        if current and max_batch_samples > 0 and padded > max_batch_samples:
+            batches.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def classify_signals(
+    classifier: Any,
+    signals: List[torch.Tensor],
+    *,
+    max_batch_sec: float = 0.0,
+    sample_rate: int = LID_SAMPLE_RATE,
+    precision: str = "fp32",
+) -> List[Tuple[str, float]]:
+    """Classify 1-D signals in padded batches; returns (label, score) per signal in input order."""
+    import torch
+
+    if precision not in LID_PRECISIONS:
+        raise ValueError(f"Unsupported LID precision: {precision}")
+    if precision == "bf16" and isinstance(classifier, ExportedClassifier):
+        raise ValueError("bf16 LID precision needs the eager runtime")
+    device_type = "cuda" if str(getattr(classifier, "device", "cpu")).startswith("cuda") else "cpu"
+
+    results: List[Tuple[str, float]] = [("", 0.0)] * len(signals)
+    lengths = [int(signal.shape[-1]) for signal in signals]
+    max_batch_samples = int(max_batch_sec * sample_rate)
+    for batch in _plan_batches(lengths, max_batch_samples=max_batch_samples):
+        longest = max(1, max(lengths[idx] for idx in batch))
+        wavs = torch.zeros((len(batch), longest), dtype=torch.float32)
+        for row, idx in enumerate(batch):
+            wavs[row, : lengths[idx]] = signals[idx]
+        wav_lens = torch.tensor([lengths[idx] / longest for idx in batch], dtype=torch.float32)
+        # bf16 autocast runs the ECAPA convolutions on the CPU's bf16/AMX units;
+        # fbank features and the returned scores stay fp32.
+        autocast = (
+            torch.autocast(device_type=device_type, dtype=torch.bfloat16)
+            if precision == "bf16"
+            else contextlib.nullcontext()
+        )
+        with torch.no_grad(), autocast:
+            prediction = classifier.classify_batch(wavs, wav_lens)
+        scores = prediction[1].float().exp().reshape(-1).tolist()
+        labels = list(prediction[3] or [])
+        for row, idx in enumerate(batch):
+            label = labels[row] if row < len(labels) else ""
+            results[idx] = (label, float(scores[row]))
+    return results
+
+
+def _vote(details: List[LidSample]) -> Tuple[str, Dict[str, float]]:
+    votes: Dict[str, int] = {}
+    weights: Dict[str, float] = {}
+    for sample in details:
+        votes[sample.language] = votes.get(sample.language, 0) + 1
+        weights[sample.language] = weights.get(sample.language, 0.0) + sample.score
 
     winner = ""
     if weights:
         winner = sorted(weights.items(), key=lambda x: (-x[1], x[0]))[0][0]
     elif votes:
         winner = sorted(votes.items(), key=lambda x: (-x[1], x[0]))[0][0]
+    return winner, weights
+
+
+def detect_language_voxlingua(
+    wav_paths: List[str],
+    *,
+    cache_dir: str,
+    device: str = "cpu",
+    timings: Optional[Dict[str, float]] = None,
+    max_batch_sec: float = 0.0,
+    precision: str = "fp32",
+    runtime: str = "eager",
+) -> Tuple[str, Dict[str, float], List[LidSample]]:
+    classifier, load_sec = get_classifier(cache_dir=cache_dir, device=device, runtime=runtime)
+    infer_started = time.perf_counter()
+
+    samples = _pick_samples(wav_paths)
+    signals = [_load_wav_tensor(path).squeeze(0) for path in samples]
+    predictions = classify_signals(classifier, signals, max_batch_sec=max_batch_sec, precision=precision)
+    details = [
+        LidSample(path=path, language=_label_to_code(label), score=score, label=label)
+        for path, (label, score) in zip(samples, predictions)
+    ]
+    winner, weights = _vote(details)
+    if timings is not None:
+        timings["load_sec"] = load_sec
+        timings["infer_sec"] = time.perf_counter() - infer_started
+    return winner, weights, details
+
+
+def detect_language_segments(
+    audio: PcmAudio,
+    segments: List[Tuple[float, float]],
+    *,
+    cache_dir: str,
+    device: str = "cpu",
+    timings: Optional[Dict[str, float]] = None,
+    max_batch_sec: float = 0.0,
+    precision: str = "fp32",
+    runtime: str = "eager",
+) -> Tuple[str, Dict[str, float], List[LidSample]]:
+    """Same vote as detect_language_voxlingua, over (start, end) ranges of decoded PCM."""
+    classifier, load_sec = get_classifier(cache_dir=cache_dir, device=device, runtime=runtime)
+    infer_started = time.perf_counter()
+
+    signals = [segment_signal(audio, start, end) for start, end in segments]
+    predictions = classify_signals(
+        classifier,
+        signals,
+        max_batch_sec=max_batch_sec,
+        sample_rate=audio.sample_rate,
+        precision=precision,
+    )
+    details = [
+        LidSample(
+            path=f"{audio.source}@{start:.3f}-{end:.3f}",
+            language=_label_to_code(label),
+            score=score,
+            label=label,
+        )
+        for (start, end), (label, score) in zip(segments, predictions)
+    ]
+    winner, weights = _vote(details)
+    if timings is not None:
+        timings["load_sec"] = load_sec
+        timings["infer_sec"] = time.perf_counter() - infer_started
     return winner, weights, details
+
+
+def _posterior_margin(details: List[LidSample]) -> float:
+    # Score-weighted lead of the best language over the runner-up, per sample
+    # classified: two agreeing 0.99 samples give 0.99, a 1-1 split gives ~0.
+    if not details:
+        return 0.0
+    _, weights = _vote(details)
+    ranked = sorted(weights.values(), reverse=True)
+    runner_up = ranked[1] if len(ranked) > 1 else 0.0
+    return (ranked[0] - runner_up) / len(details)
+
+
+def detect_language_sequential(
+    audio: PcmAudio,
+    segments: List[Tuple[float, float]],
+    *,
+    cache_dir: str,
+    device: str = "cpu",
+    timings: Optional[Dict[str, float]] = None,
+    max_batch_sec: float = 0.0,
+    precision: str = "fp32",
+    runtime: str = "eager",
+    min_samples: int = 2,
+    max_samples: int = 9,
+    step: int = 2,
+    margin: float = 0.75,
+) -> Tuple[str, Dict[str, float], List[LidSample]]:
+    """Classify segments (already in priority order) in small rounds until the margin clears `margin`."""
+    classifier, load_sec = get_classifier(cache_dir=cache_dir, device=device, runtime=runtime)
+    infer_started = time.perf_counter()
+
+    limit = min(len(segments), max(1, max_samples))
+    round_size = max(1, min_samples)
+    details: List[LidSample] = []
+    next_idx = 0
+    while next_idx < limit:
+        batch = segments[next_idx : min(limit, next_idx + round_size)]
+        next_idx += len(batch)
+        predictions = classify_signals(
+            classifier,
+            [segment_signal(audio, start, end) for start, end in batch],
+            max_batch_sec=max_batch_sec,
+            sample_rate=audio.sample_rate,
+            precision=precision,
+        )
+        for (start, end), (label, score) in zip(batch, predictions):
+            details.append(
+                LidSample(
+                    path=f"{audio.source}@{start:.3f}-{end:.3f}",
+                    language=_label_to_code(label),
+                    score=score,
+                    label=label,
+                )
+            )
+        if len(details) >= min_samples and _posterior_margin(details) >= margin:
+            break
+        round_size = max(1, step)
+
+    winner, weights = _vote(details)
+    if timings is not None:
+        timings["load_sec"] = load_sec
+        timings["infer_sec"] = time.perf_counter() - infer_started
+    return winner, weights, details
+
+
+def detect_language_wav(
+    path: str,
+    segments: List[Tuple[float, float]],
+    *,
+    sequential: bool,
+    cache_dir: str,
+    device: str = "cpu",
+    max_batch_sec: float = 0.0,
+    precision: str = "fp32",
+    runtime: str = "eager",
+    max_samples: int = 9,
+    margin: float = 0.75,
+) -> Tuple[str, Dict[str, float], List[LidSample], Dict[str, float]]:
+    """Picklable LID entry point: decode `path` once and vote over `segments`; also returns timings."""
+    timings: Dict[str, float] = {}
+    audio = load_pcm(path)
+    if sequential:
+        winner, weights, details = detect_language_sequential(
+            audio,
+            segments,
+            cache_dir=cache_dir,
+            device=device,
+            timings=timings,
+            max_batch_sec=max_batch_sec,
+            precision=precision,
+            runtime=runtime,
+            max_samples=max_samples,
+            margin=margin,
+        )
+    else:
+        winner, weights, details = detect_language_segments(
+            audio,
+            segments,
+            cache_dir=cache_dir,
+            device=device,
+            timings=timings,
+            max_batch_sec=max_batch_sec,
+            precision=precision,
+            runtime=runtime,
+        )
+    return winner, weights, details, timings
+
+
+def _init_lid_worker(threads: int) -> None:
+    if threads > 0:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def lid_process_pool(*, threads: int = 0) -> ProcessPoolExecutor:
+    """Single-worker spawn pool for LID; kept for the process lifetime so its classifier stays warm.
+
+    `threads` only applies when the pool is first created.
+    """
+    global _LID_POOL
+    with _LID_POOL_LOCK:
+        if _LID_POOL is None:
+            _LID_POOL = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_lid_worker,
+                initargs=(threads,),
+            )
+        return _LID_POOL
@@ -1,31 +1,35 @@
 ﻿from __future__ import annotations
 
+import math
 import re
-from typing import Dict, List, Tuple
+from bisect import bisect_left, bisect_right
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
 
 from .models import Chunk, Span
+from .tables import SpanLike, SpanTable, WordTable
+
+# judge: suppress whole spans by time IoU + token Jaccard;
+# stitch: align word timestamps across each seam and cut at one word boundary.
+OVERLAP_POLICIES = ("judge", "stitch")
+
+# Max distance (s) between word midpoints for the same word heard by both chunks.
+STITCH_TOLERANCE_SEC = 0.25
+
+# (t0, t1, token) with absolute times.
+TimedWord = Tuple[float, float, str]
+
+_NON_WORD = re.compile(r"[^\w\s]")
 
 
 def _tokenize(text: str) -> List[str]:
-    cleaned = re.sub(r"[^\w\s]", " ", text.lower())
+    cleaned = _NON_WORD.sub(" ", text.lower())
     return [tok for tok in cleaned.split() if tok]
 
 
-def _jaccard(a: List[str], b: List[str]) -> float:
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
     if not a or not b:
         return 0.0
-    sa, sb = set(a), set(b)
-    inter = sa & sb
-    union = sa | sb
-    return len(inter) / max(1, len(union))
-
-
-def _time_iou(a0: float, a1: float, b0: float, b1: float) -> float:
-    inter = max(0.0, min(a1, b1) - max(a0, b0))
-    if inter <= 0:
-        return 0.0
-    union = max(a1, b1) - min(a0, b0)
-    return inter / union if union > 0 else 0.0
+    return len(a & b) / max(1, len(a | b))
 
 
 def _overlap_window_left(chunk: Chunk) -> Tuple[float, float]:
@@ -36,61 +40,332 @@ def _overlap_window_right(chunk: Chunk) -> Tuple[float, float]:
     return chunk.t0, chunk.t0 + chunk.overlap_left
 
 
+def _overlapping_pairs(
+    left: List[Tuple[float, float]], right: List[Tuple[float, float]], iou_min: float
+) -> List[Tuple[int, int]]:
+    """Index pairs (i, j) of (t0, t1) bounds whose time IoU is at least `iou_min` (> 0).
+
+    Sort-and-sweep over start times: each span is only compared with the spans
+    of the other side still open when it starts, so the cost is linear in the
+    span count plus the number of overlapping pairs. Pairs come back in (i, j)
+    order, the order a nested loop over both lists visits them.
+    """
+    events = sorted(
+        [(t0, 0, idx) for idx, (t0, _) in enumerate(left)] + [(t0, 1, idx) for idx, (t0, _) in enumerate(right)]
+    )
+    bounds = (left, right)
+    active: Tuple[List[int], List[int]] = ([], [])
+    pairs: List[Tuple[int, int]] = []
+    for start, side, idx in events:
+        end = bounds[side][idx][1]
+        if end <= start:
+            continue
+        other = 1 - side
+        other_bounds = bounds[other]
+        still_open = []
+        for j in active[other]:
+            o0, o1 = other_bounds[j]
+            if o1 <= start:
+                continue
+            still_open.append(j)
+            # Time IoU; the intersection is positive because the other span is still open.
+            inter = (end if end < o1 else o1) - (start if start > o0 else o0)
+            iou = inter / ((end if end > o1 else o1) - (start if start < o0 else o0))
+            if iou >= iou_min:
+                pairs.append((idx, j) if side == 0 else (j, idx))
+        active[other][:] = still_open
+        active[side].append(idx)
+    pairs.sort()
+    return pairs
+
+
 def overlap_judge(
     chunks: List[Chunk],
-    spans: List[Span],
+    spans: Union[SpanTable, Iterable[SpanLike]],
     *,
     iou_min: float = 0.30,
     sim_min: float = 0.70,
 ) -> Tuple[List[Dict[str, str]], List[str]]:
-    spans_by_chunk: Dict[str, List[Span]] = {}
-    for span in spans:
-        spans_by_chunk.setdefault(span.chunk_id, []).append(span)
+    table = SpanTable.coerce(spans)
+    strings = table.pool.strings
+    t0s, t1s, confs, sids = table.t0, table.t1, table.asr_conf, table.sid
+    rows_by_chunk: Dict[str, List[int]] = {}
+    for row, chunk_id in enumerate(table.chunk_id):
+        rows_by_chunk.setdefault(strings[chunk_id], []).append(row)
 
     overlap_records: List[Dict[str, str]] = []
     suppressed: List[str] = []
+    # Tokenized once per distinct text, however many candidate pairs it is part of.
+    tokens: Dict[int, FrozenSet[str]] = {}
+
+    def token_set(row: int) -> FrozenSet[str]:
+        key = table.text[row]
+        cached = tokens.get(key)
+        if cached is None:
+            cached = tokens[key] = frozenset(_tokenize(strings[key]))
+        return cached
 
     for left, right in zip(chunks, chunks[1:]):
-        left_spans = spans_by_chunk.get(left.chunk_id, [])
-        right_spans = spans_by_chunk.get(right.chunk_id, [])
-        if not left_spans or not right_spans:
+        left_rows = rows_by_chunk.get(left.chunk_id, [])
+        right_rows = rows_by_chunk.get(right.chunk_id, [])
+        if not left_rows or not right_rows:
             continue
 
         l0, l1 = _overlap_window_left(left)
         r0, r1 = _overlap_window_right(right)
+        left_in = [row for row in left_rows if not (t1s[row] < l0 or t0s[row] > l1)]
+        right_in = [row for row in right_rows if not (t1s[row] < r0 or t0s[row] > r1)]
+        if not left_in or not right_in:
+            continue
 
-        for lspan in left_spans:
-            if lspan.t1 < l0 or lspan.t0 > l1:
+        if iou_min > 0:
+            candidates = _overlapping_pairs(
+                [(t0s[row], t1s[row]) for row in left_in], [(t0s[row], t1s[row]) for row in right_in], iou_min
+            )
+        else:
+            # Disjoint spans score an IoU of 0, which a zero threshold still admits.
+            candidates = [(i, j) for i in range(len(left_in)) for j in range(len(right_in))]
+        left_tokens = [token_set(row) for row in left_in]
+        right_tokens = [token_set(row) for row in right_in]
+
+        for i, j in candidates:
+            sim = _jaccard(left_tokens[i], right_tokens[j])
+            if sim < sim_min:
                 continue
-            for rspan in right_spans:
-                if rspan.t1 < r0 or rspan.t0 > r1:
-                    continue
-                iou = _time_iou(lspan.t0, lspan.t1, rspan.t0, rspan.t1)
-                if iou < iou_min:
-                    continue
-                sim = _jaccard(_tokenize(lspan.text_raw), _tokenize(rspan.text_raw))
-                if sim < sim_min:
-                    continue
-
-                if lspan.asr_conf >= rspan.asr_conf:
-                    decision = "keep_left"
-                    suppress_sid = rspan.sid
-                else:
-                    decision = "keep_right"
-                    suppress_sid = lspan.sid
-
-                overlap_records.append(
-                    {
-                        "olp_id": f"OLP_{lspan.sid}_{rspan.sid}",
-                        "left_chunk": left.chunk_id,
-                        "right_chunk": right.chunk_id,
-                        "left_sid": lspan.sid,
-                        "right_sid": rspan.sid,
-                        "decision": decision,
-                        "method": "time_iou_then_text_jaccard",
-                        "conf": f"{sim:.3f}",
-                    }
-                )
-                suppressed.append(suppress_sid)
+            lrow = left_in[i]
+            rrow = right_in[j]
+            lsid = strings[sids[lrow]]
+            rsid = strings[sids[rrow]]
+
+            if confs[lrow] >= confs[rrow]:
+                decision = "keep_left"
+                suppress_sid = rsid
+            else:
+                decision = "keep_right"
+                suppress_sid = lsid
+
+            overlap_records.append(
+                {
+                    "olp_id": f"OLP_{lsid}_{rsid}",
+                    "left_chunk": left.chunk_id,
+                    "right_chunk": right.chunk_id,
+                    "left_sid": lsid,
+                    "right_sid": rsid,
+                    "decision": decision,
+                    "method": "time_iou_then_text_jaccard",
+                    "conf": f"{sim:.3f}",
+                }
+            )
+            suppressed.append(suppress_sid)
 
     return overlap_records, suppressed
+
+
+def _timed_words(words: Union[WordTable, List[dict]], chunk: Chunk) -> List[TimedWord]:
+    words = WordTable.from_words(words)
+    timed: List[TimedWord] = []
+    for idx in range(len(words)):
+        token = words.token(idx)
+        start = words.start[idx]
+        end = words.end[idx]
+        if not token or math.isnan(start) or math.isnan(end):
+            continue
+        timed.append((chunk.t0 + start, chunk.t0 + end, token))
+    return timed
+
+
+def _is_cjk(ch: str) -> bool:
+    code = ord(ch)
+    return 0x3040 <= code <= 0x30FF or 0x4E00 <= code <= 0x9FFF or 0xAC00 <= code <= 0xD7A3 or 0x3000 <= code <= 0x303F
+
+
+def _join_words(tokens: List[str]) -> str:
+    text = ""
+    for token in tokens:
+        if text and not (_is_cjk(text[-1]) and _is_cjk(token[0])) and token[0] not in ".,?!:;。，？！":
+            text += " "
+        text += token
+    return text
+
+
+def stitch_seam(
+    left: List[TimedWord],
+    right: List[TimedWord],
+    *,
+    seam_t0: float,
+    seam_t1: float,
+    tolerance_sec: float = STITCH_TOLERANCE_SEC,
+) -> Tuple[int, int, int]:
+    """Choose one cut for the seam between two adjacent chunks.
+
+    Returns (left_end, right_start, matches): the left chunk keeps
+    `left[:left_end]` and the right chunk keeps `right[right_start:]`.
+    Words inside [seam_t0, seam_t1] are aligned with two pointers; a pair is
+    a match when the normalized tokens agree and their midpoints are within
+    `tolerance_sec`. The cut goes right after the match closest to the seam
+    centre, where both chunks have the most context. Without a match, both
+    sides are cut at the centre.
+    """
+    center = (seam_t0 + seam_t1) / 2
+    i = len(left)
+    while i > 0 and left[i - 1][1] > seam_t0:
+        i -= 1
+    right_end = 0
+    while right_end < len(right) and right[right_end][0] < seam_t1:
+        right_end += 1
+
+    j = 0
+    matches = 0
+    best: Optional[Tuple[float, int, int]] = None
+    while i < len(left) and j < right_end:
+        lmid = (left[i][0] + left[i][1]) / 2
+        rmid = (right[j][0] + right[j][1]) / 2
+        if abs(lmid - rmid) <= tolerance_sec:
+            ltok = "".join(_tokenize(left[i][2]))
+            if ltok and ltok == "".join(_tokenize(right[j][2])):
+                matches += 1
+                dist = abs((lmid + rmid) / 2 - center)
+                if best is None or dist < best[0]:
+                    best = (dist, i, j)
+                i += 1
+                j += 1
+                continue
+        if lmid < rmid:
+            i += 1
+        else:
+            j += 1
+
+    if best is not None:
+        return best[1] + 1, best[2] + 1, matches
+    left_end = len(left)
+    while left_end > 0 and (left[left_end - 1][0] + left[left_end - 1][1]) / 2 >= center:
+        left_end -= 1
+    right_start = 0
+    while right_start < len(right) and (right[right_start][0] + right[right_start][1]) / 2 < center:
+        right_start += 1
+    return left_end, right_start, 0
+
+
+def stitch_overlaps(
+    chunks: List[Chunk],
+    spans: Iterable[SpanLike],
+    words_by_chunk: Dict[str, Union[WordTable, List[dict]]],
+    *,
+    tolerance_sec: float = STITCH_TOLERANCE_SEC,
+) -> Tuple[List[Dict[str, str]], List[Span], List[str]]:
+    """Word-level alternative to `overlap_judge` for chunks that carry word timings.
+
+    Returns (overlap records, rewritten spans, suppressed sids). Every span
+    that lost words to a cut is rewritten from the words it kept, and a span
+    left with no words is suppressed. A seam where either chunk has no word
+    timings falls back to `overlap_judge`; spans it judges out take no part
+    in later seams and their words are not stitched. Each seam costs time
+    linear in the words of both chunks.
+    """
+    spans_by_chunk: Dict[str, List[SpanLike]] = {}
+    for span in spans:
+        spans_by_chunk.setdefault(span.chunk_id, []).append(span)
+    timed = {chunk.chunk_id: _timed_words(words_by_chunk.get(chunk.chunk_id) or [], chunk) for chunk in chunks}
+    seams = list(zip(chunks, chunks[1:]))
+
+    # Judge the seams without words first, so what they suppress is settled
+    # before any cut is chosen. A chunk between two such seams is judged
+    # against each neighbour, and only spans still alive are compared.
+    records_by_seam: Dict[int, List[Dict[str, str]]] = {}
+    suppressed: List[str] = []
+    judged_out: Set[str] = set()
+    for idx, (left, right) in enumerate(seams):
+        if timed[left.chunk_id] and timed[right.chunk_id]:
+            continue
+        pair = [
+            span
+            for span in spans_by_chunk.get(left.chunk_id, []) + spans_by_chunk.get(right.chunk_id, [])
+            if span.sid not in judged_out
+        ]
+        records, judged = overlap_judge([left, right], pair)
+        records_by_seam[idx] = records
+        for sid in judged:
+            if sid not in judged_out:
+                judged_out.add(sid)
+                suppressed.append(sid)
+    for chunk_id, chunk_spans in spans_by_chunk.items():
+        dropped = [span for span in chunk_spans if span.sid in judged_out]
+        if not dropped:
+            continue
+        spans_by_chunk[chunk_id] = [span for span in chunk_spans if span.sid not in judged_out]
+        if chunk_id in timed:
+            timed[chunk_id] = [
+                word
+                for word in timed[chunk_id]
+                if not any(span.t0 <= (word[0] + word[1]) / 2 <= span.t1 for span in dropped)
+            ]
+    keep = {chunk_id: [0, len(words)] for chunk_id, words in timed.items()}
+
+    for idx, (left, right) in enumerate(seams):
+        left_words = timed[left.chunk_id]
+        right_words = timed[right.chunk_id]
+        left_spans = spans_by_chunk.get(left.chunk_id)
+        right_spans = spans_by_chunk.get(right.chunk_id)
+        if idx in records_by_seam or not left_words or not right_words or not left_spans or not right_spans:
+            continue
+        left_end, right_start, matches = stitch_seam(
+            left_words,
+            right_words,
+            seam_t0=right.t0,
+            seam_t1=left.t1,
+            tolerance_sec=tolerance_sec,
+        )
+        keep[left.chunk_id][1] = min(keep[left.chunk_id][1], left_end)
+        keep[right.chunk_id][0] = max(keep[right.chunk_id][0], right_start)
+        cut = left_words[left_end - 1][1] if left_end else right.t0
+        records_by_seam[idx] = [
+            {
+                "olp_id": f"OLP_{left_spans[0].sid}_{right_spans[0].sid}",
+                "left_chunk": left.chunk_id,
+                "right_chunk": right.chunk_id,
+                "left_sid": left_spans[0].sid,
+                "right_sid": right_spans[0].sid,
+                "decision": "stitch",
+                "method": "word_align" if matches else "seam_center",
+                "conf": f"{matches}",
+                "cut": f"{cut:.3f}",
+            }
+        ]
+
+    overlap_records: List[Dict[str, str]] = []
+    olp_ids: Set[str] = set()
+    for idx in sorted(records_by_seam):
+        for record in records_by_seam[idx]:
+            if record["olp_id"] not in olp_ids:
+                olp_ids.add(record["olp_id"])
+                overlap_records.append(record)
+
+    rewritten: List[Span] = []
+    for chunk in chunks:
+        words = timed[chunk.chunk_id]
+        chunk_spans = spans_by_chunk.get(chunk.chunk_id)
+        start, end = keep[chunk.chunk_id]
+        if not words or not chunk_spans or (start, end) == (0, len(words)):
+            continue
+        # A span owns the words whose midpoint falls inside it.
+        mids = [(t0 + t1) / 2 for t0, t1, _ in words]
+        for span in chunk_spans:
+            lo = bisect_left(mids, span.t0)
+            hi = bisect_right(mids, span.t1)
+            if lo >= hi or (start <= lo and hi <= end):
+                continue
+            kept = words[max(lo, start) : min(hi, end)]
+            if not kept:
+                suppressed.append(span.sid)
+                continue
+            rewritten.append(
+                Span(
+                    sid=span.sid,
+                    t0=round(kept[0][0], 3),
+                    t1=round(kept[-1][1], 3),
+                    chunk_id=span.chunk_id,
+                    text_raw=_join_words([token for _, _, token in kept]),
+                    asr_conf=span.asr_conf,
+                )
+            )
+    return overlap_records, rewritten, suppressed
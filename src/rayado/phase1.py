@@ -1,17 +1,21 @@
 from __future__ import annotations
 
+import math
 import os
 import tempfile
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Union
 
 from .asr import transcribe_chunk
-from .cache import Cache
+from .cache import open_cache
 from .ffmpeg_tools import extract_audio_file, extract_audio_file_segment, ffprobe_duration, silencedetect
-from .lid_voxlingua import detect_language_voxlingua
-from .models import Chunk, Segment, Span
-from .render import render_srt
+from .journal import PartialRunError, RunJournal, input_fingerprint, journal_path, load_journal
+from .lid_voxlingua import detect_language_wav, lid_process_pool
+from .models import Chunk, Segment
+from .render import gap_span, render_files
+from .stats import StageTracer, append_run_record, now
+from .tables import SpanLike, SpanTable, WordTable
 from .utils import ensure_dir, hash_file
 from .vad import build_speech_segments
 
@@ -30,23 +34,22 @@ def _join_token(text: str, token: str, *, language: str) -> str:
 
 def _words_to_spans(
     *,
-    words: List[Dict[str, object]],
+    words: Union[WordTable, List[Dict[str, object]]],
     fallback_text: str,
     chunk: Chunk,
     language: str,
     span_start_id: int,
-) -> List[Span]:
-    spans: List[Span] = []
-    if not words and fallback_text.strip():
+) -> SpanTable:
+    words = WordTable.from_words(words)
+    spans = SpanTable()
+    if not len(words) and fallback_text.strip():
         spans.append(
-            Span(
-                sid=f"S{span_start_id:05d}",
-                t0=chunk.t0,
-                t1=max(chunk.t1, chunk.t0 + 0.001),
-                chunk_id=chunk.chunk_id,
-                text_raw=fallback_text.strip(),
-                asr_conf=0.0,
-            )
+            sid=f"S{span_start_id:05d}",
+            t0=chunk.t0,
+            t1=max(chunk.t1, chunk.t0 + 0.001),
+            chunk_id=chunk.chunk_id,
+            text_raw=fallback_text.strip(),
+            asr_conf=0.0,
         )
         return spans
 
@@ -56,29 +59,27 @@ def _words_to_spans(
     current_words = 0
     span_id = span_start_id
 
-    for word in words:
-        raw = (word.get("punctuated_word") or word.get("word") or "").strip()
+    for idx in range(len(words)):
+        raw = words.token(idx)
         if not raw:
             continue
-        w_start = word.get("start")
-        w_end = word.get("end")
-        if w_start is None or w_end is None:
+        w_start = words.start[idx]
+        w_end = words.end[idx]
+        if math.isnan(w_start) or math.isnan(w_end):
             continue
-        abs_start = chunk.t0 + float(w_start)
-        abs_end = chunk.t0 + float(w_end)
+        abs_start = chunk.t0 + w_start
+        abs_end = chunk.t0 + w_end
 
         if current_start is None:
             current_start = abs_start
         if current_end is not None and abs_start - current_end > 1.0:
             spans.append(
-                Span(
-                    sid=f"S{span_id:05d}",
-                    t0=current_start,
-                    t1=max(current_end, current_start + 0.001),
-                    chunk_id=chunk.chunk_id,
-                    text_raw=current_text.strip(),
-                    asr_conf=0.0,
-                )
+                sid=f"S{span_id:05d}",
+                t0=current_start,
+                t1=max(current_end, current_start + 0.001),
+                chunk_id=chunk.chunk_id,
+                text_raw=current_text.strip(),
+                asr_conf=0.0,
             )
             span_id += 1
             current_text = ""
@@ -104,14 +105,12 @@ def _words_to_spans(
 
         if should_break and current_start is not None and current_end is not None:
             spans.append(
-                Span(
-                    sid=f"S{span_id:05d}",
-                    t0=current_start,
-                    t1=max(current_end, current_start + 0.001),
-                    chunk_id=chunk.chunk_id,
-                    text_raw=current_text.strip(),
-                    asr_conf=0.0,
-                )
+                sid=f"S{span_id:05d}",
+                t0=current_start,
+                t1=max(current_end, current_start + 0.001),
+                chunk_id=chunk.chunk_id,
+                text_raw=current_text.strip(),
+                asr_conf=0.0,
             )
             span_id += 1
             current_text = ""
@@ -121,14 +120,12 @@ def _words_to_spans(
 
     if current_text and current_start is not None and current_end is not None:
         spans.append(
-            Span(
-                sid=f"S{span_id:05d}",
-                t0=current_start,
-                t1=max(current_end, current_start + 0.001),
-                chunk_id=chunk.chunk_id,
-                text_raw=current_text.strip(),
-                asr_conf=0.0,
-            )
+            sid=f"S{span_id:05d}",
+            t0=current_start,
+            t1=max(current_end, current_start + 0.001),
+            chunk_id=chunk.chunk_id,
+            text_raw=current_text.strip(),
+            asr_conf=0.0,
         )
     return spans
 
@@ -186,6 +183,31 @@ def _pick_sample_segments(segments: List[Segment]) -> List[Segment]:
     return chosen
 
 
+def _prioritized_sample_segments(segments: List[Segment], *, max_samples: int) -> List[Segment]:
+    # Middle first: episode heads and tails are the likeliest places for music,
+    # intros and credits. Then quartiles, ends, and progressively finer bisection
+    # points for ambiguous episodes that need more evidence.
+    if not segments:
+        return []
+    n = len(segments)
+    fractions = [0.5, 0.25, 0.75, 0.0, 1.0]
+    denom = 8
+    while len(fractions) < max_samples and denom <= 2 * n:
+        fractions.extend(k / denom for k in range(1, denom, 2))
+        denom *= 2
+    chosen: List[Segment] = []
+    seen = set()
+    for frac in fractions:
+        seg = segments[max(0, min(n - 1, int(n * frac)))]
+        if seg in seen:
+            continue
+        seen.add(seg)
+        chosen.append(seg)
+        if len(chosen) >= max_samples:
+            break
+    return chosen
+
+
 def run_phase1(
     *,
     input_path: str,
@@ -204,77 +226,115 @@ def run_phase1(
     lid_cache_dir: str,
     lid_device: str,
     output_txt_only: bool = False,
+    cache_backend: str = "sqlite",
+    cache_url: Optional[str] = None,
+    lid_max_batch_sec: float = 0.0,
+    lid_mode: str = "fixed",
+    lid_max_samples: int = 9,
+    lid_margin: float = 0.75,
+    lid_precision: str = "fp32",
+    lid_runtime: str = "eager",
+    lid_process: bool = True,
+    lid_threads: int = 0,
+    resume: bool = False,
+    keep_going: bool = False,
+    trace_path: Optional[str] = None,
 ) -> str:
+    started_at = now()
+    tracer = StageTracer()
     ensure_dir(os.path.dirname(out_srt_path))
-    cache = Cache(os.path.join(cache_dir, "cache.sqlite"))
+    cache = open_cache(cache_dir, backend=cache_backend, url=cache_url)
 
     work_dir = os.path.join(cache_dir, "work_audio")
     ensure_dir(work_dir)
     base = os.path.splitext(os.path.basename(input_path))[0]
     work_wav = os.path.join(work_dir, f"{base}.wav")
 
-    extract_audio_file(input_path, work_wav, sample_rate=16000, channels=1)
-
-    duration = ffprobe_duration(work_wav)
-    silences = silencedetect(work_wav, noise_db=vad_threshold, min_silence=vad_min_silence_sec)
-    speech_segments = build_speech_segments(
-        duration,
-        silences,
-        pad_sec=vad_pad_sec,
-        min_speech_sec=vad_min_speech_sec,
-        merge_gap_sec=vad_merge_gap_sec,
-    )
-    grouped_segments = _group_segments(speech_segments, target_sec=target_sec, max_sec=max_sec)
-    chunks = _build_chunks(grouped_segments)
+    with tracer.span("extract"):
+        extract_audio_file(input_path, work_wav, sample_rate=16000, channels=1)
+
+    # Anything that changes the chunk plan or the ASR requests invalidates a journal.
+    fingerprint = input_fingerprint(input_path)
+    settings = {
+        "deepgram_model": deepgram_model,
+        "vad_threshold": vad_threshold,
+        "vad_min_speech_sec": vad_min_speech_sec,
+        "vad_merge_gap_sec": vad_merge_gap_sec,
+        "vad_pad_sec": vad_pad_sec,
+        "vad_min_silence_sec": vad_min_silence_sec,
+        "target_sec": target_sec,
+        "max_sec": max_sec,
+    }
+    jpath = journal_path(cache_dir, input_path, out_srt_path)
+    resumed = load_journal(jpath) if resume else None
+    if resumed is not None and not resumed.matches(fingerprint=fingerprint, settings=settings):
+        resumed = None
+
+    if resumed is not None:
+        chunks = resumed.chunks
+        grouped_segments = [Segment(chunk.t0, chunk.t1) for chunk in chunks]
+    else:
+        with tracer.span("vad"):
+            duration = ffprobe_duration(work_wav)
+            silences = silencedetect(work_wav, noise_db=vad_threshold, min_silence=vad_min_silence_sec)
+            speech_segments = build_speech_segments(
+                duration,
+                silences,
+                pad_sec=vad_pad_sec,
+                min_speech_sec=vad_min_speech_sec,
+                merge_gap_sec=vad_merge_gap_sec,
+            )
+        grouped_segments = _group_segments(speech_segments, target_sec=target_sec, max_sec=max_sec)
+        chunks = _build_chunks(grouped_segments)
 
     if not chunks:
         raise RuntimeError("No speech chunks found after VAD.")
 
-    with tempfile.TemporaryDirectory(prefix="rayado_lid_") as lid_tmp:
-        sample_wavs: List[str] = []
-        for seg in _pick_sample_segments(grouped_segments):
-            sample_path = os.path.join(lid_tmp, f"{base}_{seg.start:.3f}.wav")
+    journal = RunJournal(jpath, fresh=resumed is None)
+    if resumed is None:
+        journal.record_plan(fingerprint=fingerprint, settings=settings, chunks=chunks)
+    completed: Dict[str, Sequence[SpanLike]] = dict(resumed.completed) if resumed is not None else {}
+    pending_chunks = [chunk for chunk in chunks if chunk.chunk_id not in completed]
+
+    if lid_mode == "sequential":
+        lid_candidates = _prioritized_sample_segments(grouped_segments, max_samples=lid_max_samples)
+    else:
+        lid_candidates = _pick_sample_segments(grouped_segments)
+    lid_kwargs = {
+        "sequential": lid_mode == "sequential",
+        "cache_dir": lid_cache_dir,
+        "device": lid_device,
+        "max_batch_sec": lid_max_batch_sec,
+        "precision": lid_precision,
+        "runtime": lid_runtime,
+        "max_samples": lid_max_samples,
+        "margin": lid_margin,
+    }
+    lid_ranges = [(seg.start, seg.end) for seg in lid_candidates]
+
+    detected_language = resumed.language if resumed is not None else ""
+    lid_samples: list = []
+    lid_timings: Dict[str, float] = {}
+    params: dict = {}
+
+    def _prepare_chunk(chunk: Chunk) -> tuple[str, str]:
+        wav_path = os.path.join(chunk_tmp_dir, f"{chunk.chunk_id}.wav")
+        with tracer.span("extract", chunk_id=chunk.chunk_id):
             extract_audio_file_segment(
                 work_wav,
-                sample_path,
-                start=seg.start,
-                end=seg.end,
+                wav_path,
+                start=chunk.t0,
+                end=chunk.t1,
                 sample_rate=16000,
                 channels=1,
             )
-            sample_wavs.append(sample_path)
-        detected_language, _, _ = detect_language_voxlingua(
-            sample_wavs,
-            cache_dir=lid_cache_dir,
-            device=lid_device,
-        )
-    if not detected_language:
-        raise RuntimeError("Language detection failed to select a dominant language.")
-
-    params = {
-        "model": deepgram_model,
-        "language": detected_language,
-        "detect_language": False,
-        "detect_language_set": [],
-        "diarize": False,
-        "smart_format": False,
-        "punctuate": True,
-    }
+        with tracer.span("hash", chunk_id=chunk.chunk_id):
+            return wav_path, hash_file(wav_path)
 
-    spans: List[Span] = []
-    span_id = 1
-
-    def _process_chunk(chunk: Chunk) -> List[Span]:
-        wav_path = os.path.join(chunk_tmp_dir, f"{chunk.chunk_id}.wav")
-        extract_audio_file_segment(
-            work_wav,
-            wav_path,
-            start=chunk.t0,
-            end=chunk.t1,
-            sample_rate=16000,
-            channels=1,
-        )
-        input_hash = hash_file(wav_path)
+    def _process_chunk(chunk: Chunk, prepared: Future, submitted_at: float) -> SpanTable:
+        wav_path, input_hash = prepared.result()
+        # Queue wait includes any wait on this chunk's prep task.
+        tracer.add("queue_wait", submitted_at, tracer.now(), chunk_id=chunk.chunk_id)
         with open(wav_path, "rb") as f:
             audio_bytes = f.read()
         attempts = 0
@@ -290,6 +350,7 @@ def run_phase1(
                     cache=cache,
                     span_start_id=span_seed,
                     audio_bytes=audio_bytes,
+                    tracer=tracer,
                 )
                 break
             except Exception as exc:
@@ -301,31 +362,109 @@ def run_phase1(
 
         words = meta.get("words") if meta else []
         fallback_text = chunk_spans[0].text_raw if chunk_spans else ""
-        return _words_to_spans(
-            words=words or [],
-            fallback_text=fallback_text,
-            chunk=chunk,
-            language=detected_language,
-            span_start_id=0,
-        )
+        with tracer.span("post_process", chunk_id=chunk.chunk_id):
+            return _words_to_spans(
+                words=words or [],
+                fallback_text=fallback_text,
+                chunk=chunk,
+                language=detected_language,
+                span_start_id=0,
+            )
 
-    with tempfile.TemporaryDirectory(prefix="rayado_chunks_") as chunk_tmp_dir:
-        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
-            future_map = {executor.submit(_process_chunk, chunk): chunk for chunk in chunks}
-            for future in as_completed(future_map):
-                chunk_spans = future.result()
-                for span in chunk_spans:
-                    spans.append(
-                        Span(
-                            sid=f"S{span_id:05d}",
-                            t0=span.t0,
-                            t1=span.t1,
-                            chunk_id=span.chunk_id,
-                            text_raw=span.text_raw,
-                            asr_conf=span.asr_conf,
-                        )
-                    )
-                    span_id += 1
+    failed: Dict[str, str] = {}
+
+    def _finish_chunk(chunk: Chunk, chunk_spans: Sequence[SpanLike]) -> None:
+        completed[chunk.chunk_id] = chunk_spans
+        journal.record_chunk(chunk.chunk_id, chunk_spans)
+
+    def _fail_chunk(chunk: Chunk, exc: Exception) -> None:
+        error = " ".join(str(exc).split()) or type(exc).__name__
+        failed[chunk.chunk_id] = error
+        journal.record("chunk_failed", chunk_id=chunk.chunk_id, error=error)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="rayado_chunks_") as chunk_tmp_dir:
+            with (
+                ThreadPoolExecutor(max_workers=max(1, concurrency)) as prep_executor,
+                ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor,
+            ):
+                # Extraction and hashing only need the chunk plan, so they run on
+                # their own pool while LID decides the language. Each ASR task then
+                # waits on its own chunk's prep only, never on the whole prep queue.
+                prepared = {chunk.chunk_id: prep_executor.submit(_prepare_chunk, chunk) for chunk in pending_chunks}
+                future_map: Dict[Future, Chunk] = {}
+                try:
+                    if not detected_language:
+                        lid_started = tracer.now()
+                        if lid_process:
+                            lid_future = lid_process_pool(threads=lid_threads).submit(
+                                detect_language_wav, work_wav, lid_ranges, **lid_kwargs
+                            )
+                            detected_language, _, lid_samples, lid_timings = lid_future.result()
+                        else:
+                            detected_language, _, lid_samples, lid_timings = detect_language_wav(
+                                work_wav, lid_ranges, **lid_kwargs
+                            )
+                        lid_ended = tracer.now()
+                        tracer.add("lid", lid_started, lid_ended)
+                        lid_timings["wall_sec"] = lid_ended - lid_started
+                        lid_timings["prep_done_at_lid_end"] = sum(1 for f in prepared.values() if f.done())
+                        if not detected_language:
+                            for future in prepared.values():
+                                future.cancel()
+                            raise RuntimeError("Language detection failed to select a dominant language.")
+                        journal.record("language", language=detected_language)
+
+                    params = {
+                        "model": deepgram_model,
+                        "language": detected_language,
+                        "detect_language": False,
+                        "detect_language_set": [],
+                        "diarize": False,
+                        "smart_format": False,
+                        "punctuate": True,
+                    }
+
+                    future_map = {
+                        executor.submit(_process_chunk, chunk, prepared[chunk.chunk_id], tracer.now()): chunk
+                        for chunk in pending_chunks
+                    }
+                    for future in as_completed(future_map):
+                        try:
+                            chunk_spans = future.result()
+                        except Exception as exc:
+                            if not keep_going:
+                                raise
+                            _fail_chunk(future_map[future], exc)
+                            continue
+                        _finish_chunk(future_map[future], chunk_spans)
+                except BaseException:
+                    # On Ctrl-C or a failed chunk, drop queued work but let requests
+                    # already in flight finish and land in the journal so --resume
+                    # does not pay for them twice.
+                    for future in [*prepared.values(), *future_map]:
+                        future.cancel()
+                    for future in as_completed(future_map):
+                        if not future.cancelled() and future.exception() is None:
+                            _finish_chunk(future_map[future], future.result())
+                    raise
+    finally:
+        journal.close()
+
+    spans = SpanTable()
+    for chunk in chunks:
+        if chunk.chunk_id in failed:
+            spans.append_span(gap_span(chunk))
+            continue
+        for span in completed.get(chunk.chunk_id, []):
+            spans.append(
+                sid=f"S{len(spans) + 1:05d}",
+                t0=span.t0,
+                t1=span.t1,
+                chunk_id=span.chunk_id,
+                text_raw=span.text_raw,
+                asr_conf=span.asr_conf,
+            )
 
     if output_txt_only:
         chunk_texts: Dict[str, List[str]] = {}
@@ -346,8 +485,35 @@ def run_phase1(
         with open(out_srt_path, "w", encoding="utf-8") as f:
             f.write("\n".join(lines) + ("\n" if lines else ""))
     else:
-        srt = render_srt(spans)
-        with open(out_srt_path, "w", encoding="utf-8") as f:
-            f.write(srt)
-
+        render_files(spans, {"srt": out_srt_path})
+
+    if trace_path:
+        tracer.write_chrome_trace(trace_path)
+    append_run_record(
+        os.path.join(cache_dir, "runs.jsonl"),
+        {
+            "command": "phase1",
+            "input": input_path,
+            "started_at": started_at,
+            "ended_at": now(),
+            "chunk_count": len(chunks),
+            "language": detected_language,
+            "lid": {
+                **lid_timings,
+                "mode": lid_mode,
+                "process": lid_process,
+                "precision": lid_precision,
+                "runtime": lid_runtime,
+                "samples_used": len(lid_samples),
+            },
+            "resumed_chunks": len(chunks) - len(pending_chunks),
+            "failed_chunks": sorted(failed),
+            "stages": tracer.summary(),
+            "cache": cache.stats.to_dict(),
+        },
+    )
+    if failed:
+        # Keep the journal: --resume retries exactly the failed chunks.
+        raise PartialRunError(failed, language=detected_language)
+    journal.remove()
     return detected_language
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import json
 import os
 import time
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+from .cache import Cache
+from .utils import sha256_hex
 
 
 def _read_text(path: str) -> str:
@@ -41,6 +45,34 @@ def _response_text(resp) -> str:
     return "\n".join(parts).strip()
 
 
+def _llm_cache_key(model: str, input_payload) -> Tuple[str, str, str]:
+    if isinstance(input_payload, list):
+        prompt_parts = [item.get("content", "") for item in input_payload if item.get("role") == "developer"]
+        input_parts = [item for item in input_payload if item.get("role") != "developer"]
+    else:
+        prompt_parts = []
+        input_parts = [input_payload]
+    prompt_hash = sha256_hex(json.dumps(prompt_parts, ensure_ascii=False).encode("utf-8"))
+    input_hash = sha256_hex(json.dumps(input_parts, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    key = sha256_hex(f"{model}:{prompt_hash}:{input_hash}".encode("utf-8"))
+    return key, prompt_hash, input_hash
+
+
+def _cached_response(cache: Optional[Cache], *, model: str, input_payload) -> Optional[str]:
+    if cache is None:
+        return None
+    key, _, _ = _llm_cache_key(model, input_payload)
+    return cache.get_text(key)
+
+
+def _store_response(cache: Optional[Cache], *, model: str, input_payload, response: str) -> None:
+    # Empty output means the stream failed or was cut; never pin that in the cache.
+    if cache is None or not response:
+        return
+    key, prompt_hash, input_hash = _llm_cache_key(model, input_payload)
+    cache.set_text(key, model=model, prompt_hash=prompt_hash, input_hash=input_hash, response=response)
+
+
 def _call_openai(
     *,
     model: str,
@@ -117,6 +149,7 @@ def generate_object_graph(
     model: str,
     out_graph_path: str,
     retry: int,
+    cache: Optional[Cache] = None,
 ) -> str:
     prompt_text = _read_text(prompt_path)
     srt_text = _read_text(srt_path)
@@ -124,7 +157,10 @@ def generate_object_graph(
         {"role": "developer", "content": prompt_text},
         {"role": "user", "content": srt_text},
     ]
-    graph_text = _call_openai(model=model, input_payload=input_payload, retry=retry)
+    graph_text = _cached_response(cache, model=model, input_payload=input_payload)
+    if graph_text is None:
+        graph_text = _call_openai(model=model, input_payload=input_payload, retry=retry)
+        _store_response(cache, model=model, input_payload=input_payload, response=graph_text)
     _write_text(out_graph_path, graph_text)
     return graph_text
 
@@ -137,6 +173,7 @@ def run_phase2(
     graph_out_path: str,
     model_graph: str,
     retry: int,
+    cache: Optional[Cache] = None,
 ) -> str:
     base_graph = _read_text(graph_in_path) if graph_in_path else ""
     prompt_text = _read_text(prompt_path)
@@ -147,12 +184,15 @@ def run_phase2(
             {"role": "developer", "content": prompt_text},
             {"role": "user", "content": f"[S-ORAL_EXISTING]\n{base_graph}\n\n[NEW_SRT]\n{srt_text}"},
         ]
-        graph_text = _call_openai(
-            model=model_graph,
-            input_payload=input_payload,
-            output_path=graph_out_path,
-            retry=retry,
-        )
+        graph_text = _cached_response(cache, model=model_graph, input_payload=input_payload)
+        if graph_text is None:
+            graph_text = _call_openai(
+                model=model_graph,
+                input_payload=input_payload,
+                output_path=graph_out_path,
+                retry=retry,
+            )
+            _store_response(cache, model=model_graph, input_payload=input_payload, response=graph_text)
         _write_text(graph_out_path, graph_text)
         return graph_text
 
@@ -160,11 +200,14 @@ def run_phase2(
         {"role": "developer", "content": prompt_text},
         {"role": "user", "content": srt_text},
     ]
-    graph_text = _call_openai(
-        model=model_graph,
-        input_payload=input_payload,
-        output_path=graph_out_path,
-        retry=retry,
-    )
+    graph_text = _cached_response(cache, model=model_graph, input_payload=input_payload)
+    if graph_text is None:
+        graph_text = _call_openai(
+            model=model_graph,
+            input_payload=input_payload,
+            output_path=graph_out_path,
+            retry=retry,
+        )
+        _store_response(cache, model=model_graph, input_payload=input_payload, response=graph_text)
     _write_text(graph_out_path, graph_text)
     return graph_text
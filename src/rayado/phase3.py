@@ -3,7 +3,8 @@ from __future__ import annotations
 import os
 from typing import Optional
 
-from .phase2 import _call_openai, _read_text, _write_text
+from .cache import Cache
+from .phase2 import _cached_response, _call_openai, _read_text, _store_response, _write_text
 
 
 def run_phase3(
@@ -14,6 +15,7 @@ def run_phase3(
     graph_out_path: str,
     model: str,
     retry: int,
+    cache: Optional[Cache] = None,
 ) -> str:
     prompt_text = _read_text(prompt_path)
     graph_a = _read_text(graph_a_path)
@@ -24,11 +26,14 @@ def run_phase3(
         {"role": "user", "content": f"[INPUT_A]\n{graph_a}\n\n[INPUT_B]\n{graph_b}"},
     ]
 
-    merged = _call_openai(
-        model=model,
-        input_payload=input_payload,
-        output_path=graph_out_path,
-        retry=retry,
-    )
+    merged = _cached_response(cache, model=model, input_payload=input_payload)
+    if merged is None:
+        merged = _call_openai(
+            model=model,
+            input_payload=input_payload,
+            output_path=graph_out_path,
+            retry=retry,
+        )
+        _store_response(cache, model=model, input_payload=input_payload, response=merged)
     _write_text(graph_out_path, merged)
     return merged
@@ -2,26 +2,57 @@
 
 import os
 import shutil
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple, Union
 
 from . import __version__
 from .asr import transcribe_chunk
-from .cache import Cache
+from .cache import Cache, open_cache
 from .chunking import generate_chunks
 from .entity import extract_entities
-from .ffmpeg_tools import extract_audio_file_segment, ffprobe_duration, silencedetect
-from .gcl import append_block, ensure_header
+from .ffmpeg_tools import extract_audio_file, extract_audio_file_segment, ffprobe_duration, silencedetect
+from .gcl import GclWriter
+from .journal import PartialRunError
+from .lid_voxlingua import detect_language_segments, load_pcm
 from .models import Chunk, Span
-from .overlap import overlap_judge
-from .render import render_srt, render_transcript
+from .overlap import OVERLAP_POLICIES, overlap_judge, stitch_overlaps
+from .render import OUTPUT_FILES, gap_span, render_files
 from .speaker import build_speaker_blocks
-from .stats import RunStats, now, write_run_log
+from .stats import ProgressLog, RunStats, StageTracer, append_run_record, now, stage_span, write_run_log
+from .tables import SpanTable, WordTable
 from .utils import ensure_dir, hash_file
 from .vad import build_speech_segments
 
-ResultItem = Tuple[Chunk, Optional[str], List[Span], Dict[str, str], Dict[str, str], List[Dict[str, str]]]
+# (chunk, skip_reason, spans, speaker block, speaker map block, GCL overrides, Deepgram words)
+ResultItem = Tuple[
+    Chunk,
+    Optional[str],
+    List[Span],
+    Dict[str, str],
+    Dict[str, str],
+    List[Dict[str, str]],
+    Union[WordTable, List[dict]],
+]
+
+
+class ReorderBuffer:
+    """Release out-of-order completions as soon as they extend the contiguous prefix."""
+
+    def __init__(self, start: int = 0) -> None:
+        self.next_index = start
+        self._pending: Dict[int, ResultItem] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def push(self, index: int, item: ResultItem) -> List[ResultItem]:
+        self._pending[index] = item
+        ready: List[ResultItem] = []
+        while self.next_index in self._pending:
+            ready.append(self._pending.pop(self.next_index))
+            self.next_index += 1
+        return ready
 
 
 def _infer_language_from_text(text: str) -> str:
@@ -49,6 +80,74 @@ def _infer_language_from_text(text: str) -> str:
         return "zh"
     return ""
 
+
+def _span_fields(span: Span) -> Dict[str, str]:
+    return {
+        "sid": span.sid,
+        "t0": f"{span.t0}",
+        "t1": f"{span.t1}",
+        "chunk_id": span.chunk_id,
+        "text_raw": span.text_raw,
+        "asr_conf": f"{span.asr_conf}",
+    }
+
+
+def _detected_other_language(item: ResultItem, language: str) -> bool:
+    """True when a detection-on result reports a language other than `language`."""
+    _, skip_reason, spans, _, _, gcl_overrides, _ = item
+    if skip_reason or not spans:
+        return False
+    detected = next(
+        (override.get("deps", "") for override in gcl_overrides if override.get("policy") == "detected_language"),
+        "",
+    )
+    # No detected_language override is no evidence of a mismatch.
+    return bool(detected) and detected.split("-")[0].lower() != language.split("-")[0].lower()
+
+
+def _local_chunk_languages(
+    *,
+    input_path: str,
+    chunks: List[Chunk],
+    tmp_dir: str,
+    cache_dir: str,
+    device: str,
+    max_batch_sec: float,
+    precision: str,
+    min_score: float,
+    runtime: str = "eager",
+) -> Dict[str, Tuple[str, float]]:
+    """Assign each chunk a language with the local VoxLingua classifier.
+
+    Chunks whose own prediction is below `min_score` fall back to the
+    episode-level weighted winner. Chunks still without a language (no winner)
+    are left out, so they keep provider-side detection and its rerun guard.
+    """
+    wav_path = os.path.join(tmp_dir, "_lid_full.wav")
+    extract_audio_file(input_path, wav_path, sample_rate=16000, channels=1)
+    try:
+        audio = load_pcm(wav_path)
+        winner, _, details = detect_language_segments(
+            audio,
+            [(chunk.t0, chunk.t1) for chunk in chunks],
+            cache_dir=cache_dir,
+            device=device,
+            max_batch_sec=max_batch_sec,
+            precision=precision,
+            runtime=runtime,
+        )
+    finally:
+        if os.path.exists(wav_path):
+            os.remove(wav_path)
+
+    languages: Dict[str, Tuple[str, float]] = {}
+    for chunk, sample in zip(chunks, details):
+        language = sample.language if sample.language and sample.score >= min_score else winner
+        if language:
+            languages[chunk.chunk_id] = (language, sample.score)
+    return languages
+
+
 def _process_chunk(
     *,
     chunk: Chunk,
@@ -64,35 +163,43 @@ def _process_chunk(
     vad_merge_gap_sec: float,
     vad_pad_sec: float,
     tmp_dir: str,
+    local_language: Optional[Tuple[str, float]] = None,
+    tracer: Optional[StageTracer] = None,
+    submitted_at: Optional[float] = None,
 ) -> ResultItem:
     low_conf_threshold = 0.5
     low_conf_langs = ["zh", "ja", "ko", "en"]
+    if tracer is not None and submitted_at is not None:
+        tracer.add("queue_wait", submitted_at, tracer.now(), chunk_id=chunk.chunk_id)
     wav_path = os.path.join(tmp_dir, f"{chunk.chunk_id}.wav")
-    extract_audio_file_segment(
-        input_path,
-        wav_path,
-        start=chunk.t0,
-        end=chunk.t1,
-        sample_rate=16000,
-        channels=1,
-    )
+    with stage_span(tracer, "extract", chunk_id=chunk.chunk_id):
+        extract_audio_file_segment(
+            input_path,
+            wav_path,
+            start=chunk.t0,
+            end=chunk.t1,
+            sample_rate=16000,
+            channels=1,
+        )
 
     try:
         if vad_enabled:
-            silences = silencedetect(wav_path, noise_db=vad_threshold, min_silence=0.5)
-            speech_segments = build_speech_segments(
-                chunk.t1 - chunk.t0,
-                silences,
-                pad_sec=vad_pad_sec,
-                min_speech_sec=vad_min_speech_sec,
-                merge_gap_sec=vad_merge_gap_sec,
-            )
+            with stage_span(tracer, "vad", chunk_id=chunk.chunk_id):
+                silences = silencedetect(wav_path, noise_db=vad_threshold, min_silence=0.5)
+                speech_segments = build_speech_segments(
+                    chunk.t1 - chunk.t0,
+                    silences,
+                    pad_sec=vad_pad_sec,
+                    min_speech_sec=vad_min_speech_sec,
+                    merge_gap_sec=vad_merge_gap_sec,
+                )
             if not speech_segments:
-                return (chunk, "non_speech", [], {}, {}, [])
+                return (chunk, "non_speech", [], {}, {}, [], [])
 
-        input_hash = hash_file(wav_path)
-        with open(wav_path, "rb") as f:
-            audio_bytes = f.read()
+        with stage_span(tracer, "hash", chunk_id=chunk.chunk_id):
+            input_hash = hash_file(wav_path)
+            with open(wav_path, "rb") as f:
+                audio_bytes = f.read()
         attempts = 0
         while True:
             try:
@@ -105,6 +212,7 @@ def _process_chunk(
                     cache=cache,
                     span_start_id=span_start_id,
                     audio_bytes=audio_bytes,
+                    tracer=tracer,
                 )
                 break
             except Exception:
@@ -112,7 +220,8 @@ def _process_chunk(
                 if attempts > retry:
                     raise
 
-        if provider == "deepgram" and meta:
+        # A locally assigned language is final; never pay for a detection rerun.
+        if provider == "deepgram" and meta and local_language is None:
             lang_conf = meta.get("language_confidence")
             if isinstance(lang_conf, (int, float)) and lang_conf < low_conf_threshold:
                 rerun_params = dict(params)
@@ -129,6 +238,7 @@ def _process_chunk(
                         cache=cache,
                         span_start_id=span_start_id,
                         audio_bytes=audio_bytes,
+                        tracer=tracer,
                     )
                     retry_conf = meta_retry.get("language_confidence") if meta_retry else None
                     prefer_retry = False
@@ -145,30 +255,45 @@ def _process_chunk(
         gcl_overrides: List[Dict[str, str]] = []
         speaker_block: Dict[str, str] = {}
         speaker_map_block: Dict[str, str] = {}
+        words = WordTable()
+
+        with stage_span(tracer, "post_process", chunk_id=chunk.chunk_id):
+            if provider == "deepgram" and meta and spans:
+                detected_lang = meta.get("detected_language") or ""
+                lang_conf = meta.get("language_confidence")
+                if local_language is not None:
+                    gcl_overrides.append(
+                        {
+                            "oid": f"LANG_{chunk.chunk_id}",
+                            "sid": spans[0].sid,
+                            "policy": "local_lid",
+                            "norm_zh": "",
+                            "conf": f"{local_language[1]:.3f}",
+                            "deps": local_language[0],
+                        }
+                    )
+                elif detected_lang:
+                    gcl_overrides.append(
+                        {
+                            "oid": f"LANG_{chunk.chunk_id}",
+                            "sid": spans[0].sid,
+                            "policy": "detected_language",
+                            "norm_zh": "",
+                            "conf": f"{lang_conf}" if lang_conf is not None else "",
+                            "deps": detected_lang,
+                        }
+                    )
 
-        if provider == "deepgram" and meta and spans:
-            detected_lang = meta.get("detected_language") or ""
-            lang_conf = meta.get("language_confidence")
-            if detected_lang:
-                gcl_overrides.append(
-                    {
-                        "oid": f"LANG_{chunk.chunk_id}",
-                        "sid": spans[0].sid,
-                        "policy": "detected_language",
-                        "norm_zh": "",
-                        "conf": f"{lang_conf}" if lang_conf is not None else "",
-                        "deps": detected_lang,
-                    }
+                raw_words = meta.get("words") or []
+                speaker_block, speaker_map_block = build_speaker_blocks(
+                    chunk_id=chunk.chunk_id,
+                    span_id=spans[0].sid,
+                    words=raw_words,
                 )
+                # Held until stitching; the dicts would cost several times the columns.
+                words = WordTable.from_words(raw_words)
 
-            words = meta.get("words") or []
-            speaker_block, speaker_map_block = build_speaker_blocks(
-                chunk_id=chunk.chunk_id,
-                span_id=spans[0].sid,
-                words=words,
-            )
-
-        return (chunk, None, spans, speaker_block, speaker_map_block, gcl_overrides)
+        return (chunk, None, spans, speaker_block, speaker_map_block, gcl_overrides, words)
     finally:
         if os.path.exists(wav_path):
             os.remove(wav_path)
@@ -196,7 +321,23 @@ def run_pipeline(
     vad_min_speech_sec: float,
     vad_merge_gap_sec: float,
     vad_pad_sec: float,
+    cache_backend: str = "sqlite",
+    cache_url: Optional[str] = None,
+    local_lid: bool = False,
+    lid_cache_dir: str = os.path.join(".cache", "speechbrain", "lang-id-voxlingua107-ecapa"),
+    lid_device: str = "cpu",
+    lid_precision: str = "fp32",
+    lid_runtime: str = "eager",
+    lid_max_batch_sec: float = 120.0,
+    lid_min_score: float = 0.5,
+    gcl_fsync: str = "never",
+    gcl_index: bool = False,
+    keep_going: bool = False,
+    progress_interval_sec: float = 1.0,
+    overlap_policy: str = "judge",
 ) -> None:
+    if overlap_policy not in OVERLAP_POLICIES:
+        raise ValueError(f"Unsupported overlap policy: {overlap_policy}")
     started_at = now()
     step_timings: List[Dict[str, float | str | None]] = []
     current_step: Dict[str, float | str | None] | None = None
@@ -209,6 +350,8 @@ def run_pipeline(
     progress_chunk_skipped = 0
     progress_chunk_processed = 0
     progress_span_count = 0
+    progress: Optional[ProgressLog] = None
+    tracer = StageTracer()
 
     def step_start(name: str) -> Dict[str, float | str | None]:
         entry = {"name": name, "started_at": now(), "ended_at": None, "duration_sec": None}
@@ -221,38 +364,57 @@ def run_pipeline(
         started = entry.get("started_at")
         if isinstance(started, (int, float)):
             entry["duration_sec"] = ended - started
+        if progress is not None:
+            progress.event("step", {"name": entry["name"], "duration_sec": entry["duration_sec"]})
+
+    def report_progress() -> None:
+        # Called per completed chunk; the log itself throttles to one line per interval.
+        if progress is None:
+            return
+        progress.update(
+            {
+                "chunk_count": chunk_count,
+                "chunk_skipped": progress_chunk_skipped or chunk_skipped,
+                "chunk_processed": progress_chunk_processed or chunk_processed,
+                "chunk_failed": chunk_failed,
+                "span_count": progress_span_count or span_count,
+                "pending_reorder": reorder.pending,
+            }
+        )
 
-    def write_snapshot(status: str) -> None:
-        snapshot = RunStats(
+    current_step = step_start("init")
+    ensure_dir(out_dir)
+    cache = open_cache(cache_dir, backend=cache_backend, url=cache_url)
+    progress = ProgressLog(os.path.join(out_dir, "progress.jsonl"), interval_sec=progress_interval_sec)
+    # run.log is written once here and once with the final summary; live
+    # progress goes to progress.jsonl.
+    write_run_log(
+        os.path.join(out_dir, "run.log"),
+        RunStats(
             started_at=started_at,
-            ended_at=now(),
-            duration_sec=now() - started_at,
+            ended_at=started_at,
+            duration_sec=0.0,
             input_path=input_path,
             output_dir=out_dir,
             provider=provider,
-            chunk_count=chunk_count,
-            chunk_skipped=progress_chunk_skipped or chunk_skipped,
-            chunk_processed=progress_chunk_processed or chunk_processed,
-            chunk_failed=chunk_failed,
-            span_count=progress_span_count or span_count,
-            suppressed_count=suppressed_count,
-        )
-        write_run_log(os.path.join(out_dir, "run.log"), snapshot, {"status": status, "steps": step_timings})
-    current_step = step_start("init")
-    ensure_dir(out_dir)
-    cache = Cache(os.path.join(cache_dir, "cache.sqlite"))
+            chunk_count=0,
+            chunk_skipped=0,
+            chunk_processed=0,
+            chunk_failed=0,
+            span_count=0,
+            suppressed_count=0,
+        ),
+        {"status": "running"},
+    )
     step_end(current_step)
-    write_snapshot("running")
 
     current_step = step_start("probe_duration")
     duration = ffprobe_duration(input_path)
     step_end(current_step)
-    write_snapshot("running")
 
-    gcl_path = os.path.join(out_dir, "episode.gcl")
-    ensure_header(gcl_path)
+    gcl = GclWriter(os.path.join(out_dir, "episode.gcl"), fsync=gcl_fsync, index=gcl_index)
 
-    spans: List[Span] = []
+    spans = SpanTable()
     speakers_written: set[str] = set()
     speaker_by_sid: Dict[str, str] = {}
 
@@ -274,102 +436,218 @@ def run_pipeline(
     chunks = generate_chunks(duration, chunk_sec=chunk_sec, overlap_sec=overlap_sec)
     chunk_count = len(chunks)
     step_end(current_step)
-    write_snapshot("running")
 
     tmp_dir = os.path.join(out_dir, "_audio_chunks")
     ensure_dir(tmp_dir)
 
-    results: List[ResultItem] = []
-    results_lock = threading.Lock()
+    chunk_index = {chunk.chunk_id: idx for idx, chunk in enumerate(chunks)}
+    reorder = ReorderBuffer()
     errors: List[Exception] = []
 
+    chunk_errors: Dict[str, str] = {}
+    gap_chunks: List[Chunk] = []
+    words_by_chunk: Dict[str, Union[WordTable, List[dict]]] = {}
+
+    def emit(item: ResultItem) -> None:
+        nonlocal chunk_skipped, chunk_processed, chunk_failed, span_count
+        chunk, skip_reason, chunk_spans, speaker_block, speaker_map_block, gcl_overrides, words = item
+        if skip_reason:
+            block = {
+                "chunk_id": chunk.chunk_id,
+                "t0": f"{chunk.t0}",
+                "t1": f"{chunk.t1}",
+                "overlap_left": f"{chunk.overlap_left}",
+                "overlap_right": f"{chunk.overlap_right}",
+                "skip_reason": skip_reason,
+            }
+            if skip_reason == "failed":
+                block["error"] = chunk_errors.get(chunk.chunk_id, "")
+                gap_chunks.append(chunk)
+                chunk_failed += 1
+            else:
+                chunk_skipped += 1
+            gcl.write_block("GCL_CHUNK", block)
+            return
+
+        gcl.write_block(
+            "GCL_CHUNK",
+            {
+                "chunk_id": chunk.chunk_id,
+                "t0": f"{chunk.t0}",
+                "t1": f"{chunk.t1}",
+                "overlap_left": f"{chunk.overlap_left}",
+                "overlap_right": f"{chunk.overlap_right}",
+            },
+        )
+        chunk_processed += 1
+        if words and overlap_policy == "stitch":
+            words_by_chunk[chunk.chunk_id] = words
+
+        for override in gcl_overrides:
+            gcl.write_block("GCL_OVERRIDE", override)
+
+        if speaker_block:
+            spk_id = speaker_block.get("spk_id", "")
+            label = speaker_block.get("label", "")
+            if spk_id and spk_id not in speakers_written:
+                gcl.write_block("GCL_SPEAKER", speaker_block)
+                speakers_written.add(spk_id)
+            if speaker_map_block:
+                gcl.write_block("GCL_SPEAKER_MAP", speaker_map_block)
+                if label:
+                    speaker_by_sid[speaker_map_block.get("sid", "")] = label
+
+        for span in chunk_spans:
+            spans.append_span(span)
+            span_count += 1
+            gcl.write_block("GCL_SPAN", _span_fields(span))
+
+    def failed_item(chunk: Chunk, exc: Exception) -> ResultItem:
+        chunk_errors[chunk.chunk_id] = " ".join(str(exc).split()) or type(exc).__name__
+        return (chunk, "failed", [], {}, {}, [], [])
+
+    def complete(item: ResultItem) -> None:
+        # Emit every chunk that now extends the ordered prefix; later chunks wait.
+        ready = reorder.push(chunk_index[item[0].chunk_id], item)
+        for ready_item in ready:
+            emit(ready_item)
+        if ready:
+            gcl.flush()
+
     vad_enabled = vad_name.lower() not in {"none", "off", "disabled"}
 
+    chunk_languages: Dict[str, Tuple[str, float]] = {}
+    if provider == "deepgram" and local_lid and chunks:
+        current_step = step_start("local_lid")
+        chunk_languages = _local_chunk_languages(
+            input_path=input_path,
+            chunks=chunks,
+            tmp_dir=tmp_dir,
+            cache_dir=lid_cache_dir,
+            device=lid_device,
+            max_batch_sec=lid_max_batch_sec,
+            precision=lid_precision,
+            runtime=lid_runtime,
+            min_score=lid_min_score,
+        )
+        step_end(current_step)
+
+    def chunk_params(chunk: Chunk) -> dict:
+        assigned = chunk_languages.get(chunk.chunk_id)
+        if assigned is None:
+            return params
+        fixed = dict(params)
+        fixed["language"] = assigned[0]
+        fixed["detect_language"] = False
+        fixed["detect_language_set"] = []
+        return fixed
+
     current_step = step_start("chunk_process")
     executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    future_map: Dict[Future, Tuple[Chunk, bool]] = {}
+    pending: set[Future] = set()
+    held: List[Tuple[ResultItem, bool]] = []
+    reissued: List[str] = []
+    # Set only once the probe has fixed the episode language.
+    fixed_language = ""
+
+    def submit(chunk: Chunk, *, speculative: bool = False) -> Future:
+        future = executor.submit(
+            _process_chunk,
+            chunk=chunk,
+            input_path=input_path,
+            provider=provider,
+            params=chunk_params(chunk),
+            cache=cache,
+            span_start_id=chunk_index[chunk.chunk_id] + 1,
+            retry=retry,
+            vad_enabled=vad_enabled,
+            vad_threshold=vad_threshold,
+            vad_min_speech_sec=vad_min_speech_sec,
+            vad_merge_gap_sec=vad_merge_gap_sec,
+            vad_pad_sec=vad_pad_sec,
+            tmp_dir=tmp_dir,
+            local_language=chunk_languages.get(chunk.chunk_id),
+            tracer=tracer,
+            submitted_at=tracer.now(),
+        )
+        future_map[future] = (chunk, speculative)
+        pending.add(future)
+        return future
+
+    def accept(item: ResultItem) -> None:
+        nonlocal progress_chunk_skipped, progress_chunk_processed, progress_span_count
+        complete(item)
+        _, skip_reason, chunk_spans, _, _, _, _ = item
+        if skip_reason:
+            progress_chunk_skipped += 1
+        else:
+            progress_chunk_processed += 1
+            progress_span_count += len(chunk_spans)
+        report_progress()
+
+    def settle(item: ResultItem, speculative: bool) -> None:
+        if speculative and fixed_language and _detected_other_language(item, fixed_language):
+            reissued.append(item[0].chunk_id)
+            submit(item[0])
+        else:
+            accept(item)
+
     try:
-        # Probe first chunk to infer dominant language without extra passes.
-        if provider == "deepgram" and deepgram_detect_language and chunks:
-            probe_chunk = chunks[0]
-            try:
-                probe_item = _process_chunk(
-                    chunk=probe_chunk,
-                    input_path=input_path,
-                    provider=provider,
-                    params=params,
-                    cache=cache,
-                    span_start_id=1,
-                    retry=retry,
-                    vad_enabled=vad_enabled,
-                    vad_threshold=vad_threshold,
-                    vad_min_speech_sec=vad_min_speech_sec,
-                    vad_merge_gap_sec=vad_merge_gap_sec,
-                    vad_pad_sec=vad_pad_sec,
-                    tmp_dir=tmp_dir,
-                )
-                results.append(probe_item)
-                _, skip_reason, probe_spans, _, _, _ = probe_item
-                if skip_reason:
-                    progress_chunk_skipped += 1
-                else:
-                    progress_chunk_processed += 1
-                    progress_span_count += len(probe_spans)
-                    if probe_spans:
-                        lang_hint = _infer_language_from_text(probe_spans[0].text_raw)
-                        if lang_hint:
-                            params = dict(params)
-                            params["detect_language"] = False
-                            params["detect_language_set"] = []
-                            params["language"] = lang_hint
-                write_snapshot("running")
-                chunks = chunks[1:]
-            except Exception as exc:  # noqa: BLE001
-                errors.append(exc)
-
-        future_map = {}
-        start_idx = 2 if results else 1
-        for idx, chunk in enumerate(chunks, start=start_idx):
-            future = executor.submit(
-                _process_chunk,
-                chunk=chunk,
-                input_path=input_path,
-                provider=provider,
-                params=params,
-                cache=cache,
-                span_start_id=idx,
-                retry=retry,
-                vad_enabled=vad_enabled,
-                vad_threshold=vad_threshold,
-                vad_min_speech_sec=vad_min_speech_sec,
-                vad_merge_gap_sec=vad_merge_gap_sec,
-                vad_pad_sec=vad_pad_sec,
-                tmp_dir=tmp_dir,
-            )
-            future_map[future] = chunk
-
-        for future in as_completed(future_map):
-            try:
-                item = future.result()
-                with results_lock:
-                    results.append(item)
-                _, skip_reason, chunk_spans, _, _, _ = item
-                if skip_reason:
-                    progress_chunk_skipped += 1
-                else:
-                    progress_chunk_processed += 1
-                    progress_span_count += len(chunk_spans)
-                write_snapshot("running")
-            except Exception as exc:  # noqa: BLE001
-                errors.append(exc)
-                break
-    except KeyboardInterrupt as exc:
+        # With detection on, the first chunk doubles as a language probe. The
+        # rest start at once with detection on too; when the probe settles the
+        # episode language, chunks still queued are resubmitted with it fixed
+        # and finished ones are reissued only if they detected something else.
+        speculate = provider == "deepgram" and deepgram_detect_language and bool(chunks) and not chunk_languages
+        probe: Optional[Future] = submit(chunks[0]) if speculate else None
+        for chunk in chunks[1:] if speculate else chunks:
+            submit(chunk, speculative=speculate)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            # Settle the probe before anything that finished alongside it.
+            for future in sorted(done, key=lambda f: f is not probe):
+                pending.discard(future)
+                chunk, speculative = future_map.pop(future)
+                try:
+                    item = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    item = failed_item(chunk, exc)
+                    if not keep_going:
+                        raise
+                if future is not probe:
+                    if probe is not None:
+                        held.append((item, speculative))
+                    else:
+                        settle(item, speculative)
+                    continue
+
+                probe = None
+                probe_spans = item[2]
+                lang_hint = _infer_language_from_text(probe_spans[0].text_raw) if probe_spans else ""
+                if lang_hint:
+                    fixed_language = lang_hint
+                    params = dict(params)
+                    params["detect_language"] = False
+                    params["detect_language_set"] = []
+                    params["language"] = lang_hint
+                    for queued in [f for f in pending if future_map[f][1]]:
+                        if queued.cancel():
+                            pending.discard(queued)
+                            submit(future_map.pop(queued)[0])
+                accept(item)
+                for held_item, held_speculative in held:
+                    settle(held_item, held_speculative)
+                held.clear()
+    except (Exception, KeyboardInterrupt) as exc:  # noqa: BLE001
         errors.append(exc)
     finally:
         executor.shutdown(wait=False, cancel_futures=True)
     step_end(current_step)
-    write_snapshot("running")
 
     if errors:
+        gcl.close()
+        tracer.write_chrome_trace(os.path.join(out_dir, "trace.json"))
         ended_at = now()
         stats = RunStats(
             started_at=started_at,
@@ -381,91 +659,48 @@ def run_pipeline(
             chunk_count=chunk_count,
             chunk_skipped=chunk_skipped,
             chunk_processed=chunk_processed,
-            chunk_failed=1,
+            chunk_failed=len(chunk_errors),
             span_count=span_count,
             suppressed_count=suppressed_count,
         )
         write_run_log(
             os.path.join(out_dir, "run.log"),
             stats,
-            {"error": str(errors[0]), "steps": step_timings},
+            {
+                "error": str(errors[0]),
+                "failed_chunks": chunk_errors,
+                "steps": step_timings,
+                "stages": tracer.summary(),
+                "cache": cache.stats.to_dict(),
+            },
         )
+        progress.event("end", {"status": "error", "error": str(errors[0])})
+        progress.close()
         if isinstance(errors[0], KeyboardInterrupt):
             raise KeyboardInterrupt from errors[0]
+        if chunk_errors:
+            raise RuntimeError(f"{len(chunk_errors)} chunk(s) failed: {', '.join(sorted(chunk_errors))}") from errors[0]
         raise RuntimeError("Chunk failed") from errors[0]
 
-    results.sort(key=lambda x: x[0].t0)
-
-    for chunk, skip_reason, chunk_spans, speaker_block, speaker_map_block, gcl_overrides in results:
-        if skip_reason:
-            append_block(
-                gcl_path,
-                "GCL_CHUNK",
-                {
-                    "chunk_id": chunk.chunk_id,
-                    "t0": f"{chunk.t0}",
-                    "t1": f"{chunk.t1}",
-                    "overlap_left": f"{chunk.overlap_left}",
-                    "overlap_right": f"{chunk.overlap_right}",
-                    "skip_reason": skip_reason,
-                },
-            )
-            chunk_skipped += 1
-            continue
-
-        append_block(
-            gcl_path,
-            "GCL_CHUNK",
-            {
-                "chunk_id": chunk.chunk_id,
-                "t0": f"{chunk.t0}",
-                "t1": f"{chunk.t1}",
-                "overlap_left": f"{chunk.overlap_left}",
-                "overlap_right": f"{chunk.overlap_right}",
-            },
-        )
-        chunk_processed += 1
-
-        for override in gcl_overrides:
-            append_block(gcl_path, "GCL_OVERRIDE", override)
-
-        if speaker_block:
-            spk_id = speaker_block.get("spk_id", "")
-            label = speaker_block.get("label", "")
-            if spk_id and spk_id not in speakers_written:
-                append_block(gcl_path, "GCL_SPEAKER", speaker_block)
-                speakers_written.add(spk_id)
-            if speaker_map_block:
-                append_block(gcl_path, "GCL_SPEAKER_MAP", speaker_map_block)
-                if label:
-                    speaker_by_sid[speaker_map_block.get("sid", "")] = label
-
-        for span in chunk_spans:
-            spans.append(span)
-            span_count += 1
-            append_block(
-                gcl_path,
-                "GCL_SPAN",
-                {
-                    "sid": span.sid,
-                    "t0": f"{span.t0}",
-                    "t1": f"{span.t1}",
-                    "chunk_id": span.chunk_id,
-                    "text_raw": span.text_raw,
-                    "asr_conf": f"{span.asr_conf}",
-                },
-            )
-
-    current_step = step_start("overlap_judge")
-    overlap_records, suppressed = overlap_judge(chunks, spans)
-    step_end(current_step)
+    if overlap_policy == "stitch":
+        current_step = step_start("overlap_stitch")
+        overlap_records, rewritten, suppressed = stitch_overlaps(chunks, spans, words_by_chunk)
+        step_end(current_step)
+        replaced = {span.sid: span for span in rewritten}
+        spans = SpanTable.from_spans([replaced.get(span.sid, span) for span in spans], pool=spans.pool)
+    else:
+        current_step = step_start("overlap_judge")
+        overlap_records, suppressed = overlap_judge(chunks, spans)
+        step_end(current_step)
+        rewritten = []
     suppressed_count = len(suppressed)
-    write_snapshot("running")
     for record in overlap_records:
-        append_block(gcl_path, "GCL_OVERLAP", record)
+        gcl.write_block("GCL_OVERLAP", record)
+    # Re-emitted spans replace the originals on replay.
+    for span in rewritten:
+        gcl.write_block("GCL_SPAN", _span_fields(span))
     for sid in suppressed:
-        append_block(
-            gcl_path,
+        gcl.write_block(
             "GCL_OVERRIDE",
             {
                 "oid": f"SUP_{sid}",
@@ -476,37 +711,33 @@ def run_pipeline(
         )
 
     suppressed_set = set(suppressed)
-    spans_filtered = [span for span in spans if span.sid not in suppressed_set]
+    spans_filtered = spans.without(suppressed_set)
 
     current_step = step_start("entity_extract")
     entities, mentions = extract_entities(spans_filtered)
     step_end(current_step)
-    write_snapshot("running")
     for entity in entities:
-        append_block(gcl_path, "GCL_ENTITY", entity)
+        gcl.write_block("GCL_ENTITY", entity)
     for mention in mentions:
-        append_block(gcl_path, "GCL_MENTION", mention)
+        gcl.write_block("GCL_MENTION", mention)
+    gcl.close()
 
     current_step = step_start("render_outputs")
-    transcript = render_transcript(spans_filtered, speaker_by_sid=speaker_by_sid)
-    srt = render_srt(spans_filtered, speaker_by_sid=speaker_by_sid)
-    step_end(current_step)
-    write_snapshot("running")
-
-    current_step = step_start("write_outputs")
-    with open(os.path.join(out_dir, "transcript.txt"), "w", encoding="utf-8") as f:
-        f.write(transcript)
-    with open(os.path.join(out_dir, "subtitles.srt"), "w", encoding="utf-8") as f:
-        f.write(srt)
+    rendered = spans_filtered.copy()
+    rendered.extend(gap_span(chunk) for chunk in gap_chunks)
+    render_files(
+        rendered,
+        {fmt: os.path.join(out_dir, name) for fmt, name in OUTPUT_FILES.items()},
+        speaker_by_sid=speaker_by_sid,
+    )
     step_end(current_step)
-    write_snapshot("running")
 
     if os.path.isdir(tmp_dir):
         current_step = step_start("cleanup")
         shutil.rmtree(tmp_dir, ignore_errors=True)
         step_end(current_step)
-        write_snapshot("running")
 
+    tracer.write_chrome_trace(os.path.join(out_dir, "trace.json"))
     ended_at = now()
     stats = RunStats(
         started_at=started_at,
@@ -518,8 +749,34 @@ def run_pipeline(
         chunk_count=chunk_count,
         chunk_skipped=chunk_skipped,
         chunk_processed=chunk_processed,
-        chunk_failed=0,
+        chunk_failed=chunk_failed,
         span_count=len(spans_filtered),
         suppressed_count=suppressed_count,
     )
-    write_run_log(os.path.join(out_dir, "run.log"), stats, {"status": "done", "steps": step_timings})
+    write_run_log(
+        os.path.join(out_dir, "run.log"),
+        stats,
+        {
+            "status": "partial" if chunk_errors else "done",
+            "failed_chunks": chunk_errors,
+            "reissued_chunks": reissued,
+            "steps": step_timings,
+            "stages": tracer.summary(),
+            "cache": cache.stats.to_dict(),
+        },
+    )
+    progress.event("end", {"status": "partial" if chunk_errors else "done"})
+    progress.close()
+    append_run_record(
+        os.path.join(cache_dir, "runs.jsonl"),
+        {
+            "command": "pipeline",
+            "input": input_path,
+            "started_at": started_at,
+            "ended_at": ended_at,
+            "failed_chunks": sorted(chunk_errors),
+            "cache": cache.stats.to_dict(),
+        },
+    )
+    if chunk_errors:
+        raise PartialRunError(chunk_errors)
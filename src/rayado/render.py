@@ -1,8 +1,20 @@
 ﻿from __future__ import annotations
 
-from typing import Dict, Iterable, List, Optional
+import io
+import json
+import os
+from typing import Dict, Iterable, Optional, TextIO, Union
 
-from .models import Span
+from .models import Chunk, Span
+from .tables import SpanLike, SpanTable
+
+# Output format -> file name used by the pipeline and `rayado replay`.
+OUTPUT_FILES = {
+    "txt": "transcript.txt",
+    "srt": "subtitles.srt",
+    "vtt": "subtitles.vtt",
+    "jsonl": "transcript.jsonl",
+}
 
 
 def _format_srt_time(seconds: float) -> str:
@@ -18,51 +30,145 @@ def _format_srt_time(seconds: float) -> str:
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
 
 
+def _format_vtt_time(seconds: float) -> str:
+    return _format_srt_time(seconds).replace(",", ".")
+
+
+def gap_span(chunk: Chunk) -> Span:
+    """Placeholder cue marking a chunk whose transcription failed."""
+    return Span(
+        sid=f"GAP_{chunk.chunk_id}",
+        t0=chunk.t0,
+        t1=chunk.t1,
+        chunk_id=chunk.chunk_id,
+        text_raw=f"[gap {chunk.chunk_id}]",
+        asr_conf=0.0,
+    )
+
+
 def _speaker_prefix(
-    span: Span,
+    sid: str,
     *,
     speaker_by_sid: Optional[Dict[str, str]],
 ) -> str:
     if not speaker_by_sid:
         return ""
-    label = speaker_by_sid.get(span.sid)
+    label = speaker_by_sid.get(sid)
     if not label:
         return ""
     return f"{label}: "
 
 
-def render_transcript(
-    spans: Iterable[Span],
+def render_streams(
+    spans: Union[SpanTable, Iterable[SpanLike]],
+    streams: Dict[str, TextIO],
     *,
     speaker_by_sid: Optional[Dict[str, str]] = None,
-) -> str:
-    lines: List[str] = []
-    for span in sorted(spans, key=lambda s: (s.t0, s.t1, s.sid)):
-        text = span.text_raw.strip()
+) -> int:
+    """Write every format in `streams` (keys from OUTPUT_FILES) in one pass.
+
+    Rows are sorted once by index over the SpanTable columns; each cue goes
+    straight to the streams, so nothing but the row order is held on top of
+    the table. Returns the cue count.
+    """
+    unknown = set(streams) - set(OUTPUT_FILES)
+    if unknown:
+        raise ValueError(f"Unsupported output format: {', '.join(sorted(unknown))}")
+    txt = streams.get("txt")
+    srt = streams.get("srt")
+    vtt = streams.get("vtt")
+    jsonl = streams.get("jsonl")
+    if vtt is not None:
+        vtt.write("WEBVTT\n")
+
+    table = SpanTable.coerce(spans)
+    strings = table.pool.strings
+    t0s, t1s, sids = table.t0, table.t1, table.sid
+    index = 0
+    for row in sorted(range(len(table)), key=lambda r: (t0s[r], t1s[r], strings[sids[r]])):
+        text = strings[table.text[row]].strip()
         if not text:
             continue
-        prefix = _speaker_prefix(span, speaker_by_sid=speaker_by_sid)
-        lines.append(f"{prefix}{text}")
-    return "\n".join(lines) + ("\n" if lines else "")
+        index += 1
+        sid = strings[sids[row]]
+        start = t0s[row]
+        end = max(t1s[row], start + 0.001)
+        prefix = _speaker_prefix(sid, speaker_by_sid=speaker_by_sid)
+        if txt is not None:
+            txt.write(f"{prefix}{text}\n")
+        if srt is not None:
+            # Cues are separated, not terminated, by a blank line.
+            if index > 1:
+                srt.write("\n")
+            srt.write(f"{index}\n{_format_srt_time(start)} --> {_format_srt_time(end)}\n{prefix}{text}\n")
+        if vtt is not None:
+            vtt.write(f"\n{index}\n{_format_vtt_time(start)} --> {_format_vtt_time(end)}\n{prefix}{text}\n")
+        if jsonl is not None:
+            record = {
+                "index": index,
+                "sid": sid,
+                "chunk_id": strings[table.chunk_id[row]],
+                "t0": start,
+                "t1": end,
+                "speaker": (speaker_by_sid or {}).get(sid, ""),
+                "text": text,
+            }
+            jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return index
+
+
+def render_files(
+    spans: Union[SpanTable, Iterable[SpanLike]],
+    paths: Dict[str, str],
+    *,
+    speaker_by_sid: Optional[Dict[str, str]] = None,
+) -> int:
+    """`render_streams` into files; each is written to a temp name and renamed on success."""
+    streams: Dict[str, TextIO] = {}
+    try:
+        for fmt, path in paths.items():
+            streams[fmt] = open(f"{path}.tmp", "w", encoding="utf-8")
+        count = render_streams(spans, streams, speaker_by_sid=speaker_by_sid)
+    except BaseException:
+        for fmt, stream in streams.items():
+            stream.close()
+            os.remove(f"{paths[fmt]}.tmp")
+        raise
+    for fmt, stream in streams.items():
+        stream.close()
+        os.replace(f"{paths[fmt]}.tmp", paths[fmt])
+    return count
+
+
+def _render_one(
+    fmt: str,
+    spans: Union[SpanTable, Iterable[SpanLike]],
+    speaker_by_sid: Optional[Dict[str, str]],
+) -> str:
+    buffer = io.StringIO()
+    render_streams(spans, {fmt: buffer}, speaker_by_sid=speaker_by_sid)
+    return buffer.getvalue()
+
+
+def render_transcript(
+    spans: Union[SpanTable, Iterable[SpanLike]],
+    *,
+    speaker_by_sid: Optional[Dict[str, str]] = None,
+) -> str:
+    return _render_one("txt", spans, speaker_by_sid)
 
 
 def render_srt(
-    spans: Iterable[Span],
+    spans: Union[SpanTable, Iterable[SpanLike]],
     *,
     speaker_by_sid: Optional[Dict[str, str]] = None,
 ) -> str:
-    output: List[str] = []
-    index = 1
-    for span in sorted(spans, key=lambda s: (s.t0, s.t1, s.sid)):
-        text = span.text_raw.strip()
-        if not text:
-            continue
-        start = span.t0
-        end = max(span.t1, span.t0 + 0.001)
-        prefix = _speaker_prefix(span, speaker_by_sid=speaker_by_sid)
-        output.append(str(index))
-        output.append(f"{_format_srt_time(start)} --> {_format_srt_time(end)}")
-        output.append(f"{prefix}{text}")
-        output.append("")
-        index += 1
-    return "\n".join(output)
+    return _render_one("srt", spans, speaker_by_sid)
+
+
+def render_vtt(
+    spans: Union[SpanTable, Iterable[SpanLike]],
+    *,
+    speaker_by_sid: Optional[Dict[str, str]] = None,
+) -> str:
+    return _render_one("vtt", spans, speaker_by_sid)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Set
+
+from .gcl import GclBlock, iter_blocks, open_log
+from .models import Chunk, Span
+from .render import OUTPUT_FILES, gap_span, render_files
+from .utils import ensure_dir, sha256_hex
+
+SNAPSHOT_VERSION = 1
+
+# Bytes before the snapshot offset that must still match for the snapshot to apply.
+FINGERPRINT_BYTES = 4096
+
+
+def _float(value: str, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+class GclState:
+    """Resolved episode state built by applying GCL blocks in log order.
+
+    Later blocks win: a rerun that re-emits a span replaces the earlier copy,
+    and `GCL_OVERRIDE policy suppress` hides a span from rendered outputs.
+    Span fields are kept as parsed and only turned into `Span` objects on
+    demand, which keeps `apply` cheap on long logs.
+    """
+
+    def __init__(self) -> None:
+        self.header: Dict[str, str] = {}
+        self.chunks: Dict[str, Dict[str, str]] = {}
+        self.spans: Dict[str, Dict[str, str]] = {}
+        self.speakers: Dict[str, Dict[str, str]] = {}
+        self.speaker_of_sid: Dict[str, str] = {}
+        self.overrides: Dict[str, Dict[str, str]] = {}
+        self.suppressed: Set[str] = set()
+        self.overlaps: List[Dict[str, str]] = []
+        self.entities: Dict[str, Dict[str, str]] = {}
+        self.mentions: List[Dict[str, str]] = []
+        self.offset = 0
+        self.block_count = 0
+
+    def apply(self, block: GclBlock) -> None:
+        fields = block.fields
+        kind = block.block_type
+        if kind == "GCL_SPAN":
+            self.spans[fields.get("sid", "")] = fields
+        elif kind == "GCL_HDR":
+            self.header = dict(fields)
+        elif kind == "GCL_CHUNK":
+            self.chunks[fields.get("chunk_id", "")] = fields
+        elif kind == "GCL_SPEAKER":
+            self.speakers[fields.get("spk_id", "")] = fields
+        elif kind == "GCL_SPEAKER_MAP":
+            self.speaker_of_sid[fields.get("sid", "")] = fields.get("spk_id", "")
+        elif kind == "GCL_OVERRIDE":
+            self.overrides[fields.get("oid", "")] = fields
+            if fields.get("policy") == "suppress":
+                self.suppressed.add(fields.get("sid", ""))
+        elif kind == "GCL_OVERLAP":
+            self.overlaps.append(fields)
+        elif kind == "GCL_ENTITY":
+            self.entities[fields.get("eid", "")] = fields
+        elif kind == "GCL_MENTION":
+            self.mentions.append(fields)
+        self.offset = block.end
+        self.block_count += 1
+
+    def span(self, sid: str) -> Span:
+        fields = self.spans[sid]
+        return Span(
+            sid=sid,
+            t0=_float(fields.get("t0", "")),
+            t1=_float(fields.get("t1", "")),
+            chunk_id=fields.get("chunk_id", ""),
+            text_raw=fields.get("text_raw", ""),
+            asr_conf=_float(fields.get("asr_conf", "")),
+        )
+
+    def visible_spans(self) -> List[Span]:
+        return [self.span(sid) for sid in self.spans if sid not in self.suppressed]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Resolved state: suppressed spans and their speaker links are dropped."""
+        spans = {sid: fields for sid, fields in self.spans.items() if sid not in self.suppressed}
+        return {
+            "header": self.header,
+            "chunks": self.chunks,
+            "spans": spans,
+            "speakers": self.speakers,
+            "speaker_of_sid": {sid: spk for sid, spk in self.speaker_of_sid.items() if sid in spans},
+            "overrides": self.overrides,
+            "suppressed": sorted(self.suppressed),
+            "overlaps": self.overlaps,
+            "entities": self.entities,
+            "mentions": self.mentions,
+            "offset": self.offset,
+            "block_count": self.block_count,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "GclState":
+        state = cls()
+        state.header = payload["header"]
+        state.chunks = payload["chunks"]
+        state.spans = payload["spans"]
+        state.speakers = payload["speakers"]
+        state.speaker_of_sid = payload["speaker_of_sid"]
+        state.overrides = payload["overrides"]
+        state.suppressed = set(payload["suppressed"])
+        state.overlaps = payload["overlaps"]
+        state.entities = payload["entities"]
+        state.mentions = payload["mentions"]
+        state.offset = payload["offset"]
+        state.block_count = payload["block_count"]
+        return state
+
+    def failed_chunks(self) -> List[Chunk]:
+        return [
+            Chunk(chunk_id, _float(fields.get("t0", "")), _float(fields.get("t1", "")), 0.0, 0.0)
+            for chunk_id, fields in self.chunks.items()
+            if fields.get("skip_reason") == "failed"
+        ]
+
+    def speaker_by_sid(self) -> Dict[str, str]:
+        labels: Dict[str, str] = {}
+        for sid, spk_id in self.speaker_of_sid.items():
+            label = self.speakers.get(spk_id, {}).get("label", "")
+            if label:
+                labels[sid] = label
+        return labels
+
+
+def replay_gcl(path: str, *, state: Optional[GclState] = None, start_offset: Optional[int] = None) -> GclState:
+    """Apply every block from `start_offset` (default: the state's offset) onwards."""
+    state = state if state is not None else GclState()
+    offset = state.offset if start_offset is None else start_offset
+    for block in iter_blocks(path, start_offset=offset):
+        state.apply(block)
+    return state
+
+
+def snapshot_path(path: str) -> str:
+    return f"{path}.snap.json"
+
+
+def _fingerprint(path: str, offset: int) -> Optional[str]:
+    start = max(0, offset - FINGERPRINT_BYTES)
+    with open_log(path) as f:
+        f.seek(start)
+        data = f.read(offset - start)
+    if len(data) != offset - start:
+        return None
+    return sha256_hex(data)
+
+
+def load_snapshot(path: str, *, snap_path: Optional[str] = None) -> Optional[GclState]:
+    """Return the snapshot state if it still describes a prefix of `path`."""
+    snap_path = snap_path or snapshot_path(path)
+    try:
+        with open(snap_path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if payload.get("version") != SNAPSHOT_VERSION:
+        return None
+    state = GclState.from_dict(payload["state"])
+    if _fingerprint(path, state.offset) != payload.get("fingerprint"):
+        return None
+    return state
+
+
+def load_state(path: str, *, snap_path: Optional[str] = None) -> GclState:
+    """Snapshot (when valid) plus the blocks appended after it."""
+    state = load_snapshot(path, snap_path=snap_path)
+    return replay_gcl(path, state=state)
+
+
+def compact_gcl(path: str, *, snap_path: Optional[str] = None) -> GclState:
+    """Fold the log into a snapshot next to it; only the tail is replayed."""
+    snap_path = snap_path or snapshot_path(path)
+    state = load_state(path, snap_path=snap_path)
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "source": os.path.basename(path),
+        "fingerprint": _fingerprint(path, state.offset),
+        "state": state.to_dict(),
+    }
+    tmp_path = f"{snap_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, snap_path)
+    return state
+
+
+def write_outputs(state: GclState, out_dir: str) -> Dict[str, str]:
+    """Render every format in OUTPUT_FILES; returns format -> path."""
+    ensure_dir(out_dir)
+    spans = state.visible_spans() + [gap_span(chunk) for chunk in state.failed_chunks()]
+    paths = {fmt: os.path.join(out_dir, name) for fmt, name in OUTPUT_FILES.items()}
+    render_files(spans, paths, speaker_by_sid=state.speaker_by_sid())
+    return paths
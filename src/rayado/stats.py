@@ -1,10 +1,15 @@
 ﻿from __future__ import annotations
 
 import json
+import math
 import os
+import threading
 import time
+from contextlib import contextmanager, nullcontext
 from dataclasses import asdict, dataclass
-from typing import Any, Dict
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional
+
+from .utils import ensure_dir
 
 
 @dataclass
@@ -23,6 +28,141 @@ class RunStats:
     suppressed_count: int
 
 
+class ProgressLog:
+    """Append-only JSONL progress stream with a time-based throttle.
+
+    `update` writes at most one line per `interval_sec`, so reporting cost is
+    bounded per second rather than per chunk; `event` always writes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        interval_sec: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        ensure_dir(os.path.dirname(path) or ".")
+        self.path = path
+        self.interval_sec = interval_sec
+        self._clock = clock
+        self._last: Optional[float] = None
+        self._f = open(path, "w", encoding="utf-8")
+
+    def update(self, payload: Dict[str, Any]) -> bool:
+        clock = self._clock()
+        if self._last is not None and clock - self._last < self.interval_sec:
+            return False
+        self._last = clock
+        self.event("progress", payload)
+        return True
+
+    def event(self, kind: str, payload: Dict[str, Any]) -> None:
+        if self._f.closed:
+            return
+        self._f.write(json.dumps({"event": kind, "t": now(), **payload}, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class StageTracer:
+    """Thread-safe per-chunk stage spans for one run.
+
+    Spans are kept as Trace Event Format "complete" events (`ph: "X"`, times
+    in microseconds from tracer creation), so `write_chrome_trace` output opens
+    as-is in chrome://tracing or ui.perfetto.dev; each worker thread gets its
+    own track.
+    """
+
+    def __init__(self, *, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self._origin = clock()
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, Dict[str, Any]] = {}
+
+    def now(self) -> float:
+        return self._clock()
+
+    def add(self, name: str, started: float, ended: float, *, chunk_id: str = "") -> None:
+        thread = threading.current_thread()
+        with self._lock:
+            track = self._threads.get(thread.ident or 0)
+            if track is None:
+                track = {"tid": len(self._threads) + 1, "name": thread.name}
+                self._threads[thread.ident or 0] = track
+            self._events.append(
+                {
+                    "name": name,
+                    "cat": "chunk" if chunk_id else "run",
+                    "ph": "X",
+                    "ts": round((started - self._origin) * 1e6, 1),
+                    "dur": round(max(0.0, ended - started) * 1e6, 1),
+                    "pid": 1,
+                    "tid": track["tid"],
+                    "args": {"chunk_id": chunk_id} if chunk_id else {},
+                }
+            )
+
+    @contextmanager
+    def span(self, name: str, *, chunk_id: str = "") -> Iterator[None]:
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.add(name, started, self._clock(), chunk_id=chunk_id)
+
+    def events(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._events)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        with self._lock:
+            names = [
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": track["tid"], "args": {"name": track["name"]}}
+                for track in self._threads.values()
+            ]
+            return {"traceEvents": names + list(self._events), "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        ensure_dir(os.path.dirname(path) or ".")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f, ensure_ascii=False)
+            f.write("\n")
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count, total and nearest-rank p50/p90/p99/max, in ms."""
+        durations: Dict[str, List[float]] = {}
+        for event in self.events():
+            durations.setdefault(event["name"], []).append(event["dur"] / 1000.0)
+        summary: Dict[str, Dict[str, float]] = {}
+        for name, values in durations.items():
+            values.sort()
+            summary[name] = {
+                "count": len(values),
+                "total_ms": round(sum(values), 3),
+                "p50_ms": round(_percentile(values, 50), 3),
+                "p90_ms": round(_percentile(values, 90), 3),
+                "p99_ms": round(_percentile(values, 99), 3),
+                "max_ms": round(values[-1], 3),
+            }
+        return summary
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def stage_span(tracer: Optional[StageTracer], name: str, *, chunk_id: str = "") -> ContextManager[None]:
+    """`tracer.span(...)`, or a no-op when tracing is off."""
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, chunk_id=chunk_id)
+
+
 def write_run_log(path: str, stats: RunStats, extra: Dict[str, Any] | None = None) -> None:
     payload = asdict(stats)
     if extra:
@@ -32,5 +172,28 @@ def write_run_log(path: str, stats: RunStats, extra: Dict[str, Any] | None = Non
         f.write("\n")
 
 
+def append_run_record(path: str, record: Dict[str, Any]) -> None:
+    ensure_dir(os.path.dirname(path) or ".")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+
+
+def read_run_records(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    records: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
 def now() -> float:
     return time.time()
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Union
+
+from .models import Span
+
+# Pool id stored for a missing string (Deepgram words may lack `punctuated_word`).
+MISSING = -1
+
+_NAN = float("nan")
+
+_SPAN_COLUMNS = ("sid", "chunk_id", "text", "t0", "t1", "asr_conf")
+
+
+class StringPool:
+    """Interned strings; columns store the int id instead of a str per row.
+
+    Not thread-safe: share a pool only between tables filled on one thread.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return MISSING
+        idx = self._ids.get(value)
+        if idx is None:
+            idx = self._ids[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+    def get(self, idx: int) -> Optional[str]:
+        return None if idx == MISSING else self.strings[idx]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class SpanView:
+    """Read-only row of a SpanTable with the attribute names of `Span`."""
+
+    __slots__ = ("_table", "_idx")
+
+    def __init__(self, table: "SpanTable", idx: int) -> None:
+        self._table = table
+        self._idx = idx
+
+    @property
+    def sid(self) -> str:
+        return self._table.pool.strings[self._table.sid[self._idx]]
+
+    @property
+    def t0(self) -> float:
+        return self._table.t0[self._idx]
+
+    @property
+    def t1(self) -> float:
+        return self._table.t1[self._idx]
+
+    @property
+    def chunk_id(self) -> str:
+        return self._table.pool.strings[self._table.chunk_id[self._idx]]
+
+    @property
+    def text_raw(self) -> str:
+        return self._table.pool.strings[self._table.text[self._idx]]
+
+    @property
+    def asr_conf(self) -> float:
+        return self._table.asr_conf[self._idx]
+
+    def to_span(self) -> Span:
+        return Span(self.sid, self.t0, self.t1, self.chunk_id, self.text_raw, self.asr_conf)
+
+    def __repr__(self) -> str:
+        return f"SpanView({self.to_span()!r})"
+
+
+SpanLike = Union[Span, SpanView]
+
+
+class SpanTable:
+    """Columnar spans: times and confidences in `array('d')`, strings as pool ids.
+
+    Iterating yields `SpanView`s, so code that only reads span attributes
+    works on a table unchanged; hot paths read the columns directly.
+    """
+
+    def __init__(self, *, pool: Optional[StringPool] = None) -> None:
+        self.pool = pool if pool is not None else StringPool()
+        self.sid = array("i")
+        self.chunk_id = array("i")
+        self.text = array("i")
+        self.t0 = array("d")
+        self.t1 = array("d")
+        self.asr_conf = array("d")
+
+    @classmethod
+    def from_spans(cls, spans: Iterable[SpanLike], *, pool: Optional[StringPool] = None) -> "SpanTable":
+        table = cls(pool=pool)
+        table.extend(spans)
+        return table
+
+    @classmethod
+    def coerce(cls, spans: Union["SpanTable", Iterable[SpanLike]]) -> "SpanTable":
+        return spans if isinstance(spans, SpanTable) else cls.from_spans(spans)
+
+    def append(self, *, sid: str, t0: float, t1: float, chunk_id: str, text_raw: str, asr_conf: float) -> None:
+        intern = self.pool.intern
+        self.sid.append(intern(sid))
+        self.chunk_id.append(intern(chunk_id))
+        self.text.append(intern(text_raw))
+        self.t0.append(t0)
+        self.t1.append(t1)
+        self.asr_conf.append(asr_conf)
+
+    def append_span(self, span: SpanLike) -> None:
+        self.append(
+            sid=span.sid,
+            t0=span.t0,
+            t1=span.t1,
+            chunk_id=span.chunk_id,
+            text_raw=span.text_raw,
+            asr_conf=span.asr_conf,
+        )
+
+    def extend(self, spans: Iterable[SpanLike]) -> None:
+        for span in spans:
+            self.append_span(span)
+
+    def select(self, indices: Sequence[int]) -> "SpanTable":
+        """New table (same pool) holding the given rows in the given order."""
+        table = SpanTable(pool=self.pool)
+        for name in _SPAN_COLUMNS:
+            source = getattr(self, name)
+            getattr(table, name).extend(source[i] for i in indices)
+        return table
+
+    def copy(self) -> "SpanTable":
+        return self.select(range(len(self)))
+
+    def without(self, sids: Set[str]) -> "SpanTable":
+        if not sids:
+            return self.copy()
+        strings = self.pool.strings
+        return self.select([i for i, sid in enumerate(self.sid) if strings[sid] not in sids])
+
+    def to_spans(self) -> List[Span]:
+        return [view.to_span() for view in self]
+
+    def __len__(self) -> int:
+        return len(self.sid)
+
+    def __getitem__(self, idx: int) -> SpanView:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return SpanView(self, idx)
+
+    def __iter__(self) -> Iterator[SpanView]:
+        return (SpanView(self, idx) for idx in range(len(self)))
+
+
+class WordView:
+    """Read-only row of a WordTable; `get` mirrors the Deepgram word dict."""
+
+    __slots__ = ("_table", "_idx")
+
+    def __init__(self, table: "WordTable", idx: int) -> None:
+        self._table = table
+        self._idx = idx
+
+    def get(self, key: str, default: Any = None) -> Any:
+        table = self._table
+        if key in ("word", "punctuated_word"):
+            value: Any = table.pool.get(getattr(table, key)[self._idx])
+        elif key == "speaker":
+            speaker = table.speaker[self._idx]
+            value = None if speaker < 0 else speaker
+        elif key in ("start", "end", "confidence", "speaker_confidence"):
+            number = getattr(table, key)[self._idx]
+            value = None if math.isnan(number) else number
+        else:
+            value = None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+class WordTable:
+    """Columnar Deepgram words (chunk-relative times), far smaller than a list of dicts.
+
+    Missing numbers are stored as NaN, a missing speaker as -1 and missing
+    strings as MISSING; `WordView.get` maps all of them back to None.
+    """
+
+    def __init__(self, *, pool: Optional[StringPool] = None) -> None:
+        self.pool = pool if pool is not None else StringPool()
+        self.word = array("i")
+        self.punctuated_word = array("i")
+        self.start = array("d")
+        self.end = array("d")
+        self.confidence = array("d")
+        self.speaker = array("i")
+        self.speaker_confidence = array("d")
+
+    @classmethod
+    def from_words(cls, words: Union["WordTable", Iterable[dict]], *, pool: Optional[StringPool] = None) -> "WordTable":
+        if isinstance(words, WordTable):
+            return words
+        table = cls(pool=pool)
+        for word in words:
+            table.append(word)
+        return table
+
+    def append(self, word: dict) -> None:
+        intern = self.pool.intern
+        self.word.append(intern(word.get("word")))
+        self.punctuated_word.append(intern(word.get("punctuated_word")))
+        self.start.append(_number(word.get("start")))
+        self.end.append(_number(word.get("end")))
+        self.confidence.append(_number(word.get("confidence")))
+        speaker = word.get("speaker")
+        self.speaker.append(-1 if speaker is None else int(speaker))
+        self.speaker_confidence.append(_number(word.get("speaker_confidence")))
+
+    def token(self, idx: int) -> str:
+        """`punctuated_word`, falling back to `word`, stripped ("" when neither is set)."""
+        strings = self.pool.strings
+        for column in (self.punctuated_word, self.word):
+            value = column[idx]
+            if value != MISSING and strings[value]:
+                return strings[value].strip()
+        return ""
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __getitem__(self, idx: int) -> WordView:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return WordView(self, idx)
+
+    def __iter__(self) -> Iterator[WordView]:
+        return (WordView(self, idx) for idx in range(len(self)))
+
+
+def _number(value: Any) -> float:
+    return _NAN if value is None else float(value)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rayado.cache import Cache, FsCacheBackend, HttpCacheBackend, export_bundle, import_bundle, open_cache
+
+
+@pytest.fixture
+def kv_server():
+    store: dict[str, bytes] = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            body = store.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_PUT(self):  # noqa: N802
+            length = int(self.headers.get("Content-Length", "0"))
+            store[self.path] = self.rfile.read(length)
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/cache", store
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _roundtrip(cache: Cache) -> None:
+    assert cache.get("k1", "req") is None
+    cache.set("k1", "req", {"spans": [], "meta": {"words": []}})
+    assert cache.get("k1", "req") == {"spans": [], "meta": {"words": []}}
+    assert cache.get("k1", "other") is None
+
+    assert cache.get_text("t1") is None
+    cache.set_text("t1", model="m", prompt_hash="p", input_hash="i", response="graph")
+    assert cache.get_text("t1") == "graph"
+
+
+def test_sqlite_backend_roundtrip(tmp_path):
+    _roundtrip(open_cache(str(tmp_path)))
+
+
+def test_fs_backend_roundtrip_and_sharding(tmp_path):
+    cache = open_cache(str(tmp_path), backend="fs")
+    _roundtrip(cache)
+    assert isinstance(cache.backend, FsCacheBackend)
+    cache.set("abcdef", "req", {"spans": []})
+    assert (tmp_path / "store" / "asr_cache" / "ab" / "cd" / "abcdef.json").exists()
+    assert not list((tmp_path / "store").rglob("*.tmp"))
+
+
+def test_http_backend_roundtrip(kv_server):
+    url, store = kv_server
+    cache = open_cache("", backend="http", url=url)
+    _roundtrip(cache)
+    assert json.loads(store["/cache/llm_cache/t1"])["response"] == "graph"
+
+
+def test_http_backend_unreachable_is_a_miss():
+    cache = Cache("", backend=HttpCacheBackend("http://127.0.0.1:9", timeout=0.5))
+    assert cache.get("k1", "req") is None
+    cache.set("k1", "req", {"spans": []})
+
+
+def test_bundle_seeds_new_node(tmp_path):
+    source = open_cache(str(tmp_path / "a"))
+    source.set("k1", "req", {"spans": [{"sid": "S00001"}]})
+    source.set_text("t1", model="m", prompt_hash="p", input_hash="i", response="graph")
+
+    bundle = tmp_path / "seed.jsonl.gz"
+    assert export_bundle(source, str(bundle)) == 2
+
+    target = open_cache(str(tmp_path / "b"), backend="fs")
+    assert import_bundle(target, str(bundle)) == 2
+    assert target.get("k1", "req") == {"spans": [{"sid": "S00001"}]}
+    assert target.get_text("t1") == "graph"
+
+
+def test_stats_classify_miss_reasons(tmp_path):
+    cache = open_cache(str(tmp_path))
+    assert cache.get("k1", "req") is None
+    cache.set("k1", "req", {"spans": []})
+    assert cache.get("k1", "req-drifted") is None
+    assert cache.get("k1", "req") == {"spans": []}
+
+    stats = cache.stats.to_dict()["asr_cache"]
+    assert (stats["hit"], stats["miss_absent"], stats["miss_drift"], stats["write"]) == (1, 1, 1, 1)
+    assert stats["hit_rate"] == round(1 / 3, 4)
+    assert sum(stats["latency_ms"]["get"]["counts"]) == 3
+    assert sum(stats["latency_ms"]["put"]["counts"]) == 1
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ("torch", "torchaudio", "speechbrain", "openai")
+
+
+def _run(args: list[str]) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env.pop("PYTHONSTARTUP", None)
+    return subprocess.run(
+        [sys.executable, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+        check=False,
+    )
+
+
+def test_cli_import_skips_heavy_modules():
+    code = (
+        "import sys, rayado.cli; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    proc = _run(["-c", code])
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == ""
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--help"],
+        ["phase2", "missing.srt"],
+    ],
+)
+def test_cli_commands_skip_heavy_modules(argv):
+    # Run the CLI in-process so sys.modules can be inspected once it exits.
+    code = (
+        "import runpy, sys\n"
+        f"sys.argv = ['rayado', *{argv!r}]\n"
+        "status = 0\n"
+        "try:\n"
+        "    runpy.run_module('rayado', run_name='__main__')\n"
+        "except SystemExit as exc:\n"
+        "    status = exc.code or 0\n"
+        f"print('loaded=' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+        "sys.exit(status)\n"
+    )
+    proc = _run(["-c", code])
+    assert proc.returncode in (0, 1), proc.stderr
+    assert proc.stdout.splitlines()[-1] == "loaded="
+
+
+def test_cache_export_unsupported_backend_fails_cleanly(tmp_path):
+    bundle = tmp_path / "seed.jsonl.gz"
+    proc = _run(
+        [
+            "-m",
+            "rayado",
+            "cache",
+            "export",
+            str(bundle),
+            "--cache-backend",
+            "http",
+            "--cache-url",
+            "http://127.0.0.1:9/cache",
+        ]
+    )
+    assert proc.returncode == 1
+    assert proc.stderr.startswith("Cache export failed: ")
+    assert "Traceback" not in proc.stderr
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import pytest
+
+from rayado.gcl import GclWriter, append_block, compress_gcl, ensure_header, iter_blocks, load_index, seek_blocks
+
+BLOCKS = [
+    ("GCL_CHUNK", {"chunk_id": "C00001", "t0": "0.0", "t1": "30.0"}),
+    ("GCL_SPAN", {"sid": "S00001", "t0": "0.5", "t1": "2.0", "text_raw": "안녕하세요"}),
+    ("GCL_OVERRIDE", {"oid": "SUP_S00001", "sid": "S00001", "policy": "suppress", "conf": ""}),
+]
+
+
+def test_writer_matches_append_block(tmp_path):
+    legacy = tmp_path / "legacy.gcl"
+    ensure_header(str(legacy))
+    for block_type, fields in BLOCKS:
+        append_block(str(legacy), block_type, fields)
+
+    buffered = tmp_path / "buffered.gcl"
+    with GclWriter(str(buffered), fsync="flush") as writer:
+        writer.write_blocks(BLOCKS)
+        assert writer.blocks_written == len(BLOCKS)
+
+    assert buffered.read_bytes() == legacy.read_bytes()
+
+
+def test_writer_offsets_and_reopen(tmp_path):
+    path = tmp_path / "episode.gcl"
+    with GclWriter(str(path)) as writer:
+        first = writer.write_block(*BLOCKS[0])
+        second = writer.write_block(*BLOCKS[1])
+    data = path.read_bytes()
+    assert data[first:].startswith(b"GCL_CHUNK\n")
+    assert data[second:].startswith(b"GCL_SPAN\n")
+
+    with GclWriter(str(path), fsync="always") as writer:
+        assert writer.offset == len(data)
+        writer.write_block(*BLOCKS[2])
+    assert path.read_text(encoding="utf-8").count("GCL_HDR") == 1
+
+
+def test_writer_rejects_unknown_policy_and_closed_use(tmp_path):
+    with pytest.raises(ValueError):
+        GclWriter(str(tmp_path / "a.gcl"), fsync="sometimes")
+    writer = GclWriter(str(tmp_path / "b.gcl"))
+    writer.close()
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.write_block(*BLOCKS[0])
+
+
+def test_iter_blocks_reports_offsets_and_resumes(tmp_path):
+    path = tmp_path / "episode.gcl"
+    with GclWriter(str(path)) as writer:
+        offsets = [writer.write_block(*block) for block in BLOCKS]
+
+    blocks = list(iter_blocks(str(path)))
+    assert [block.block_type for block in blocks] == ["GCL_HDR", *[b[0] for b in BLOCKS]]
+    assert [block.offset for block in blocks[1:]] == offsets
+    assert blocks[2].fields["text_raw"] == "안녕하세요"
+    assert blocks[3].fields["conf"] == ""
+
+    tail = list(iter_blocks(str(path), start_offset=blocks[1].end))
+    assert [block.block_type for block in tail] == ["GCL_SPAN", "GCL_OVERRIDE"]
+
+
+def _write_timeline(path, *, index: bool) -> None:
+    with GclWriter(str(path), index=index) as writer:
+        for chunk in range(1, 5):
+            chunk_id = f"C{chunk:05d}"
+            t0 = (chunk - 1) * 10.0
+            writer.write_block("GCL_CHUNK", {"chunk_id": chunk_id, "t0": f"{t0}", "t1": f"{t0 + 10.0}"})
+            for n in range(3):
+                sid = f"S{chunk:03d}{n:02d}"
+                start = t0 + n * 3.0
+                writer.write_block(
+                    "GCL_SPAN",
+                    {"sid": sid, "t0": f"{start}", "t1": f"{start + 2.0}", "chunk_id": chunk_id, "text_raw": sid},
+                )
+
+
+def test_index_seeks_time_window_and_chunk(tmp_path):
+    path = tmp_path / "episode.gcl"
+    _write_timeline(path, index=True)
+    assert len(load_index(str(path))) == 1 + 4 * 4
+
+    window = list(seek_blocks(str(path), t0=12.5, t1=17.0, block_types=["GCL_SPAN"]))
+    assert [block.fields["sid"] for block in window] == ["S00201", "S00202"]
+    assert [b.block_type for b in seek_blocks(str(path), chunk_id="C00003")] == ["GCL_CHUNK"] + ["GCL_SPAN"] * 3
+
+    # A stale index (e.g. the writer crashed before flushing it) is rebuilt on reopen.
+    index_file = tmp_path / "episode.gcl.idx"
+    index_file.write_text("", encoding="utf-8")
+    with GclWriter(str(path), index=True) as writer:
+        writer.write_block("GCL_SPAN", {"sid": "S99999", "t0": "50.0", "t1": "51.0", "text_raw": "tail"})
+    assert [b.fields["text_raw"] for b in seek_blocks(str(path), t0=50.0)] == ["tail"]
+    assert len(load_index(str(path))) == 1 + 4 * 4 + 1
+
+
+def test_compressed_frames_seek_and_stream(tmp_path):
+    path = tmp_path / "episode.gcl"
+    _write_timeline(path, index=False)
+    archive = tmp_path / "episode.gcl.gz"
+    frames = compress_gcl(str(path), str(archive), frame_size=256)
+    assert frames > 1
+
+    plain = list(iter_blocks(str(path)))
+    assert [(b.block_type, b.fields, b.offset) for b in iter_blocks(str(archive))] == [
+        (b.block_type, b.fields, b.offset) for b in plain
+    ]
+    window = list(seek_blocks(str(archive), t0=31.0, t1=34.0, block_types=["GCL_SPAN"]))
+    assert [block.fields["sid"] for block in window] == ["S00400", "S00401"]
@@ -1,19 +1,29 @@
 from __future__ import annotations
 
+import os
 import sys
 import types
+import wave
+from array import array
 
+import pytest
 import torch
 
 from rayado import lid_voxlingua
 
 
 def test_pick_samples_vote(monkeypatch):
+    batch_sizes = []
+
     class FakeClassifier:
-        def classify_batch(self, _signal):
-            return (None, torch.tensor([0.0]), None, ["zh: Chinese"])
+        def classify_batch(self, wavs, wav_lens=None):
+            batch_sizes.append(wavs.shape[0])
+            return (None, torch.zeros(wavs.shape[0]), None, ["zh: Chinese"] * wavs.shape[0])
+
+    loads = []
 
     def fake_from_hparams(*args, **kwargs):
+        loads.append(kwargs.get("run_opts"))
         return FakeClassifier()
 
     def fake_load_wav(_path):
@@ -25,12 +35,13 @@ def test_pick_samples_vote(monkeypatch):
     )
     fake_speechbrain = types.SimpleNamespace(utils=types.SimpleNamespace(fetching=fake_fetching), inference=fake_inference)
 
-    sys.modules["speechbrain"] = fake_speechbrain
-    sys.modules["speechbrain.utils"] = fake_speechbrain.utils
-    sys.modules["speechbrain.utils.fetching"] = fake_fetching
-    sys.modules["speechbrain.inference"] = fake_inference
-    sys.modules["speechbrain.inference.classifiers"] = fake_inference.classifiers
+    monkeypatch.setitem(sys.modules, "speechbrain", fake_speechbrain)
+    monkeypatch.setitem(sys.modules, "speechbrain.utils", fake_speechbrain.utils)
+    monkeypatch.setitem(sys.modules, "speechbrain.utils.fetching", fake_fetching)
+    monkeypatch.setitem(sys.modules, "speechbrain.inference", fake_inference)
+    monkeypatch.setitem(sys.modules, "speechbrain.inference.classifiers", fake_inference.classifiers)
 
+    monkeypatch.setattr(lid_voxlingua, "_CLASSIFIERS", {})
     monkeypatch.setattr(lid_voxlingua, "_load_wav_tensor", fake_load_wav)
     monkeypatch.setattr(lid_voxlingua, "_patch_torchaudio_backend", lambda: None)
     monkeypatch.setattr(lid_voxlingua, "_patch_huggingface_hub", lambda: None)
@@ -43,3 +54,209 @@ def test_pick_samples_vote(monkeypatch):
     assert winner == "zh"
     assert "zh" in weights
     assert len(samples) == 5
+    assert batch_sizes == [5]
+
+    timings = {}
+    winner_again, _, _ = lid_voxlingua.detect_language_voxlingua(
+        wavs, cache_dir=".cache", device="cpu", timings=timings
+    )
+    assert winner_again == "zh"
+    assert len(loads) == 1
+    assert timings["load_sec"] == 0.0
+    assert timings["infer_sec"] >= 0.0
+
+
+def test_classify_signals_pads_and_restores_order():
+    seen = []
+
+    class FakeClassifier:
+        def classify_batch(self, wavs, wav_lens=None):
+            seen.append((tuple(wavs.shape), [round(rel, 4) for rel in wav_lens.tolist()]))
+            # Label each row by its true (unpadded) length so order can be checked.
+            labels = [f"{int(round(rel * wavs.shape[1]))}: len" for rel in wav_lens.tolist()]
+            return (None, torch.zeros(wavs.shape[0]), None, labels)
+
+    signals = [torch.ones(300), torch.ones(100), torch.ones(200)]
+    results = lid_voxlingua.classify_signals(FakeClassifier(), signals, max_batch_sec=0.0, sample_rate=100)
+    assert [label for label, _ in results] == ["300: len", "100: len", "200: len"]
+    assert seen == [((3, 300), [0.3333, 0.6667, 1.0])]
+
+    seen.clear()
+    results = lid_voxlingua.classify_signals(FakeClassifier(), signals, max_batch_sec=4.0, sample_rate=100)
+    assert [label for label, _ in results] == ["300: len", "100: len", "200: len"]
+    assert [shape for shape, _ in seen] == [(2, 200), (1, 300)]
+
+
+def test_load_pcm_segments_are_views(tmp_path):
+    path = tmp_path / "tone.wav"
+    frames = array("h", [i % 100 for i in range(16000 * 2)])
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(frames.tobytes())
+
+    audio = lid_voxlingua.load_pcm(str(path))
+    assert audio.sample_rate == 16000
+    assert audio.samples.shape == (32000,)
+    assert audio.samples[:16000].data_ptr() == audio.samples.data_ptr()
+
+    signal = lid_voxlingua.segment_signal(audio, 0.5, 1.0)
+    assert signal.shape == (8000,)
+    assert signal.dtype == torch.float32
+    assert torch.allclose(signal[:3], torch.tensor([0.0, 1.0, 2.0]) / 32768.0)
+
+
+def _fake_audio(seconds: int) -> lid_voxlingua.PcmAudio:
+    return lid_voxlingua.PcmAudio(source="mem", samples=torch.zeros(16000 * seconds, dtype=torch.int16), sample_rate=16000)
+
+
+def test_sequential_stops_early_when_samples_agree(monkeypatch):
+    rounds = []
+
+    class FakeClassifier:
+        def classify_batch(self, wavs, wav_lens=None):
+            rounds.append(wavs.shape[0])
+            return (None, torch.log(torch.full((wavs.shape[0],), 0.99)), None, ["ja: Japanese"] * wavs.shape[0])
+
+    monkeypatch.setattr(lid_voxlingua, "get_classifier", lambda **kwargs: (FakeClassifier(), 0.0))
+    segments = [(float(i), float(i) + 1.0) for i in range(9)]
+    winner, _, details = lid_voxlingua.detect_language_sequential(_fake_audio(10), segments, cache_dir=".cache")
+    assert winner == "ja"
+    assert len(details) == 2
+    assert rounds == [2]
+
+
+def test_sequential_escalates_when_ambiguous(monkeypatch):
+    labels = iter(["en: English", "es: Spanish", "en: English", "es: Spanish", "en: English"] + ["en: English"] * 4)
+
+    class FakeClassifier:
+        def classify_batch(self, wavs, wav_lens=None):
+            batch = [next(labels) for _ in range(wavs.shape[0])]
+            return (None, torch.log(torch.full((wavs.shape[0],), 0.9)), None, batch)
+
+    monkeypatch.setattr(lid_voxlingua, "get_classifier", lambda **kwargs: (FakeClassifier(), 0.0))
+    segments = [(float(i), float(i) + 1.0) for i in range(9)]
+    winner, _, details = lid_voxlingua.detect_language_sequential(
+        _fake_audio(10), segments, cache_dir=".cache", max_samples=7, margin=0.5
+    )
+    assert winner == "en"
+    assert len(details) == 7
+
+
+def test_classify_signals_bf16_uses_autocast():
+    seen = []
+
+    class FakeClassifier:
+        def classify_batch(self, wavs, wav_lens=None):
+            seen.append(torch.is_autocast_enabled("cpu"))
+            scores = torch.zeros(wavs.shape[0], dtype=torch.bfloat16)
+            return (None, scores, None, ["en: English"] * wavs.shape[0])
+
+    signals = [torch.ones(100), torch.ones(50)]
+    results = lid_voxlingua.classify_signals(FakeClassifier(), signals, precision="bf16")
+    assert seen == [True]
+    assert results == [("en: English", 1.0), ("en: English", 1.0)]
+
+    lid_voxlingua.classify_signals(FakeClassifier(), signals)
+    assert seen == [True, False]
+
+
+def _tiny_classifier():
+    """A real EncoderClassifier with the VoxLingua layout, shrunk and randomly initialized."""
+    pytest.importorskip("speechbrain")
+    from speechbrain.inference.classifiers import EncoderClassifier
+    from speechbrain.lobes.features import Fbank
+    from speechbrain.lobes.models.ECAPA_TDNN import ECAPA_TDNN, Classifier
+    from speechbrain.processing.features import InputNormalization
+
+    class Labels:
+        def decode_torch(self, index):
+            return [f"l{int(i)}: Lang{int(i)}" for i in index]
+
+    torch.manual_seed(0)
+    modules = {
+        "compute_features": Fbank(n_mels=20),
+        "mean_var_norm": InputNormalization(norm_type="sentence", std_norm=False),
+        "embedding_model": ECAPA_TDNN(20, channels=[16, 16, 16, 16, 48], attention_channels=8, lin_neurons=8),
+        "classifier": Classifier(input_size=8, out_neurons=5),
+    }
+    return EncoderClassifier(modules=modules, hparams={"label_encoder": Labels()})
+
+
+def _signals():
+    torch.manual_seed(1)
+    # Mixed lengths pad into batches of several sizes; the shortest is the smallest exported length.
+    lengths = (16000, 12000, 8000, 24000, 20000, 4000, 16000, lid_voxlingua.EXPORT_MIN_SAMPLES)
+    return [torch.randn(n) for n in lengths]
+
+
+def test_exported_classifier_matches_eager():
+    classifier = _tiny_classifier()
+    exported = lid_voxlingua.ExportedClassifier(
+        classifier, lid_voxlingua._export_program(classifier).module(), path=""
+    )
+    signals = _signals()
+    for max_batch_sec in (0.0, 2.0, 0.01):
+        expected = lid_voxlingua.classify_signals(classifier, signals, max_batch_sec=max_batch_sec)
+        actual = lid_voxlingua.classify_signals(exported, signals, max_batch_sec=max_batch_sec)
+        assert [label for label, _ in actual] == [label for label, _ in expected]
+        assert [score for _, score in actual] == pytest.approx([score for _, score in expected], abs=1e-5)
+    with pytest.raises(ValueError):
+        lid_voxlingua.classify_signals(exported, signals, precision="bf16")
+
+
+def test_export_artifact_is_cached_per_weights(tmp_path, monkeypatch):
+    classifier = _tiny_classifier()
+    builds = []
+
+    def fake_compile(program, package_path):
+        builds.append(package_path)
+        torch.export.save(program, package_path)
+
+    monkeypatch.setattr(lid_voxlingua, "_compile_program", fake_compile)
+    path, built = lid_voxlingua.export_classifier(classifier, cache_dir=str(tmp_path))
+    assert built and os.path.dirname(path) == str(tmp_path / "export")
+    assert lid_voxlingua.export_classifier(classifier, cache_dir=str(tmp_path)) == (path, False)
+    assert len(builds) == 1 and os.listdir(tmp_path / "export") == [os.path.basename(path)]
+
+    with torch.no_grad():
+        classifier.mods.classifier.weight.add_(1.0)
+    new_path, built = lid_voxlingua.export_classifier(classifier, cache_dir=str(tmp_path))
+    assert built and new_path != path
+
+
+def test_export_runtime_falls_back_to_eager(tmp_path, monkeypatch):
+    classifier = _tiny_classifier()
+    monkeypatch.setattr(lid_voxlingua, "_CLASSIFIERS", {})
+    monkeypatch.setattr(lid_voxlingua, "_load_classifier", lambda **kwargs: classifier)
+    monkeypatch.setattr(lid_voxlingua, "EXPORT_MIN_TORCH", (99, 0))
+    with pytest.warns(RuntimeWarning, match="older than 99.0"):
+        loaded, _ = lid_voxlingua.get_classifier(cache_dir=str(tmp_path), runtime="export")
+    assert loaded is classifier
+
+    def failing_export(classifier):
+        raise RuntimeError("unsupported operator")
+
+    monkeypatch.setattr(lid_voxlingua, "_CLASSIFIERS", {})
+    monkeypatch.setattr(lid_voxlingua, "EXPORT_MIN_TORCH", (2, 0))
+    monkeypatch.setattr(lid_voxlingua, "_export_program", failing_export)
+    with pytest.warns(RuntimeWarning, match="unsupported operator"):
+        loaded, _ = lid_voxlingua.get_classifier(cache_dir=str(tmp_path), runtime="export")
+    assert loaded is classifier
+    assert lid_voxlingua.get_classifier(cache_dir=str(tmp_path), runtime="export") == (classifier, 0.0)
+    assert os.listdir(tmp_path / "export") == []
+
+
+@pytest.mark.integration
+def test_compiled_export_matches_eager(tmp_path):
+    if not os.environ.get("RAYADO_AOTI_TESTS"):
+        pytest.skip("RAYADO_AOTI_TESTS not set (AOTInductor builds take minutes)")
+    classifier = _tiny_classifier()
+    path, _ = lid_voxlingua.export_classifier(classifier, cache_dir=str(tmp_path))
+    exported = lid_voxlingua.ExportedClassifier(classifier, lid_voxlingua._load_compiled(path), path=path)
+    signals = _signals()
+    expected = lid_voxlingua.classify_signals(classifier, signals, max_batch_sec=2.0)
+    actual = lid_voxlingua.classify_signals(exported, signals, max_batch_sec=2.0)
+    assert [label for label, _ in actual] == [label for label, _ in expected]
+    assert [score for _, score in actual] == pytest.approx([score for _, score in expected], abs=1e-5)
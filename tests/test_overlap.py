@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import random
+import re
+
+from rayado.models import Chunk, Span
+from rayado.overlap import overlap_judge, stitch_overlaps, stitch_seam
+
+
+def _naive_overlap_judge(chunks, spans, *, iou_min=0.30, sim_min=0.70):
+    """The original nested-loop judge, kept as the reference for equivalence."""
+
+    def tokenize(text):
+        return [tok for tok in re.sub(r"[^\w\s]", " ", text.lower()).split() if tok]
+
+    def jaccard(a, b):
+        if not a or not b:
+            return 0.0
+        sa, sb = set(a), set(b)
+        return len(sa & sb) / max(1, len(sa | sb))
+
+    def time_iou(a0, a1, b0, b1):
+        inter = max(0.0, min(a1, b1) - max(a0, b0))
+        if inter <= 0:
+            return 0.0
+        union = max(a1, b1) - min(a0, b0)
+        return inter / union if union > 0 else 0.0
+
+    by_chunk = {}
+    for span in spans:
+        by_chunk.setdefault(span.chunk_id, []).append(span)
+    records, suppressed = [], []
+    for left, right in zip(chunks, chunks[1:]):
+        l0, l1 = max(0.0, left.t1 - left.overlap_right), left.t1
+        r0, r1 = right.t0, right.t0 + right.overlap_left
+        for lspan in by_chunk.get(left.chunk_id, []):
+            if lspan.t1 < l0 or lspan.t0 > l1:
+                continue
+            for rspan in by_chunk.get(right.chunk_id, []):
+                if rspan.t1 < r0 or rspan.t0 > r1:
+                    continue
+                if time_iou(lspan.t0, lspan.t1, rspan.t0, rspan.t1) < iou_min:
+                    continue
+                sim = jaccard(tokenize(lspan.text_raw), tokenize(rspan.text_raw))
+                if sim < sim_min:
+                    continue
+                keep_left = lspan.asr_conf >= rspan.asr_conf
+                records.append(
+                    {
+                        "olp_id": f"OLP_{lspan.sid}_{rspan.sid}",
+                        "left_chunk": left.chunk_id,
+                        "right_chunk": right.chunk_id,
+                        "left_sid": lspan.sid,
+                        "right_sid": rspan.sid,
+                        "decision": "keep_left" if keep_left else "keep_right",
+                        "method": "time_iou_then_text_jaccard",
+                        "conf": f"{sim:.3f}",
+                    }
+                )
+                suppressed.append(rspan.sid if keep_left else lspan.sid)
+    return records, suppressed
+
+
+def _random_episode(rng: random.Random, *, chunk_count: int, spans_per_chunk: int):
+    words = ["alpha", "beta", "gamma", "delta", "你好", "世界", "ok", "go"]
+    chunks, spans = [], []
+    chunk_sec, overlap_sec = 30.0, 6.0
+    for c in range(chunk_count):
+        t0 = max(0.0, c * chunk_sec - overlap_sec)
+        t1 = (c + 1) * chunk_sec
+        chunk_id = f"C{c + 1:05d}"
+        chunks.append(Chunk(chunk_id, t0, t1, overlap_sec if c else 0.0, overlap_sec))
+        for _ in range(spans_per_chunk):
+            # Bias spans towards the seams so most of them are overlap candidates.
+            start = rng.choice([t0 + rng.uniform(0, overlap_sec), t1 - rng.uniform(0, overlap_sec), rng.uniform(t0, t1)])
+            length = rng.choice([0.0, rng.uniform(0.2, 3.0)])
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 4)))
+            spans.append(
+                Span(f"S{len(spans) + 1:05d}", round(start, 1), round(start + length, 1), chunk_id, text, rng.random())
+            )
+    rng.shuffle(spans)
+    return chunks, spans
+
+
+def test_sweep_matches_nested_loop_reference():
+    rng = random.Random(7)
+    for _ in range(30):
+        chunks, spans = _random_episode(rng, chunk_count=rng.randint(1, 5), spans_per_chunk=rng.randint(0, 25))
+        for iou_min, sim_min in ((0.30, 0.70), (0.0, 0.0), (0.1, 0.3)):
+            expected = _naive_overlap_judge(chunks, spans, iou_min=iou_min, sim_min=sim_min)
+            assert overlap_judge(chunks, spans, iou_min=iou_min, sim_min=sim_min) == expected
+
+
+def test_touching_spans_are_not_candidates():
+    chunks = [Chunk("C00001", 0.0, 30.0, 0.0, 5.0), Chunk("C00002", 25.0, 60.0, 5.0, 0.0)]
+    spans = [
+        Span("S00001", 26.0, 28.0, "C00001", "same words", 0.9),
+        Span("S00002", 28.0, 29.0, "C00002", "same words", 0.8),
+        Span("S00003", 26.5, 28.0, "C00002", "same words", 0.95),
+    ]
+    records, suppressed = overlap_judge(chunks, spans)
+    assert [record["olp_id"] for record in records] == ["OLP_S00001_S00003"]
+    assert suppressed == ["S00001"]
+
+
+def _words(chunk: Chunk, timed):
+    """Deepgram-style words (chunk-relative times) from absolute (t0, t1, token)."""
+    return [{"word": tok.lower(), "punctuated_word": tok, "start": t0 - chunk.t0, "end": t1 - chunk.t0} for t0, t1, tok in timed]
+
+
+def test_stitch_seam_cuts_after_match_nearest_centre():
+    left = [(8.0, 8.4, "we"), (8.5, 8.9, "went"), (9.0, 9.3, "to"), (9.4, 9.8, "the"), (9.8, 9.95, "sto")]
+    right = [(8.05, 8.4, "e"), (8.52, 8.9, "went"), (9.02, 9.3, "to"), (9.42, 9.8, "the"), (9.85, 10.3, "store.")]
+    # Seam [8, 10]: "to" at ~9.15 is the match closest to the centre (9.0).
+    assert stitch_seam(left, right, seam_t0=8.0, seam_t1=10.0) == (3, 3, 3)
+
+
+def test_stitch_seam_without_matches_cuts_at_centre():
+    left = [(7.0, 7.5, "a"), (8.2, 8.6, "b"), (9.2, 9.6, "c")]
+    right = [(8.1, 8.5, "x"), (9.1, 9.5, "y"), (10.5, 11.0, "z")]
+    assert stitch_seam(left, right, seam_t0=8.0, seam_t1=10.0) == (2, 1, 0)
+
+
+def test_stitch_overlaps_rewrites_seam_spans():
+    chunks = [Chunk("C00001", 0.0, 10.0, 0.0, 2.0), Chunk("C00002", 8.0, 20.0, 2.0, 0.0)]
+    left_timed = [(6.0, 6.5, "Hello"), (7.0, 7.4, "there,"), (8.5, 8.9, "general"), (9.5, 9.9, "Ken")]
+    right_timed = [(8.1, 8.4, "…"), (8.5, 8.9, "general"), (9.5, 9.9, "Kenobi."), (11.0, 11.5, "Bye.")]
+    spans = [
+        Span("S00001", 6.0, 9.9, "C00001", "Hello there, general Ken", 0.9),
+        Span("S00002", 8.1, 11.5, "C00002", "… general Kenobi. Bye.", 0.8),
+    ]
+    words = {"C00001": _words(chunks[0], left_timed), "C00002": _words(chunks[1], right_timed)}
+
+    records, rewritten, suppressed = stitch_overlaps(chunks, spans, words)
+    assert [(r["decision"], r["method"], r["conf"], r["cut"]) for r in records] == [
+        ("stitch", "word_align", "1", "8.900")
+    ]
+    assert [(span.sid, span.t0, span.t1, span.text_raw) for span in rewritten] == [
+        ("S00001", 6.0, 8.9, "Hello there, general"),
+        ("S00002", 9.5, 11.5, "Kenobi. Bye."),
+    ]
+    assert suppressed == []
+
+
+def test_stitch_overlaps_rewrites_each_span_the_cut_touches():
+    chunks = [Chunk("C00001", 0.0, 10.0, 0.0, 2.0), Chunk("C00002", 8.0, 20.0, 2.0, 0.0)]
+    left_timed = [(6.0, 6.5, "Hello"), (7.0, 7.4, "there,"), (8.5, 8.9, "general"), (9.5, 9.9, "Ken")]
+    right_timed = [(8.1, 8.4, "…"), (8.5, 8.9, "general"), (9.5, 9.9, "Kenobi."), (11.0, 11.5, "Bye.")]
+    spans = [
+        Span("S00001", 6.0, 7.4, "C00001", "Hello there,", 0.9),
+        Span("S00002", 8.5, 9.9, "C00001", "general Ken", 0.9),
+        Span("S00003", 8.1, 8.4, "C00002", "…", 0.8),
+        Span("S00004", 8.5, 9.9, "C00002", "general Kenobi.", 0.8),
+        Span("S00005", 11.0, 11.5, "C00002", "Bye.", 0.8),
+    ]
+    words = {"C00001": _words(chunks[0], left_timed), "C00002": _words(chunks[1], right_timed)}
+
+    records, rewritten, suppressed = stitch_overlaps(chunks, spans, words)
+    assert [record["cut"] for record in records] == ["8.900"]
+    assert [(span.sid, span.t0, span.t1, span.text_raw) for span in rewritten] == [
+        ("S00002", 8.5, 8.9, "general"),
+        ("S00004", 9.5, 9.9, "Kenobi."),
+    ]
+    assert suppressed == ["S00003"]
+
+
+def test_stitch_overlaps_judges_seams_without_words():
+    chunks = [Chunk("C00001", 0.0, 10.0, 0.0, 2.0), Chunk("C00002", 8.0, 20.0, 2.0, 0.0)]
+    spans = [
+        Span("S00001", 8.2, 9.8, "C00001", "general Kenobi", 0.9),
+        Span("S00002", 8.3, 9.9, "C00002", "General Kenobi!", 0.5),
+    ]
+    words = {"C00001": _words(chunks[0], [(8.2, 8.9, "general"), (9.2, 9.8, "Kenobi")])}
+
+    records, rewritten, suppressed = stitch_overlaps(chunks, spans, words)
+    assert [(r["olp_id"], r["decision"], r["method"]) for r in records] == [
+        ("OLP_S00001_S00002", "keep_left", "time_iou_then_text_jaccard")
+    ]
+    assert rewritten == []
+    assert suppressed == ["S00002"]
+
+
+def test_stitch_overlaps_judges_middle_chunk_without_words_once():
+    chunks = [
+        Chunk("C00001", 0.0, 5.0, 0.0, 2.0),
+        Chunk("C00002", 3.0, 8.0, 2.0, 2.0),
+        Chunk("C00003", 6.0, 12.0, 2.0, 0.0),
+    ]
+    spans = [
+        Span("S00001", 2.0, 5.0, "C00001", "hello there", 0.9),
+        Span("S00002", 3.1, 7.9, "C00002", "Hello there.", 0.4),
+        Span("S00003", 5.5, 9.0, "C00003", "hello there", 0.8),
+    ]
+    words = {
+        "C00001": _words(chunks[0], [(2.0, 2.4, "hello"), (4.5, 5.0, "there")]),
+        "C00003": _words(chunks[2], [(5.5, 6.0, "hello"), (8.5, 9.0, "there")]),
+    }
+
+    records, rewritten, suppressed = stitch_overlaps(chunks, spans, words)
+    # S00002 loses to S00001 and is not judged again against S00003.
+    assert [(r["olp_id"], r["decision"]) for r in records] == [("OLP_S00001_S00002", "keep_left")]
+    assert rewritten == []
+    assert suppressed == ["S00002"]
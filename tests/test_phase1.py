@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import json
 import os
+import threading
+import time
 import wave
 
 import pytest
 
 from rayado import phase1
-from rayado.models import Segment
+from rayado.journal import PartialRunError
+from rayado.models import Segment, Span
+from rayado.stats import read_run_records
 
 
 def _write_wav(path: str, seconds: int = 1) -> None:
@@ -37,8 +42,11 @@ def test_phase1_runs_with_mocks(tmp_path, monkeypatch):
     def fake_extract_audio_file(inp, out, sample_rate=16000, channels=1):
         _write_wav(out, seconds=2)
 
+    chunk_prepared = threading.Event()
+
     def fake_extract_segment(inp, out, start, end, sample_rate=16000, channels=1):
         _write_wav(out, seconds=1)
+        chunk_prepared.set()
 
     def fake_ffprobe_duration(_):
         return 10.0
@@ -46,8 +54,13 @@ def test_phase1_runs_with_mocks(tmp_path, monkeypatch):
     def fake_silencedetect(*args, **kwargs):
         return []
 
-    def fake_detect_language(wavs, cache_dir, device="cpu"):
-        return "zh", {"zh": 1.0}, []
+    lid_segments = []
+
+    def fake_detect_language(path, segments, **kwargs):
+        lid_segments.extend(segments)
+        # Chunk preparation must overlap LID instead of waiting for it.
+        assert chunk_prepared.wait(timeout=5)
+        return "zh", {"zh": 1.0}, [], {"load_sec": 0.0, "infer_sec": 0.0}
 
     def fake_transcribe_chunk(**kwargs):
         return ([], {"words": []})
@@ -56,7 +69,7 @@ def test_phase1_runs_with_mocks(tmp_path, monkeypatch):
     monkeypatch.setattr(phase1, "extract_audio_file_segment", fake_extract_segment)
     monkeypatch.setattr(phase1, "ffprobe_duration", fake_ffprobe_duration)
     monkeypatch.setattr(phase1, "silencedetect", fake_silencedetect)
-    monkeypatch.setattr(phase1, "detect_language_voxlingua", fake_detect_language)
+    monkeypatch.setattr(phase1, "detect_language_wav", fake_detect_language)
     monkeypatch.setattr(phase1, "transcribe_chunk", fake_transcribe_chunk)
 
     language = phase1.run_phase1(
@@ -75,7 +88,197 @@ def test_phase1_runs_with_mocks(tmp_path, monkeypatch):
         max_sec=3.0,
         lid_cache_dir=str(tmp_path / ".lid"),
         lid_device="cpu",
+        lid_process=False,
     )
 
     assert language == "zh"
+    assert lid_segments
     assert out_srt.exists()
+
+
+def test_prioritized_samples_start_mid_episode():
+    segments = [Segment(float(i), float(i) + 0.5) for i in range(20)]
+    chosen = phase1._prioritized_sample_segments(segments, max_samples=9)
+    assert chosen[:5] == [segments[10], segments[5], segments[15], segments[0], segments[19]]
+    assert len(chosen) == 9
+    assert len(set(chosen)) == 9
+
+
+def _patch_four_chunk_episode(monkeypatch, transcribe) -> list:
+    monkeypatch.setattr(phase1, "extract_audio_file", lambda inp, out, **kw: _write_wav(out, seconds=1))
+    monkeypatch.setattr(phase1, "extract_audio_file_segment", lambda inp, out, **kw: _write_wav(out, seconds=1))
+    monkeypatch.setattr(phase1, "ffprobe_duration", lambda _: 10.0)
+    monkeypatch.setattr(phase1, "silencedetect", lambda *a, **kw: [(2.0, 3.0), (5.0, 6.0), (8.0, 8.5)])
+    lid_calls = []
+
+    def fake_detect_language(path, segments, **kwargs):
+        lid_calls.append(segments)
+        return "en", {"en": 1.0}, [], {}
+
+    monkeypatch.setattr(phase1, "detect_language_wav", fake_detect_language)
+    monkeypatch.setattr(phase1, "transcribe_chunk", transcribe)
+    return lid_calls
+
+
+def _chunk_result(chunk, span_start_id):
+    span = Span(f"S{span_start_id:05d}", chunk.t0, chunk.t1, chunk.chunk_id, f"text {chunk.chunk_id}", 0.9)
+    return [span], {"words": []}
+
+
+def _run_four_chunk_episode(tmp_path, **kwargs):
+    options = dict(
+        input_path=str(tmp_path / "input.mp4"),
+        out_srt_path=str(tmp_path / "out.srt"),
+        cache_dir=str(tmp_path / ".cache"),
+        concurrency=4,
+        retry=0,
+        deepgram_model="nova-2",
+        vad_threshold=-30.0,
+        vad_min_speech_sec=0.5,
+        vad_merge_gap_sec=0.3,
+        vad_pad_sec=0.1,
+        vad_min_silence_sec=0.5,
+        target_sec=1.0,
+        max_sec=3.0,
+        lid_cache_dir=str(tmp_path / ".lid"),
+        lid_device="cpu",
+        lid_process=False,
+    )
+    options.update(kwargs)
+    return phase1.run_phase1(**options)
+
+
+def _cue_texts(path) -> list[str]:
+    return [line for line in path.read_text(encoding="utf-8").splitlines() if line.startswith(("text ", "[gap"))]
+
+
+def test_phase1_resume_after_interrupt(tmp_path, monkeypatch):
+    (tmp_path / "input.mp4").write_bytes(b"fake")
+    cache_dir = tmp_path / ".cache"
+    transcribed = []
+    interrupt = {"C00002"}
+    in_flight = {"C00003": threading.Event(), "C00004": threading.Event()}
+
+    def fake_transcribe_chunk(*, chunk, span_start_id, **kwargs):
+        transcribed.append(chunk.chunk_id)
+        if chunk.chunk_id in interrupt:
+            # Interrupt only once the later chunks are on the wire.
+            assert all(event.wait(5) for event in in_flight.values())
+            raise KeyboardInterrupt
+        if chunk.chunk_id in in_flight and interrupt:
+            in_flight[chunk.chunk_id].set()
+            time.sleep(0.2)
+        return _chunk_result(chunk, span_start_id)
+
+    lid_calls = _patch_four_chunk_episode(monkeypatch, fake_transcribe_chunk)
+
+    with pytest.raises(KeyboardInterrupt):
+        _run_four_chunk_episode(tmp_path)
+    journals = list((cache_dir / "journal").iterdir())
+    assert len(journals) == 1
+    assert not (tmp_path / "out.srt").exists()
+
+    interrupt.clear()
+    transcribed.clear()
+    assert _run_four_chunk_episode(tmp_path, resume=True) == "en"
+    assert transcribed == ["C00002"]
+    assert len(lid_calls) == 1
+    assert _cue_texts(tmp_path / "out.srt") == ["text C00001", "text C00002", "text C00003", "text C00004"]
+    assert not journals[0].exists()
+
+
+def test_phase1_resume_after_chunk_failure(tmp_path, monkeypatch):
+    (tmp_path / "input.mp4").write_bytes(b"fake")
+    transcribed = []
+    failing = {"C00002"}
+    in_flight = {"C00003": threading.Event(), "C00004": threading.Event()}
+
+    def fake_transcribe_chunk(*, chunk, span_start_id, **kwargs):
+        transcribed.append(chunk.chunk_id)
+        if chunk.chunk_id in failing:
+            assert all(event.wait(5) for event in in_flight.values())
+            raise RuntimeError("HTTP 500")
+        if chunk.chunk_id in in_flight and failing:
+            in_flight[chunk.chunk_id].set()
+            time.sleep(0.2)
+        return _chunk_result(chunk, span_start_id)
+
+    _patch_four_chunk_episode(monkeypatch, fake_transcribe_chunk)
+
+    with pytest.raises(RuntimeError, match="HTTP 500"):
+        _run_four_chunk_episode(tmp_path)
+
+    failing.clear()
+    transcribed.clear()
+    _run_four_chunk_episode(tmp_path, resume=True)
+    assert transcribed == ["C00002"]
+    assert _cue_texts(tmp_path / "out.srt") == ["text C00001", "text C00002", "text C00003", "text C00004"]
+
+
+def test_phase1_asr_does_not_wait_for_every_chunk_prep(tmp_path, monkeypatch):
+    (tmp_path / "input.mp4").write_bytes(b"fake")
+    first_request = threading.Event()
+
+    def fake_transcribe_chunk(*, chunk, span_start_id, **kwargs):
+        first_request.set()
+        return _chunk_result(chunk, span_start_id)
+
+    _patch_four_chunk_episode(monkeypatch, fake_transcribe_chunk)
+
+    def fake_extract_segment(inp, out, *, start, **kwargs):
+        if start > 8.0:
+            # The last chunk's prep only finishes once ASR is already running.
+            assert first_request.wait(5)
+        _write_wav(out, seconds=1)
+
+    monkeypatch.setattr(phase1, "extract_audio_file_segment", fake_extract_segment)
+    _run_four_chunk_episode(tmp_path, concurrency=1)
+    assert _cue_texts(tmp_path / "out.srt") == ["text C00001", "text C00002", "text C00003", "text C00004"]
+
+
+def test_phase1_keep_going_marks_gap_and_resume_retries(tmp_path, monkeypatch):
+    (tmp_path / "input.mp4").write_bytes(b"fake")
+    failing = {"C00003"}
+    transcribed = []
+
+    def fake_transcribe_chunk(*, chunk, span_start_id, **kwargs):
+        transcribed.append(chunk.chunk_id)
+        if chunk.chunk_id in failing:
+            raise RuntimeError("HTTP 500")
+        return _chunk_result(chunk, span_start_id)
+
+    _patch_four_chunk_episode(monkeypatch, fake_transcribe_chunk)
+
+    with pytest.raises(RuntimeError, match="HTTP 500"):
+        _run_four_chunk_episode(tmp_path)
+
+    with pytest.raises(PartialRunError) as excinfo:
+        _run_four_chunk_episode(tmp_path, keep_going=True)
+    assert excinfo.value.failed == {"C00003": "HTTP 500"}
+    assert excinfo.value.language == "en"
+    assert _cue_texts(tmp_path / "out.srt") == ["text C00001", "text C00002", "[gap C00003]", "text C00004"]
+
+    failing.clear()
+    transcribed.clear()
+    _run_four_chunk_episode(tmp_path, resume=True, keep_going=True)
+    assert transcribed == ["C00003"]
+    assert _cue_texts(tmp_path / "out.srt") == ["text C00001", "text C00002", "text C00003", "text C00004"]
+
+
+def test_phase1_records_stage_trace(tmp_path, monkeypatch):
+    (tmp_path / "input.mp4").write_bytes(b"fake")
+    _patch_four_chunk_episode(monkeypatch, lambda *, chunk, span_start_id, **kw: _chunk_result(chunk, span_start_id))
+    trace_path = tmp_path / "out.trace.json"
+    _run_four_chunk_episode(tmp_path, trace_path=str(trace_path))
+
+    events = json.loads(trace_path.read_text(encoding="utf-8"))["traceEvents"]
+    per_chunk = {}
+    for event in events:
+        if event.get("cat") == "chunk":
+            per_chunk.setdefault(event["name"], set()).add(event["args"]["chunk_id"])
+    for name in ("extract", "hash", "queue_wait", "post_process"):
+        assert per_chunk[name] == {"C00001", "C00002", "C00003", "C00004"}, name
+    assert {event["name"] for event in events if event.get("cat") == "run"} == {"extract", "vad", "lid"}
+
+    record = read_run_records(str(tmp_path / ".cache" / "runs.jsonl"))[-1]
+    assert record["stages"]["queue_wait"]["count"] == 4
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from rayado import phase2
+from rayado.cache import Cache
+from rayado.cli import _cache_report
 from rayado.srt_utils import SrtBlock, format_srt_blocks
 
 
@@ -45,3 +47,40 @@ def test_phase2_generate_graph_and_clean(monkeypatch, tmp_path):
     )
 
     assert graph_out.exists()
+
+
+def test_phase2_reuses_cached_graph(monkeypatch, tmp_path):
+    srt_path = tmp_path / "input.srt"
+    srt_path.write_text(format_srt_blocks([SrtBlock(start=0.0, end=1.0, text="hello")]), encoding="utf-8")
+    prompt_path = tmp_path / "SORAL.txt"
+    prompt_path.write_text("PROMPT", encoding="utf-8")
+
+    calls = []
+
+    def fake_call_openai(*, model, input_payload, output_path=None, retry=1, **kwargs):
+        calls.append(model)
+        return "[ENTITY:1]{Name:\"A\"}"
+
+    monkeypatch.setattr(phase2, "_call_openai", fake_call_openai)
+
+    cache = Cache(str(tmp_path / ".cache" / "cache.sqlite"))
+    kwargs = dict(
+        srt_path=str(srt_path),
+        prompt_path=str(prompt_path),
+        graph_in_path=None,
+        graph_out_path=str(tmp_path / "graph.txt"),
+        model_graph="gpt-5-mini",
+        retry=1,
+        cache=cache,
+    )
+    first = phase2.run_phase2(**kwargs)
+    second = phase2.run_phase2(**kwargs)
+
+    assert first == second
+    assert calls == ["gpt-5-mini"]
+    assert (cache.llm_hits, cache.llm_misses) == (1, 1)
+
+    prompt_path.write_text("PROMPT v2", encoding="utf-8")
+    phase2.run_phase2(**kwargs)
+    assert len(calls) == 2
+    assert _cache_report(cache) == "hit:1,miss_absent:2,miss_drift:0,write:2"
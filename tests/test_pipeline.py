@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import pytest
+
+from rayado import pipeline
+from rayado.journal import PartialRunError
+from rayado.lid_voxlingua import LidSample
+from rayado.models import Chunk, Span
+from rayado.render import OUTPUT_FILES
+from rayado.replay import replay_gcl, write_outputs
+
+
+def test_local_chunk_languages_falls_back_to_winner(tmp_path, monkeypatch):
+    chunks = [
+        Chunk("C00001", 0.0, 30.0, 0.0, 1.0),
+        Chunk("C00002", 29.0, 60.0, 1.0, 0.0),
+    ]
+    extracted = []
+
+    def fake_extract_audio_file(inp, out, sample_rate=16000, channels=1):
+        extracted.append(out)
+        open(out, "wb").close()
+
+    def fake_detect(audio, segments, **kwargs):
+        assert segments == [(0.0, 30.0), (29.0, 60.0)]
+        assert kwargs["max_batch_sec"] == 120.0
+        details = [
+            LidSample(path="0.00-30.00", language="es", score=0.9, label="es: Spanish"),
+            LidSample(path="29.00-60.00", language="en", score=0.2, label="en: English"),
+        ]
+        return "es", {"es": 0.9}, details
+
+    monkeypatch.setattr(pipeline, "extract_audio_file", fake_extract_audio_file)
+    monkeypatch.setattr(pipeline, "load_pcm", lambda path: object())
+    monkeypatch.setattr(pipeline, "detect_language_segments", fake_detect)
+
+    languages = pipeline._local_chunk_languages(
+        input_path="in.mp4",
+        chunks=chunks,
+        tmp_dir=str(tmp_path),
+        cache_dir="",
+        device="cpu",
+        max_batch_sec=120.0,
+        precision="fp32",
+        min_score=0.5,
+    )
+    assert languages == {"C00001": ("es", 0.9), "C00002": ("es", 0.2)}
+    assert len(extracted) == 1
+    assert not list(tmp_path.iterdir())
+
+
+def test_local_chunk_languages_skips_undetermined_episode(tmp_path, monkeypatch):
+    chunks = [
+        Chunk("C00001", 0.0, 30.0, 0.0, 1.0),
+        Chunk("C00002", 29.0, 60.0, 1.0, 0.0),
+    ]
+
+    def fake_detect(audio, segments, **kwargs):
+        details = [
+            LidSample(path="0.00-30.00", language="", score=0.0, label=""),
+            LidSample(path="29.00-60.00", language="", score=0.1, label=""),
+        ]
+        return "", {}, details
+
+    monkeypatch.setattr(pipeline, "extract_audio_file", lambda inp, out, **kwargs: open(out, "wb").close())
+    monkeypatch.setattr(pipeline, "load_pcm", lambda path: object())
+    monkeypatch.setattr(pipeline, "detect_language_segments", fake_detect)
+
+    languages = pipeline._local_chunk_languages(
+        input_path="in.mp4",
+        chunks=chunks,
+        tmp_dir=str(tmp_path),
+        cache_dir="",
+        device="cpu",
+        max_batch_sec=0.0,
+        precision="fp32",
+        min_score=0.5,
+    )
+    # Left out, so these chunks keep detection on instead of a `local_lid` override with no language.
+    assert languages == {}
+
+
+def _run_pipeline(tmp_path, **kwargs) -> None:
+    options = dict(
+        input_path="in.mp4",
+        out_dir=str(tmp_path / "out"),
+        cache_dir=str(tmp_path / "cache"),
+        provider="mock",
+        retry=0,
+        concurrency=4,
+        deepgram_model="nova-2",
+        deepgram_language="",
+        deepgram_detect_language=False,
+        deepgram_detect_language_set=[],
+        deepgram_diarize=False,
+        deepgram_smart_format=True,
+        deepgram_punctuate=True,
+        chunk_sec=10.0,
+        overlap_sec=0.0,
+        vad_name="none",
+        vad_threshold=0.5,
+        vad_min_speech_sec=0.3,
+        vad_merge_gap_sec=0.3,
+        vad_pad_sec=0.1,
+    )
+    options.update(kwargs)
+    pipeline.run_pipeline(**options)
+
+
+def _fake_chunk_result(chunk, span_start_id):
+    span = Span(
+        sid=f"S{span_start_id:05d}",
+        t0=chunk.t0 + 1.0,
+        t1=chunk.t0 + 2.0,
+        chunk_id=chunk.chunk_id,
+        text_raw=f"text {chunk.chunk_id}",
+        asr_conf=0.9,
+    )
+    return (chunk, None, [span], {}, {}, [], [])
+
+
+def test_reorder_buffer_releases_contiguous_prefix():
+    buffer = pipeline.ReorderBuffer()
+    assert buffer.push(2, "c") == []
+    assert buffer.push(1, "b") == []
+    assert buffer.pending == 2
+    assert buffer.push(0, "a") == ["a", "b", "c"]
+    assert buffer.push(3, "d") == ["d"]
+    assert buffer.pending == 0
+
+
+def test_pipeline_streams_chunks_in_order(tmp_path, monkeypatch):
+    gcl_path = tmp_path / "out" / "episode.gcl"
+    streamed = threading.Event()
+
+    def fake_process_chunk(*, chunk, span_start_id, **kwargs):
+        if chunk.chunk_id == "C00004":
+            # The earlier chunks must reach the log while the last one is still running.
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if "chunk_id C00003" in gcl_path.read_text(encoding="utf-8"):
+                    streamed.set()
+                    break
+                time.sleep(0.01)
+        else:
+            time.sleep(0.01 * (4 - span_start_id))
+        return _fake_chunk_result(chunk, span_start_id)
+
+    monkeypatch.setattr(pipeline, "ffprobe_duration", lambda path: 40.0)
+    monkeypatch.setattr(pipeline, "_process_chunk", fake_process_chunk)
+    _run_pipeline(tmp_path)
+
+    assert streamed.is_set()
+    text = gcl_path.read_text(encoding="utf-8")
+    order = [line.split()[1] for line in text.splitlines() if line.startswith("chunk_id ")]
+    assert order == ["C00001", "C00001", "C00002", "C00002", "C00003", "C00003", "C00004", "C00004"]
+
+
+def test_replay_reproduces_pipeline_outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "ffprobe_duration", lambda path: 40.0)
+    monkeypatch.setattr(
+        pipeline,
+        "_process_chunk",
+        lambda *, chunk, span_start_id, **kwargs: _fake_chunk_result(chunk, span_start_id),
+    )
+    _run_pipeline(tmp_path)
+
+    out_dir = tmp_path / "out"
+    write_outputs(replay_gcl(str(out_dir / "episode.gcl")), str(tmp_path / "replayed"))
+    for name in OUTPUT_FILES.values():
+        assert (tmp_path / "replayed" / name).read_text(encoding="utf-8") == (out_dir / name).read_text(encoding="utf-8")
+
+
+def test_failed_chunk_aborts_with_failed_count(tmp_path, monkeypatch):
+    def fake_process_chunk(*, chunk, span_start_id, **kwargs):
+        if chunk.chunk_id == "C00002":
+            raise RuntimeError("Deepgram 502")
+        return _fake_chunk_result(chunk, span_start_id)
+
+    monkeypatch.setattr(pipeline, "ffprobe_duration", lambda path: 40.0)
+    monkeypatch.setattr(pipeline, "_process_chunk", fake_process_chunk)
+    with pytest.raises(RuntimeError, match=r"^1 chunk\(s\) failed: C00002$"):
+        _run_pipeline(tmp_path, concurrency=1)
+
+    run_log = json.loads((tmp_path / "out" / "run.log").read_text(encoding="utf-8"))
+    assert run_log["chunk_failed"] == 1
+    assert run_log["failed_chunks"] == {"C00002": "Deepgram 502"}
+
+
+def test_keep_going_marks_failed_chunk_as_gap(tmp_path, monkeypatch):
+    def fake_process_chunk(*, chunk, span_start_id, **kwargs):
+        if chunk.chunk_id == "C00002":
+            raise RuntimeError("Deepgram 502\nupstream")
+        return _fake_chunk_result(chunk, span_start_id)
+
+    monkeypatch.setattr(pipeline, "ffprobe_duration", lambda path: 40.0)
+    monkeypatch.setattr(pipeline, "_process_chunk", fake_process_chunk)
+    with pytest.raises(PartialRunError) as excinfo:
+        _run_pipeline(tmp_path, keep_going=True)
+    assert excinfo.value.failed == {"C00002": "Deepgram 502 upstream"}
+
+    out_dir = tmp_path / "out"
+    gcl = (out_dir / "episode.gcl").read_text(encoding="utf-8")
+    assert "skip_reason failed\nerror Deepgram 502 upstream\n" in gcl
+    transcript = (out_dir / "transcript.txt").read_text(encoding="utf-8").splitlines()
+    assert transcript == ["text C00001", "[gap C00002]", "text C00003", "text C00004"]
+    assert json.loads((out_dir / "run.log").read_text(encoding="utf-8"))["status"] == "partial"
+
+    write_outputs(replay_gcl(str(out_dir / "episode.gcl")), str(tmp_path / "replayed"))
+    assert (tmp_path / "replayed" / "transcript.txt").read_text(encoding="utf-8").splitlines() == transcript
+
+
+def test_progress_is_streamed_and_run_log_written_at_end(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "ffprobe_duration", lambda path: 40.0)
+    monkeypatch.setattr(
+        pipeline,
+        "_process_chunk",
+        lambda *, chunk, span_start_id, **kwargs: _fake_chunk_result(chunk, span_start_id),
+    )
+    _run_pipeline(tmp_path, progress_interval_sec=3600.0)
+
+    out_dir = tmp_path / "out"
+    events = [json.loads(line) for line in (out_dir / "progress.jsonl").read_text(encoding="utf-8").splitlines()]
+    kinds = [event["event"] for event in events]
+    assert kinds.count("progress") == 1
+    assert kinds[-1] == "end" and events[-1]["status"] == "done"
+    assert "chunk_process" in [event.get("name") for event in events if event["event"] == "step"]
+
+    run_log = json.loads((out_dir / "run.log").read_text(encoding="utf-8"))
+    assert run_log["status"] == "done"
+    assert run_log["chunk_processed"] == 4
+    assert [step["name"] for step in run_log["steps"]][0] == "init"
+
+
+def test_stage_trace_covers_each_chunk(tmp_path, monkeypatch):
+    def fake_extract_segment(inp, out, start, end, sample_rate=16000, channels=1):
+        with open(out, "wb") as f:
+            f.write(f"{start}-{end}".encode("ascii"))
+
+    monkeypatch.setattr(pipeline, "ffprobe_duration", lambda path: 40.0)
+    monkeypatch.setattr(pipeline, "extract_audio_file_segment", fake_extract_segment)
+    _run_pipeline(tmp_path)
+
+    out_dir = tmp_path / "out"
+    events = json.loads((out_dir / "trace.json").read_text(encoding="utf-8"))["traceEvents"]
+    stages: dict[str, set] = {}
+    for event in events:
+        if event["ph"] == "X":
+            stages.setdefault(event["name"], set()).add(event["args"]["chunk_id"])
+    chunk_ids = {"C00001", "C00002", "C00003", "C00004"}
+    for name in ("queue_wait", "extract", "hash", "cache_lookup", "request", "cache_store", "post_process"):
+        assert stages[name] == chunk_ids, name
+
+    run_log = json.loads((out_dir / "run.log").read_text(encoding="utf-8"))
+    assert run_log["stages"]["request"]["count"] == 4
+    assert set(run_log["stages"]["extract"]) == {"count", "total_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms"}
+
+
+def test_speculative_chunks_reissued_only_on_language_mismatch(tmp_path, monkeypatch):
+    calls = []
+    started = {"C00002": threading.Event(), "C00003": threading.Event()}
+    probe_done = threading.Event()
+    # C00002 reports no detected language, which is no reason to pay again.
+    detected = {"C00002": "", "C00003": "en", "C00004": "zh-CN"}
+
+    def fake_process_chunk(*, chunk, span_start_id, params, **kwargs):
+        calls.append((chunk.chunk_id, params["detect_language"], params["language"]))
+        if chunk.chunk_id == "C00001":
+            # The probe is still in flight while the other chunks run.
+            assert all(event.wait(5) for event in started.values())
+            time.sleep(0.05)
+            span = Span(f"S{span_start_id:05d}", 1.0, 2.0, chunk.chunk_id, "你好", 0.9)
+            result = (chunk, None, [span], {}, {}, [], [])
+            probe_done.set()
+            return result
+        if chunk.chunk_id in started:
+            started[chunk.chunk_id].set()
+        elif params["detect_language"]:
+            assert probe_done.wait(5)
+        chunk_, _, spans, _, _, _, _ = _fake_chunk_result(chunk, span_start_id)
+        language = detected[chunk.chunk_id] if params["detect_language"] else params["language"]
+        override = {"oid": f"LANG_{chunk.chunk_id}", "sid": spans[0].sid, "policy": "detected_language", "deps": language}
+        return (chunk_, None, spans, {}, {}, [override] if language else [], [])
+
+    monkeypatch.setattr(pipeline, "ffprobe_duration", lambda path: 40.0)
+    monkeypatch.setattr(pipeline, "_process_chunk", fake_process_chunk)
+    _run_pipeline(tmp_path, provider="deepgram", deepgram_detect_language=True)
+
+    assert sorted(calls) == [
+        ("C00001", True, ""),
+        ("C00002", True, ""),
+        ("C00003", False, "zh"),
+        ("C00003", True, ""),
+        ("C00004", True, ""),
+    ]
+    out_dir = tmp_path / "out"
+    run_log = json.loads((out_dir / "run.log").read_text(encoding="utf-8"))
+    assert run_log["reissued_chunks"] == ["C00003"]
+    assert run_log["chunk_processed"] == 4
+    transcript = (out_dir / "transcript.txt").read_text(encoding="utf-8").splitlines()
+    assert transcript == ["你好", "text C00002", "text C00003", "text C00004"]
+    gcl = (out_dir / "episode.gcl").read_text(encoding="utf-8")
+    assert gcl.count("chunk_id C00003\n") == 2
+    assert "deps zh\n" in gcl and "deps en\n" not in gcl
+
+
+def test_speculative_chunks_kept_when_probe_fixes_no_language(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_process_chunk(*, chunk, span_start_id, params, **kwargs):
+        calls.append((chunk.chunk_id, params["detect_language"], params["language"]))
+        chunk_, _, spans, _, _, _, _ = _fake_chunk_result(chunk, span_start_id)
+        # Latin text gives no hint, so detection stays on for the episode.
+        override = {"oid": f"LANG_{chunk.chunk_id}", "sid": spans[0].sid, "policy": "detected_language", "deps": "en"}
+        return (chunk_, None, spans, {}, {}, [override], [])
+
+    monkeypatch.setattr(pipeline, "ffprobe_duration", lambda path: 40.0)
+    monkeypatch.setattr(pipeline, "_process_chunk", fake_process_chunk)
+    _run_pipeline(tmp_path, provider="deepgram", deepgram_language="ko", deepgram_detect_language=True)
+
+    assert sorted(calls) == [(f"C{idx:05d}", True, "ko") for idx in range(1, 5)]
+    run_log = json.loads((tmp_path / "out" / "run.log").read_text(encoding="utf-8"))
+    assert run_log["reissued_chunks"] == []
+    assert run_log["chunk_processed"] == 4
+
+
+def test_stitch_policy_keeps_each_seam_word_once(tmp_path, monkeypatch):
+    timeline = [(k * 0.5, k * 0.5 + 0.4, f"w{k}") for k in range(80)]
+
+    def fake_process_chunk(*, chunk, span_start_id, **kwargs):
+        timed = [(t0, t1, tok) for t0, t1, tok in timeline if t0 >= chunk.t0 and t1 <= chunk.t1]
+        words = [{"word": tok, "start": t0 - chunk.t0, "end": t1 - chunk.t0} for t0, t1, tok in timed]
+        span = Span(f"S{span_start_id:05d}", timed[0][0], timed[-1][1], chunk.chunk_id, " ".join(t[2] for t in timed), 0.9)
+        return (chunk, None, [span], {}, {}, [], words)
+
+    monkeypatch.setattr(pipeline, "ffprobe_duration", lambda path: 40.0)
+    monkeypatch.setattr(pipeline, "_process_chunk", fake_process_chunk)
+    _run_pipeline(tmp_path, overlap_sec=1.0, overlap_policy="stitch")
+
+    out_dir = tmp_path / "out"
+    transcript = (out_dir / "transcript.txt").read_text(encoding="utf-8").split()
+    assert transcript == [tok for _, _, tok in timeline]
+    run_log = json.loads((out_dir / "run.log").read_text(encoding="utf-8"))
+    assert "overlap_stitch" in [step["name"] for step in run_log["steps"]]
+
+    write_outputs(replay_gcl(str(out_dir / "episode.gcl")), str(tmp_path / "replayed"))
+    assert (tmp_path / "replayed" / "subtitles.srt").read_text(encoding="utf-8") == (out_dir / "subtitles.srt").read_text(
+        encoding="utf-8"
+    )
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from rayado.models import Span
+from rayado.render import OUTPUT_FILES, render_files, render_srt, render_transcript, render_vtt
+
+SPANS = [
+    Span("S00002", 3.0, 2.0, "C00001", "  second ", 0.8),
+    Span("S00001", 1.0, 2.5, "C00001", "first", 0.9),
+    Span("S00003", 4.0, 5.0, "C00002", "   ", 0.7),
+    Span("S00004", 3661.25, 3662.5, "C00002", "你好", 0.7),
+]
+SPEAKERS = {"S00001": "Speaker_0"}
+
+
+def test_formats_share_sort_and_numbering():
+    assert render_transcript(SPANS, speaker_by_sid=SPEAKERS) == "Speaker_0: first\nsecond\n你好\n"
+    assert render_srt(SPANS, speaker_by_sid=SPEAKERS) == (
+        "1\n00:00:01,000 --> 00:00:02,500\nSpeaker_0: first\n\n"
+        "2\n00:00:03,000 --> 00:00:03,001\nsecond\n\n"
+        "3\n01:01:01,250 --> 01:01:02,500\n你好\n"
+    )
+    assert render_vtt(SPANS[1:2]) == "WEBVTT\n\n1\n00:00:01.000 --> 00:00:02.500\nfirst\n"
+    assert render_srt([]) == "" and render_transcript([]) == ""
+
+
+def test_render_files_writes_every_format_in_one_pass(tmp_path):
+    paths = {fmt: str(tmp_path / name) for fmt, name in OUTPUT_FILES.items()}
+    assert render_files(SPANS, paths, speaker_by_sid=SPEAKERS) == 3
+
+    read = {fmt: (tmp_path / name).read_text(encoding="utf-8") for fmt, name in OUTPUT_FILES.items()}
+    assert read["srt"] == render_srt(SPANS, speaker_by_sid=SPEAKERS)
+    assert read["txt"] == render_transcript(SPANS, speaker_by_sid=SPEAKERS)
+    assert read["vtt"] == render_vtt(SPANS, speaker_by_sid=SPEAKERS)
+    records = [json.loads(line) for line in read["jsonl"].splitlines()]
+    assert records[0] == {
+        "index": 1,
+        "sid": "S00001",
+        "chunk_id": "C00001",
+        "t0": 1.0,
+        "t1": 2.5,
+        "speaker": "Speaker_0",
+        "text": "first",
+    }
+    assert [record["t1"] for record in records] == [2.5, 3.001, 3662.5]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_render_files_leaves_previous_outputs_on_failure(tmp_path):
+    srt_path = tmp_path / "subtitles.srt"
+    srt_path.write_text("old\n", encoding="utf-8")
+
+    def spans():
+        yield SPANS[1]
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        render_files(spans(), {"srt": str(srt_path), "txt": str(tmp_path / "transcript.txt")})
+    assert srt_path.read_text(encoding="utf-8") == "old\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["subtitles.srt"]
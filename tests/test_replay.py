@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+
+from rayado.gcl import GclWriter
+from rayado.replay import GclState, compact_gcl, load_snapshot, load_state, replay_gcl, write_outputs
+
+
+def _span(sid: str, t0: float, text: str, chunk_id: str = "C00001") -> dict[str, str]:
+    return {
+        "sid": sid,
+        "t0": f"{t0}",
+        "t1": f"{t0 + 1.0}",
+        "chunk_id": chunk_id,
+        "text_raw": text,
+        "asr_conf": "0.9",
+    }
+
+
+def _write_episode(path) -> None:
+    with GclWriter(str(path)) as writer:
+        writer.write_block("GCL_CHUNK", {"chunk_id": "C00001", "t0": "0.0", "t1": "10.0"})
+        writer.write_block("GCL_SPEAKER", {"spk_id": "SPK_C00001_0", "label": "Speaker_0", "conf": ""})
+        writer.write_block("GCL_SPEAKER_MAP", {"spk_id": "SPK_C00001_0", "sid": "S00001", "conf": ""})
+        writer.write_block("GCL_SPAN", _span("S00001", 0.0, "first take"))
+        writer.write_block("GCL_SPAN", _span("S00002", 2.0, "duplicate seam"))
+        writer.write_block("GCL_SPAN", _span("S00001", 0.0, "hello there"))
+        writer.write_block("GCL_OVERRIDE", {"oid": "SUP_S00002", "sid": "S00002", "policy": "suppress", "conf": ""})
+
+
+def test_replay_resolves_reruns_speakers_and_suppressions(tmp_path):
+    gcl_path = tmp_path / "episode.gcl"
+    _write_episode(gcl_path)
+
+    state = replay_gcl(str(gcl_path))
+    assert state.header["ver"] == "0.2"
+    assert [span.text_raw for span in state.visible_spans()] == ["hello there"]
+    assert state.speaker_by_sid() == {"S00001": "Speaker_0"}
+    assert state.offset == gcl_path.stat().st_size
+
+    paths = write_outputs(state, str(tmp_path / "out"))
+    with open(paths["txt"], encoding="utf-8") as f:
+        assert f.read() == "Speaker_0: hello there\n"
+
+
+def test_replay_ignores_torn_tail_and_resumes(tmp_path):
+    gcl_path = tmp_path / "episode.gcl"
+    _write_episode(gcl_path)
+    with open(gcl_path, "ab") as f:
+        f.write(b"GCL_SPAN\nsid S00003\nt0 5.0\n")
+
+    state = replay_gcl(str(gcl_path))
+    assert "S00003" not in state.spans
+    complete_offset = state.offset
+
+    with open(gcl_path, "ab") as f:
+        f.write(b"t1 6.0\ntext_raw late\n\n")
+    replay_gcl(str(gcl_path), state=state, start_offset=complete_offset)
+    assert state.span("S00003").text_raw == "late"
+    assert isinstance(state, GclState)
+
+
+def _resolved(state: GclState) -> list[tuple[str, str, str]]:
+    labels = state.speaker_by_sid()
+    return sorted((span.sid, span.text_raw, labels.get(span.sid, "")) for span in state.visible_spans())
+
+
+def test_compaction_snapshot_plus_tail_matches_full_replay(tmp_path, monkeypatch):
+    gcl_path = tmp_path / "episode.gcl"
+    _write_episode(gcl_path)
+    compacted = compact_gcl(str(gcl_path))
+    snap = json.loads((tmp_path / "episode.gcl.snap.json").read_text(encoding="utf-8"))
+    assert snap["state"]["offset"] == gcl_path.stat().st_size
+    assert "S00002" not in snap["state"]["spans"]
+    assert _resolved(compacted) == _resolved(replay_gcl(str(gcl_path)))
+
+    with GclWriter(str(gcl_path)) as writer:
+        writer.write_block("GCL_SPAN", _span("S00003", 4.0, "after snapshot"))
+        writer.write_block("GCL_SPEAKER_MAP", {"spk_id": "SPK_C00001_0", "sid": "S00003", "conf": ""})
+        writer.write_block("GCL_SPAN", _span("S00002", 2.0, "rerun of suppressed"))
+
+    applied: list[str] = []
+    original_apply = GclState.apply
+
+    def counting_apply(self, block):
+        applied.append(block.block_type)
+        original_apply(self, block)
+
+    monkeypatch.setattr(GclState, "apply", counting_apply)
+    state = load_state(str(gcl_path))
+    assert applied == ["GCL_SPAN", "GCL_SPEAKER_MAP", "GCL_SPAN"]
+    monkeypatch.setattr(GclState, "apply", original_apply)
+    assert _resolved(state) == _resolved(replay_gcl(str(gcl_path)))
+
+
+def test_snapshot_of_replaced_log_is_ignored(tmp_path):
+    gcl_path = tmp_path / "episode.gcl"
+    _write_episode(gcl_path)
+    compact_gcl(str(gcl_path))
+
+    gcl_path.unlink()
+    with GclWriter(str(gcl_path)) as writer:
+        for n in range(20):
+            writer.write_block("GCL_SPAN", _span(f"S9{n:04d}", float(n), f"new {n}"))
+    assert load_snapshot(str(gcl_path)) is None
+    assert len(load_state(str(gcl_path)).visible_spans()) == 20
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+
+from rayado.stats import ProgressLog, StageTracer
+
+
+def test_progress_log_throttles_updates_but_not_events(tmp_path):
+    clock = [0.0]
+    path = tmp_path / "progress.jsonl"
+    log = ProgressLog(str(path), interval_sec=1.0, clock=lambda: clock[0])
+
+    assert log.update({"chunk_processed": 1})
+    for n in range(2, 50):
+        clock[0] += 0.01
+        assert not log.update({"chunk_processed": n})
+    clock[0] += 1.0
+    assert log.update({"chunk_processed": 50})
+    log.event("step", {"name": "overlap_judge"})
+    log.close()
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [(r["event"], r.get("chunk_processed")) for r in records] == [
+        ("progress", 1),
+        ("progress", 50),
+        ("step", None),
+    ]
+
+
+def test_stage_tracer_summary_and_chrome_trace(tmp_path):
+    clock = [10.0]
+    tracer = StageTracer(clock=lambda: clock[0])
+    for n in range(1, 11):
+        with tracer.span("request", chunk_id=f"C{n:05d}"):
+            clock[0] += n / 1000.0
+    tracer.add("lid", 10.0, 10.5)
+
+    summary = tracer.summary()
+    assert summary["request"] == {
+        "count": 10,
+        "total_ms": 55.0,
+        "p50_ms": 5.0,
+        "p90_ms": 9.0,
+        "p99_ms": 10.0,
+        "max_ms": 10.0,
+    }
+    assert summary["lid"]["p50_ms"] == 500.0
+
+    path = tmp_path / "trace.json"
+    tracer.write_chrome_trace(str(path))
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    assert events[0]["ph"] == "M" and events[0]["args"]["name"] == "MainThread"
+    spans = [event for event in events if event["ph"] == "X"]
+    assert spans[0] == {
+        "name": "request",
+        "cat": "chunk",
+        "ph": "X",
+        "ts": 0.0,
+        "dur": 1000.0,
+        "pid": 1,
+        "tid": 1,
+        "args": {"chunk_id": "C00001"},
+    }
+    assert spans[-1]["cat"] == "run" and spans[-1]["args"] == {}
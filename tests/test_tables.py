@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import pytest
+
+from rayado.models import Chunk, Span
+from rayado.overlap import overlap_judge
+from rayado.phase1 import _words_to_spans
+from rayado.render import render_srt
+from rayado.tables import SpanTable, StringPool, WordTable
+
+SPANS = [
+    Span("S00001", 1.0, 2.5, "C00001", "hello world", 0.9),
+    Span("S00002", 3.0, 4.0, "C00001", "hello world", 0.4),
+    Span("S00003", 3.1, 4.1, "C00002", "hello world", 0.8),
+]
+
+WORDS = [
+    {"word": "hello", "punctuated_word": "Hello", "start": 0.1, "end": 0.4, "confidence": 0.9, "speaker": 0},
+    {"word": "world", "start": 0.5, "end": 0.9},
+    {"word": "skipped", "punctuated_word": "  ", "start": 1.0},
+    {"word": "again.", "start": 1.0, "end": 1.2, "speaker_confidence": 0.5},
+]
+
+
+def test_span_table_roundtrip_and_views():
+    table = SpanTable.from_spans(SPANS)
+    assert len(table) == 3
+    assert table.to_spans() == SPANS
+    assert [view.sid for view in table] == ["S00001", "S00002", "S00003"]
+    assert table[-1].to_span() == SPANS[-1]
+    # Repeated chunk ids and texts are stored once.
+    assert len(table.pool) == 3 + 2 + 1
+    with pytest.raises(IndexError):
+        table[3]
+
+    kept = table.without({"S00002"})
+    assert [view.sid for view in kept] == ["S00001", "S00003"]
+    assert kept.pool is table.pool
+    copied = table.copy()
+    copied.append_span(SPANS[0])
+    assert len(copied) == 4 and len(table) == 3
+
+
+def test_word_table_get_matches_word_dicts():
+    table = WordTable.from_words(WORDS)
+    assert WordTable.from_words(table) is table
+    for view, word in zip(table, WORDS):
+        for key in ("word", "punctuated_word", "start", "end", "confidence", "speaker", "speaker_confidence"):
+            assert view.get(key) == word.get(key)
+    assert table[1].get("speaker", -1) == -1
+    with pytest.raises(KeyError):
+        table[1]["punctuated_word"]
+    assert [table.token(idx) for idx in range(len(table))] == ["Hello", "world", "", "again."]
+    assert len(StringPool()) == 0
+
+
+def test_words_to_spans_accepts_dicts_or_table():
+    chunk = Chunk("C00001", 10.0, 40.0, 0.0, 5.0)
+    from_dicts = _words_to_spans(words=WORDS, fallback_text="", chunk=chunk, language="en", span_start_id=0)
+    from_table = _words_to_spans(
+        words=WordTable.from_words(WORDS), fallback_text="", chunk=chunk, language="en", span_start_id=0
+    )
+    assert from_dicts.to_spans() == from_table.to_spans()
+    assert from_dicts.to_spans() == [Span("S00000", 10.1, 11.2, "C00001", "Hello world again.", 0.0)]
+
+    fallback = _words_to_spans(words=[], fallback_text=" hi ", chunk=chunk, language="en", span_start_id=7)
+    assert fallback.to_spans() == [Span("S00007", 10.0, 40.0, "C00001", "hi", 0.0)]
+
+
+def test_consumers_accept_table_or_span_list():
+    chunks = [Chunk("C00001", 0.0, 5.0, 0.0, 2.0), Chunk("C00002", 3.0, 8.0, 2.0, 0.0)]
+    table = SpanTable.from_spans(SPANS)
+    assert overlap_judge(chunks, table) == overlap_judge(chunks, SPANS)
+    assert overlap_judge(chunks, table)[1] == ["S00002"]
+    assert render_srt(table, speaker_by_sid={"S00001": "Speaker_0"}) == render_srt(
+        SPANS, speaker_by_sid={"S00001": "Speaker_0"}
+    )